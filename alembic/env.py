@@ -9,6 +9,8 @@ from app.features.users.models import UserModel
 from app.features.departments.models import DepartmentModel
 from app.features.municipalities.models import MunicipalityModel
 from app.features.cards.models import CardModel
+from app.features.outbox.models import EmailOutboxModel
+from app.core.storage.content import StoredFileModel
 
 config = context.config
 if config.config_file_name is not None:
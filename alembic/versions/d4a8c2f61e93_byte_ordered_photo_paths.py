@@ -0,0 +1,35 @@
+"""byte_ordered_photo_paths
+
+Revision ID: d4a8c2f61e93
+Revises: 7e4b19c0a2d5
+Create Date: 2026-10-18 21:12:36.408152
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8c2f61e93'
+down_revision: Union[str, None] = '7e4b19c0a2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Collation "C" (ordre des octets) sur PostgreSQL ; SQLite compare déjà ainsi
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.alter_column('cards', 'image_url', type_=sa.String(length=255, collation='C'), existing_type=sa.String(length=255), existing_nullable=True)
+    op.alter_column('stored_files', 'path', type_=sa.String(length=255, collation='C'), existing_type=sa.String(length=255), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.alter_column('stored_files', 'path', type_=sa.String(length=255), existing_type=sa.String(length=255, collation='C'), existing_nullable=False)
+    op.alter_column('cards', 'image_url', type_=sa.String(length=255), existing_type=sa.String(length=255, collation='C'), existing_nullable=True)
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,6 +11,23 @@ class Settings(BaseSettings):
     SMTP_USER: str
     SMTP_PASSWORD: str
     SMTP_FROM: str
+    # True : TLS dès la connexion (SMTPS) ; False : connexion en clair, STARTTLS si le serveur le propose
+    SMTP_USE_TLS: bool = True
+    # Envois groupés : messages par seconde (0 = sans limite)
+    SMTP_RATE_PER_SECOND: float = 10
+    # Pool de connexions SMTP : envois simultanés, messages par connexion, fermeture après inactivité
+    SMTP_POOL_SIZE: int = 4
+    SMTP_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_POOL_IDLE_SECONDS: float = 30
+    # Boîte d'envoi : worker d'arrière-plan lancé avec l'application
+    EMAIL_OUTBOX_WORKER: bool = True
+    EMAIL_OUTBOX_CONCURRENCY: int = 2 # envois en parallèle (dans la limite de SMTP_POOL_SIZE)
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 300 # délai avant qu'un message réservé par un worker disparu soit repris
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = 30
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = 3600
     ALGORITHM: str = "HS256"
     DOMAIN_URL: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 3600
@@ -18,7 +36,42 @@ class Settings(BaseSettings):
     PROFILE_IMAGE_DIR: Path = Path("static/profile_images")
     CARD_BACKGROUND_IMAGE_PATH: str = "static/card_background.png"
     CARD_DEFAULT_FONT: str = "Helvetica"
+    # Police TrueType (.ttf) à utiliser à la place de CARD_DEFAULT_FONT ; intégrée au PDF en sous-ensemble
+    CARD_FONT_PATH: Optional[Path] = None
+    # Les photos sont réduites à cette résolution d'impression avant d'être intégrées au PDF
+    CARD_PRINT_DPI: int = 300
+    CARD_PHOTO_JPEG_QUALITY: int = 85
+    CARD_PDF_CACHE_DIR: Path = Path("cache/card_pdfs")
+    CARD_TEMPLATE_DIR: Path = Path("cache/card_template")
+    # Envoi des cartes par e-mail : PDF en pièce jointe, ou lien de téléchargement signé (quelques Ko par message)
+    CARD_EMAIL_DELIVERY: Literal["attachment", "link"] = "attachment"
+    CARD_DOWNLOAD_LINK_EXPIRE_DAYS: int = 30
+    # QR code dessiné en vectoriel dans le PDF (False : image PNG, ancien rendu)
+    CARD_QR_VECTOR: bool = True
+    # Pool de rendu (PDF, images) : "process" pour profiter de tous les cœurs, ou "thread"
+    RENDER_EXECUTOR: Literal["process", "thread"] = "process"
+    RENDER_WORKERS: int = 2
     ALLOWED_IMAGE_TYPES: set[str] = {"image/jpeg", "image/png", "image/webp"}
+    MAX_IMAGE_UPLOAD_SIZE: int = 5 * 1024 * 1024 # octets
+    # Photos et cartes rendues : disque local, ou stockage objet compatible S3 partagé entre plusieurs nœuds
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: str = ""
+    S3_BUCKET: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    # Copies locales des objets lus depuis S3 (rendu PDF, déclinaisons des photos), ramenées toutes les
+    # STORAGE_CACHE_PRUNE_INTERVAL_MINUTES sous la taille maximale (les moins récemment lues d'abord)
+    # et débarrassées de celles inutilisées depuis STORAGE_CACHE_MAX_AGE_HOURS (0 : pas de limite)
+    STORAGE_CACHE_DIR: Path = Path("cache/storage")
+    STORAGE_CACHE_MAX_MB: int = 2048
+    STORAGE_CACHE_MAX_AGE_HOURS: float = 7 * 24
+    STORAGE_CACHE_PRUNE_INTERVAL_MINUTES: float = 15
+    # Nettoyage des photos sans carte (app.features.cards.photo_gc) : âge minimal et intervalle (0 : pas de tâche de fond)
+    STORAGE_GC_GRACE_HOURS: float = 24
+    STORAGE_GC_INTERVAL_HOURS: float = 0
+    # Numéros de carte réservés par worker à chaque accès au compteur (1 = strictement croissant entre workers)
+    CARD_NUMBER_BLOCK_SIZE: int = 1
 
     class Config:
         env_file = ".env"
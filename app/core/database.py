@@ -1,3 +1,4 @@
+from sqlalchemy import String
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.core.config import settings
@@ -17,6 +18,14 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+def byte_ordered_string(length: int) -> String:
+    """Chaîne comparée et triée octet par octet (UTF-8), dans l'ordre des clés d'un stockage.
+
+    SQLite compare déjà ainsi (BINARY) ; PostgreSQL suivrait sinon la collation
+    de la base (en_US.UTF-8 : "a-b" après "a.b", majuscules mêlées, ...).
+    """
+    return String(length).with_variant(String(length, collation="C"), "postgresql")
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
\ No newline at end of file
@@ -1,19 +1,28 @@
 # app/core/email.py
+import asyncio
+from functools import lru_cache
+import io
+import secrets
+import sys
+import time
 import aiosmtplib
+from email.generator import BytesGenerator
+from email.message import Message
 from email.mime.application import MIMEApplication # Pour les PDF
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.policy import compat32
 from app.core.config import settings
 import ssl
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple, Union
 
-async def send_email(
+def build_message(
     to: str,
     subject: str,
     body: str, # Texte brut
     html_body: Optional[str] = None,
     attachments: Optional[List[Tuple[str, bytes, str]]] = None # (filename, data, mimetype)
-):
+) -> MIMEMultipart:
     message = MIMEMultipart()
     message["From"] = settings.SMTP_FROM
     message["To"] = to
@@ -33,24 +42,267 @@ async def send_email(
             part = MIMEApplication(file_data, Name=filename, _subtype=subtype)
             part['Content-Disposition'] = f'attachment; filename="{filename}"'
             message.attach(part)
+    return message
+
+
+def _flatten(message: Message) -> bytes:
+    # Même sérialisation qu'aiosmtplib pour les messages MIME classiques (compat32)
+    with io.BytesIO() as buffer:
+        BytesGenerator(buffer, policy=compat32).flatten(message, unixfrom=False)
+        return buffer.getvalue()
+
+
+class EncodedPart:
+    """Partie MIME sérialisée une seule fois, à partager entre plusieurs messages.
+
+    Le coût d'une pièce jointe (encodage base64 puis découpage en lignes par le
+    générateur) est payé à la construction ; chaque message ne fait ensuite
+    que recopier les octets.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, part: Message):
+        self.data = _flatten(part)
+
+    @classmethod
+    def attachment(cls, filename: str, data: bytes, mimetype: str) -> "EncodedPart":
+        _, subtype = mimetype.split('/', 1)
+        part = MIMEApplication(data, Name=filename, _subtype=subtype)
+        part['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return cls(part)
+
+    @classmethod
+    def text(cls, text: str, subtype: str = "plain") -> "EncodedPart":
+        return cls(MIMEText(text, subtype))
+
+
+class MimePartCache:
+    """Parties encodées retrouvées par contenu, le temps d'un lot d'envois.
+
+    Un même PDF ou corps HTML envoyé à plusieurs destinataires n'est encodé
+    qu'une fois. Rien n'est jamais retiré : l'objet doit vivre le temps d'un lot.
+    """
+
+    def __init__(self):
+        self._parts: dict[tuple, EncodedPart] = {}
+
+    def attachment(self, filename: str, data: bytes, mimetype: str) -> EncodedPart:
+        key = ("attachment", filename, mimetype, data)
+        part = self._parts.get(key)
+        if part is None:
+            part = self._parts[key] = EncodedPart.attachment(filename, data, mimetype)
+        return part
 
+    def text(self, text: str, subtype: str = "plain") -> EncodedPart:
+        key = ("text", subtype, text)
+        part = self._parts.get(key)
+        if part is None:
+            part = self._parts[key] = EncodedPart.text(text, subtype)
+        return part
+
+
+def _make_boundary() -> str:
+    # Format de email.generator.Generator._make_boundary
+    return "=" * 15 + f"{secrets.randbelow(sys.maxsize):0{len(repr(sys.maxsize - 1))}d}" + "=="
+
+
+class EncodedMessage:
+    """Message prêt à l'envoi : destinataire et octets sérialisés."""
+
+    __slots__ = ("to", "data")
+
+    def __init__(self, to: str, data: bytes):
+        self.to = to
+        self.data = data
+
+
+def build_encoded_message(
+    to: str,
+    subject: str,
+    body: Union[str, EncodedPart], # Texte brut
+    html_body: Union[str, EncodedPart, None] = None,
+    attachments: Optional[Sequence[Union[EncodedPart, Tuple[str, bytes, str]]]] = None, # partie encodée ou (filename, data, mimetype)
+    parts: Optional[MimePartCache] = None,
+) -> EncodedMessage:
+    """Équivalent de `build_message` assemblé à partir de parties déjà encodées.
+
+    Les chaînes et tuples sont encodés à la volée, ou retrouvés dans `parts`.
+    Seuls les en-têtes sont produits pour chaque message.
+    """
+    parts = parts or MimePartCache()
+    encoded = [body if isinstance(body, EncodedPart) else parts.text(body)]
+    if html_body:
+        encoded.append(html_body if isinstance(html_body, EncodedPart) else parts.text(html_body, "html"))
+    for attachment in attachments or []:
+        encoded.append(attachment if isinstance(attachment, EncodedPart) else parts.attachment(*attachment))
+
+    # Même mise en forme que le générateur de la bibliothèque standard (frontière de
+    # même longueur : l'en-tête Content-Type est replié au même endroit)
+    boundary = _make_boundary()
+    while any(f"--{boundary}".encode() in part.data for part in encoded):
+        boundary = _make_boundary()
+    message = MIMEMultipart(boundary=boundary)
+    message["From"] = settings.SMTP_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    delimiter = f"\n--{boundary}\n".encode()
+    data = b"".join(
+        [compat32.fold_binary(name, value) for name, value in message.raw_items()]
+        + [b"\n", delimiter[1:], delimiter.join(part.data for part in encoded), f"\n--{boundary}--\n".encode()]
+    )
+    return EncodedMessage(to, data)
+
+@lru_cache(maxsize=1)
+def _tls_context() -> ssl.SSLContext:
+    # Créé une seule fois : le chargement des certificats racine coûte plus que l'envoi d'un message
     tls_context = ssl.create_default_context()
     tls_context.check_hostname = False
     tls_context.verify_mode = ssl.CERT_NONE
+    return tls_context
 
-    await aiosmtplib.send(
-        message,
+def smtp_client() -> aiosmtplib.SMTP:
+    """Client SMTP configuré (non connecté) ; `connect()` s'authentifie automatiquement."""
+    return aiosmtplib.SMTP(
         hostname=settings.SMTP_HOST,
         port=settings.SMTP_PORT,
         username=settings.SMTP_USER,
         password=settings.SMTP_PASSWORD,
-        use_tls=True, # Souvent True pour le port 587, False pour 465 (SMTPS)
-        # start_tls=True, # Si le serveur passe à TLS après la connexion (souvent pour le port 587)
-        # Décommentez start_tls=True et commentez use_tls=True si votre serveur SMTP le requiert.
-        # Si use_tls=True et le port est 465 (SMTPS), la connexion est TLS dès le début.
-        # Si le port est 587, c'est souvent une connexion non chiffrée qui est mise à niveau vers TLS via STARTTLS.
-        # aiosmtplib choisit souvent correctement, mais il est bon de le savoir.
-        # La configuration actuelle avec use_tls=True est typique pour STARTTLS sur le port 587.
-        # Si vous utilisez le port 465 (SSL/TLS direct), use_tls devrait être True et start_tls False.
-        tls_context=tls_context,
-    )
\ No newline at end of file
+        use_tls=settings.SMTP_USE_TLS, # Port 465 (SMTPS) : True ; port 587 : False, aiosmtplib passe en STARTTLS si proposé
+        tls_context=_tls_context(),
+    )
+
+
+class _PooledConnection:
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpConnectionPool:
+    """Petit pool de connexions SMTP authentifiées, réutilisées d'un message à l'autre.
+
+    Au plus `size` envois simultanés. Une connexion est fermée après
+    `messages_per_connection` messages, après `idle_timeout` secondes sans
+    servir (le serveur l'a souvent déjà coupée), ou après une erreur qui laisse
+    la session dans un état inconnu. Une connexion coupée par le serveur est
+    remplacée et le message renvoyé une fois.
+    """
+
+    def __init__(self, size: int, idle_timeout: float, messages_per_connection: int):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.messages_per_connection = messages_per_connection
+        self._idle: list[_PooledConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def send_message(self, message: Union[MIMEMultipart, EncodedMessage]) -> None:
+        self._bind_loop()
+        async with self._slots:
+            for attempt in range(2):
+                connection = await self._acquire()
+                try:
+                    if isinstance(message, EncodedMessage):
+                        await connection.client.sendmail(settings.SMTP_FROM, [message.to], message.data)
+                    else:
+                        await connection.client.send_message(message)
+                except aiosmtplib.SMTPRecipientsRefused:
+                    # Destinataire refusé : la session reste utilisable
+                    await self._release(connection)
+                    raise
+                except aiosmtplib.SMTPServerDisconnected:
+                    connection.client.close()
+                    if attempt:
+                        raise
+                    continue
+                except Exception:
+                    await self._discard(connection)
+                    raise
+                connection.sent += 1
+                await self._release(connection)
+                return
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connexions et sémaphore appartiennent à une boucle d'événements (tests, rechargement)
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.size)
+            self._idle = []
+
+    async def _acquire(self) -> _PooledConnection:
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop() # la plus récemment utilisée
+            if connection.client.is_connected and now - connection.last_used < self.idle_timeout:
+                return connection
+            await self._discard(connection)
+        client = smtp_client()
+        await client.connect()
+        return _PooledConnection(client)
+
+    async def _release(self, connection: _PooledConnection) -> None:
+        if connection.sent >= self.messages_per_connection or not connection.client.is_connected:
+            await self._discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        self._idle.append(connection)
+
+    @staticmethod
+    async def _discard(connection: _PooledConnection) -> None:
+        if not connection.client.is_connected:
+            return
+        try:
+            await asyncio.wait_for(connection.client.quit(), timeout=5)
+        except (aiosmtplib.SMTPException, asyncio.TimeoutError, OSError):
+            connection.client.close()
+
+
+smtp_pool = SmtpConnectionPool(
+    size=settings.SMTP_POOL_SIZE,
+    idle_timeout=settings.SMTP_POOL_IDLE_SECONDS,
+    messages_per_connection=settings.SMTP_MESSAGES_PER_CONNECTION,
+)
+
+async def send_email(
+    to: str,
+    subject: str,
+    body: str, # Texte brut
+    html_body: Optional[str] = None,
+    attachments: Optional[List[Tuple[str, bytes, str]]] = None # (filename, data, mimetype)
+):
+    message = build_message(to, subject, body, html_body, attachments)
+    await smtp_pool.send_message(message)
+
+
+class SmtpBulkSender:
+    """Envoi de nombreux messages au débit de `rate` messages par seconde (0 = sans limite).
+
+    Les connexions viennent du pool partagé (`smtp_pool`) : elles restent
+    ouvertes d'un envoi à l'autre, et entre deux lots.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = settings.SMTP_RATE_PER_SECOND if rate is None else rate
+        self._next_send = 0.0
+
+    async def send(self, message: Union[MIMEMultipart, EncodedMessage]) -> None:
+        await self._throttle()
+        await smtp_pool.send_message(message)
+
+    async def _throttle(self) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._next_send = max(self._next_send, now)
+        delay = self._next_send - now
+        self._next_send += 1 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,349 @@
+# app/core/email_templates.py
+# E-mails HTML en Jinja2 (app/core/templates/emails). Chaque page est un fragment
+# inséré dans layout.html ; à la compilation (une fois par processus), le CSS est
+# recopié dans les attributs `style` et une version texte du même gabarit est
+# dérivée. Un envoi ne coûte ensuite que deux rendus de gabarits déjà compilés.
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from html.parser import HTMLParser
+import re
+from pathlib import Path
+from typing import Callable, Optional
+
+from jinja2 import BaseLoader, Environment, FileSystemLoader, StrictUndefined, TemplateNotFound
+
+TEMPLATES_DIR = Path(__file__).parent / "templates" / "emails"
+LAYOUT = "layout.html"
+DEFAULT_LOCALE = "en"
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "table", "tr", "ul", "ol", "li", "br", "hr"}
+SKIPPED_TEXT_TAGS = {"head", "style", "script", "title"}
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    html: str
+    text: str
+
+
+# --- CSS -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _CssRule:
+    selector: tuple[tuple[Optional[str], frozenset[str]], ...] # (balise, classes) du plus lointain au plus proche
+    specificity: tuple[int, int]
+    order: int
+    declarations: tuple[tuple[str, str], ...]
+
+
+_COMPOUND = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?((?:\.[\w-]+)*)$")
+
+
+def _parse_css(css: str) -> tuple[list[_CssRule], str]:
+    """Sépare les règles applicables en ligne (balise, classes, descendants) du reste.
+
+    Renvoie les règles à recopier et le CSS à garder dans <style> (@media,
+    pseudo-classes, sélecteurs non gérés).
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    rules: list[_CssRule] = []
+    kept: list[str] = []
+    order = 0
+    position = 0
+    while True:
+        start = css.find("{", position)
+        if start == -1:
+            break
+        prelude = css[position:start].strip()
+        if prelude.startswith("@"):
+            # Bloc imbriqué (@media) : recopié tel quel
+            depth, end = 1, start + 1
+            while depth and end < len(css):
+                depth += {"{": 1, "}": -1}.get(css[end], 0)
+                end += 1
+            kept.append(f"{prelude} {css[start:end].strip()}")
+            position = end
+            continue
+        end = css.find("}", start)
+        body = css[start + 1:end]
+        position = end + 1
+        declarations = tuple(
+            (name.strip().lower(), value.strip())
+            for name, _, value in (item.partition(":") for item in body.split(";"))
+            if name.strip() and value.strip()
+        )
+        for selector in prelude.split(","):
+            selector = selector.strip()
+            parts = []
+            for compound in selector.split():
+                match = _COMPOUND.match(compound)
+                if not match or not compound:
+                    parts = None
+                    break
+                parts.append((match.group(1).lower() if match.group(1) else None, frozenset(filter(None, match.group(2).split(".")))))
+            if not parts:
+                kept.append(f"{selector} {{ {'; '.join(f'{n}: {v}' for n, v in declarations)}; }}")
+                continue
+            specificity = (sum(len(classes) for _, classes in parts), sum(1 for tag, _ in parts if tag))
+            rules.append(_CssRule(tuple(parts), specificity, order, declarations))
+            order += 1
+    return rules, "\n".join(kept)
+
+
+def _matches(rule: _CssRule, stack: list[tuple[str, frozenset[str]]]) -> bool:
+    def compound_matches(part, element) -> bool:
+        tag, classes = part
+        return (tag is None or tag == element[0]) and classes <= element[1]
+
+    *ancestors, target = rule.selector
+    if not compound_matches(target, stack[-1]):
+        return False
+    index = len(stack) - 2
+    for part in reversed(ancestors):
+        while index >= 0 and not compound_matches(part, stack[index]):
+            index -= 1
+        if index < 0:
+            return False
+        index -= 1
+    return True
+
+
+def _attribute(value: str) -> str:
+    return value.replace("&", "&amp;").replace('"', "&quot;")
+
+
+class _CssInliner(HTMLParser):
+    """Recopie les règles CSS dans l'attribut `style` de chaque élément.
+
+    Le reste du document (texte, balises Jinja, entités) est réémis tel quel.
+    """
+
+    def __init__(self, rules: list[_CssRule], kept_css: str):
+        super().__init__(convert_charrefs=False)
+        self.rules = sorted(rules, key=lambda rule: (rule.specificity, rule.order))
+        self.kept_css = kept_css
+        self.out: list[str] = []
+        self.stack: list[tuple[str, frozenset[str]]] = []
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag, attrs, self_closing):
+        if tag == "style":
+            self._in_style = True
+            self.out.append(self.get_starttag_text())
+            self.out.append(f"\n{self.kept_css}\n" if self.kept_css else "")
+            return
+        classes = frozenset(next((value or "" for name, value in attrs if name == "class"), "").split())
+        element = (tag, classes)
+        self.stack.append(element)
+        styles: dict[str, str] = {}
+        if tag not in SKIPPED_TEXT_TAGS and tag != "html":
+            for rule in self.rules:
+                if _matches(rule, self.stack):
+                    for name, value in rule.declarations:
+                        # !important l'emporte sur les règles suivantes
+                        if "!important" in styles.get(name, "") and "!important" not in value:
+                            continue
+                        # Réinsérée en fin : une propriété raccourcie (margin) suit ses variantes (margin-bottom)
+                        styles.pop(name, None)
+                        styles[name] = value
+        if self_closing or tag in VOID_TAGS:
+            self.stack.pop()
+        if not styles:
+            self.out.append(self.get_starttag_text())
+            return
+        inline = next((value or "" for name, value in attrs if name == "style"), "")
+        style = "; ".join(f"{name}: {value}" for name, value in styles.items())
+        if inline:
+            style = f"{style}; {inline.strip().rstrip(';')}"
+        attributes = "".join(
+            f' {name}="{_attribute(value)}"' if value is not None else f" {name}"
+            for name, value in attrs if name != "style"
+        )
+        self.out.append(f'<{tag}{attributes} style="{_attribute(style)}"{" /" if self_closing else ""}>')
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            self._in_style = False
+        elif tag not in VOID_TAGS:
+            while self.stack:
+                if self.stack.pop()[0] == tag:
+                    break
+        self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self._in_style:
+            self.out.append(data)
+
+    def handle_entityref(self, name):
+        self.out.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.out.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+
+def inline_css(html: str) -> str:
+    """Applique le CSS des blocs <style> du document en attributs `style`."""
+    css = "\n".join(re.findall(r"<style[^>]*>(.*?)</style>", html, flags=re.S))
+    rules, kept_css = _parse_css(css)
+    # Un seul bloc <style> subsiste, avec ce qui ne peut pas être mis en ligne
+    merged = None
+    while merged != html:
+        merged, html = html, re.sub(r"(</style>)\s*<style[^>]*>.*?</style>", r"\1", html, flags=re.S)
+    inliner = _CssInliner(rules, kept_css)
+    inliner.feed(html)
+    inliner.close()
+    return "".join(inliner.out)
+
+
+# --- Texte brut ------------------------------------------------------------
+
+class _TextConverter(HTMLParser):
+    """Version texte d'un gabarit HTML ; les expressions Jinja traversent intactes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines: list[str] = []
+        self.current: list[str] = []
+        self.skip_depth = 0
+        self.links: list[Optional[str]] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TEXT_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+        elif tag == "a":
+            self.links.append(dict(attrs).get("href"))
+            self.current.append("\x00") # début du texte du lien
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TEXT_TAGS:
+            self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+        elif tag == "a" and self.links:
+            href = self.links.pop()
+            start = len(self.current) - 1 - self.current[::-1].index("\x00")
+            label = "".join(self.current[start + 1:]).strip()
+            del self.current[start:]
+            target = href[len("mailto:"):] if href and href.startswith("mailto:") else href
+            self.current.append(label if not target or target == label else f"{label} ({target})")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.current.append(data)
+
+    def _break(self):
+        line = re.sub(r"\s+", " ", "".join(self.current)).strip()
+        self.current = []
+        if line:
+            self.lines.append(line)
+
+    def text(self) -> str:
+        self._break()
+        return "\n\n".join(self.lines) + "\n"
+
+
+def html_to_text(html: str) -> str:
+    converter = _TextConverter()
+    converter.feed(html)
+    converter.close()
+    return converter.text()
+
+
+# --- Chargement ------------------------------------------------------------
+
+class _EmailTemplateLoader(BaseLoader):
+    """Assemble `layout.html` et la page, puis produit la variante demandée.
+
+    `<page>.html` : HTML avec CSS en ligne ; `<page>.txt` : version texte.
+    Les pages peuvent être surchargées par langue : `<locale>/<page>.html`.
+    """
+
+    def __init__(self, directory: Path):
+        self.files = FileSystemLoader(str(directory))
+
+    def get_source(self, environment: Environment, template: str) -> tuple[str, Optional[str], Callable[[], bool]]:
+        page_name, _, variant = template.rpartition(".")
+        if variant not in ("html", "txt") or page_name.rpartition("/")[2] == LAYOUT.rpartition(".")[0]:
+            raise TemplateNotFound(template)
+        page, filename, page_uptodate = self.files.get_source(environment, f"{page_name}.html")
+        layout, _, layout_uptodate = self.files.get_source(environment, LAYOUT)
+
+        title = re.search(r"<title>(.*?)</title>", page, flags=re.S)
+        styles = "".join(re.findall(r"<style[^>]*>.*?</style>", page, flags=re.S))
+        body = re.sub(r"<title>.*?</title>|<style[^>]*>.*?</style>", "", page, flags=re.S).strip()
+        document = (
+            layout
+            .replace("<!-- title -->", title.group(1).strip() if title else "")
+            .replace("</style>", "</style>\n" + styles, 1)
+            .replace("<!-- content -->", body)
+        )
+        source = inline_css(document) if variant == "html" else html_to_text(document)
+        return source, filename, lambda: page_uptodate() and layout_uptodate()
+
+    def list_templates(self) -> list[str]:
+        pages = [name for name in self.files.list_templates() if name.endswith(".html") and name != LAYOUT]
+        return [f"{name[:-len('.html')]}.{variant}" for name in pages for variant in ("html", "txt")]
+
+
+def _current_year() -> int:
+    return date.today().year
+
+
+def _environment(autoescape: bool) -> Environment:
+    environment = Environment(
+        loader=_EmailTemplateLoader(TEMPLATES_DIR),
+        autoescape=autoescape,
+        undefined=StrictUndefined,
+        auto_reload=False, # compilés une fois, gardés en cache pour la durée du processus
+        cache_size=-1,
+        keep_trailing_newline=True,
+    )
+    environment.globals["current_year"] = _current_year
+    return environment
+
+
+_html_environment = _environment(autoescape=True)
+_text_environment = _environment(autoescape=False)
+
+
+def load_email_templates() -> None:
+    """Compile tous les gabarits d'e-mail ; appelé au démarrage de l'application."""
+    for name in _html_environment.list_templates():
+        environment = _html_environment if name.endswith(".html") else _text_environment
+        environment.get_template(name)
+
+
+@lru_cache(maxsize=None)
+def _localized_page(name: str, locale: str) -> str:
+    try:
+        _html_environment.get_template(f"{locale}/{name}.html")
+    except TemplateNotFound:
+        return name
+    return f"{locale}/{name}"
+
+
+def render_email(name: str, locale: Optional[str] = None, **context) -> RenderedEmail:
+    """Rend l'e-mail `name` (HTML et texte), dans la langue demandée si elle existe."""
+    locale = locale or DEFAULT_LOCALE
+    page = _localized_page(name, locale)
+    context["locale"] = locale
+    return RenderedEmail(
+        html=_html_environment.get_template(f"{page}.html").render(context),
+        text=_text_environment.get_template(f"{page}.txt").render(context),
+    )
@@ -0,0 +1,39 @@
+# app/core/executor.py
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_render_executor: Optional[Executor] = None
+
+
+def get_render_executor() -> Executor:
+    """Pool borné pour le travail CPU (rendu PDF, images), créé au premier usage."""
+    global _render_executor
+    if _render_executor is None:
+        if settings.RENDER_EXECUTOR == "process":
+            # "spawn" : pas de fork d'un processus qui a déjà des threads (aiosqlite, anyio)
+            _render_executor = ProcessPoolExecutor(
+                max_workers=settings.RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _render_executor = ThreadPoolExecutor(max_workers=settings.RENDER_WORKERS, thread_name_prefix="render")
+    return _render_executor
+
+
+async def run_in_render_executor(func: Callable[..., T], *args: Any) -> T:
+    """Exécute `func(*args)` dans le pool de rendu ; les arguments doivent être picklables."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_executor(), func, *args)
+
+
+def shutdown_render_executor() -> None:
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=True, cancel_futures=True)
+        _render_executor = None
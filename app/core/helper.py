@@ -1,16 +1,30 @@
 # app/core/helper.py
 from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import hmac
 from pathlib import Path
 from typing import Any, Optional
 import uuid, os
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
 from app.core.config import settings
+from app.core.storage.backends import storage
+from app.core.storage.content import content_store
 from passlib.context import CryptContext
 from jose import jwt
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Signatures (octets de début de fichier) des formats d'image acceptés, et extension associée
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"RIFF", "image/webp", "webp"), # "RIFF" <taille> "WEBP", vérifié à part
+)
+
 
 class AppHelper:
 
@@ -31,44 +45,75 @@ class AppHelper:
         return date_value >= datetime.now(timezone.utc)
 
     @staticmethod
-    def save_file(file: UploadFile, path: Path, file_name:Optional[str]=None) -> str:
-        if file_name:
-            new_file_name = file_name
-        else:
-            extension = file.filename.split('.')[-1] if file.filename is not None else 'jpg'
-            new_file_name = f"{AppHelper.generate_new_uuid().replace('-', '')}.{extension}"
-        file_path = path / new_file_name
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, "wb") as buffer:
-            buffer.write(file.file.read())
-        base_url = settings.DOMAIN_URL
-        url = f"{base_url}/{path.parent}/{path.name}/{file_path.name}"
-        return url
+    def sniff_image_type(head: bytes) -> Optional[tuple[str, str]]:
+        """Type MIME et extension d'après les premiers octets, None si ce n'est pas une image connue."""
+        for signature, mimetype, extension in IMAGE_SIGNATURES:
+            if head.startswith(signature) and (mimetype != "image/webp" or head[8:12] == b"WEBP"):
+                return mimetype, extension
+        return None
+
+    @staticmethod
+    async def save_file(
+        file: UploadFile,
+        path: Path,
+        allowed_types: Optional[set[str]] = None,
+        max_size: Optional[int] = None,
+    ) -> str:
+        """Enregistre une image envoyée, par morceaux et hors de la boucle d'événements.
+
+        Le type est déduit des premiers octets (l'extension et le Content-Type du
+        client sont ignorés) ; un type non autorisé (415) ou un fichier trop gros
+        (413) est refusé dès qu'il est détecté. Le fichier est nommé d'après son
+        contenu (voir app.core.storage.content) : un envoi identique réutilise le même.
+        """
+        allowed_types = settings.ALLOWED_IMAGE_TYPES if allowed_types is None else allowed_types
+        max_size = settings.MAX_IMAGE_UPLOAD_SIZE if max_size is None else max_size
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image exceeds the maximum size of {max_size // 1024} KB",
+        )
+        if file.size is not None and file.size > max_size:
+            raise too_large
+
+        first_chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        image_type = AppHelper.sniff_image_type(first_chunk)
+        if image_type is None or image_type[0] not in allowed_types:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported image type, allowed: {', '.join(sorted(allowed_types))}",
+            )
+
+        async def chunks():
+            chunk, written = first_chunk, 0
+            while chunk:
+                written += len(chunk)
+                if written > max_size:
+                    raise too_large
+                yield chunk
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+
+        return await content_store.write(path, chunks(), image_type[1])
     
     @staticmethod
-    def delete_file_from_url(url: Optional[str])-> None:
+    async def save_bytes(data: bytes, path: Path, extension: str) -> str:
+        return await content_store.write_bytes(path, data, extension)
+
+    @staticmethod
+    async def delete_file_from_url(url: Optional[str])-> None:
+        """Retire une référence au fichier ; il n'est supprimé qu'avec la dernière."""
         if url is not None:
-            base_url = settings.DOMAIN_URL
-            file_path = url.replace(f"{base_url}/", "")
-            file_path = Path(file_path)
-            try:
-                file_path.unlink()
-            except FileNotFoundError:
-                pass
-            except PermissionError:
-                pass
+            await content_store.release(url)
 
     @staticmethod
-    def get_file_from_url(url: str)-> bytes:
-        try:
-            base_url = settings.DOMAIN_URL
-            file_path = url.replace(f"{base_url}/", "")
+    def get_path_from_url(url: str)-> Path:
+        return Path(url.replace(f"{settings.DOMAIN_URL}/", ""))
+
+    @staticmethod
+    async def get_file_from_url(url: str)-> bytes:
+        """Contenu du fichier de `url`, lu depuis le stockage configuré ; FileNotFoundError s'il n'existe pas."""
+        key = AppHelper.get_path_from_url(url).as_posix()
+        return b"".join([chunk async for chunk in storage.get(key)])
 
-            with open(file_path, "rb") as file:
-                return file.read()
-        except FileNotFoundError:
-            raise FileNotFoundError
-        
     @staticmethod
     def read_file(file_dir: Path)-> bytes:
         try:
@@ -95,6 +140,16 @@ class AppHelper:
         to_encode.update({"exp": int(expire.timestamp())})
         return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+    @staticmethod
+    def sign(*parts: str) -> str:
+        """Signature HMAC-SHA256 (clé SECRET_KEY) de `parts`, tronquée à 128 bits, pour une URL."""
+        digest = hmac.new(settings.SECRET_KEY.encode(), "\x1f".join(parts).encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+    @staticmethod
+    def verify_signature(signature: str, *parts: str) -> bool:
+        return hmac.compare_digest(signature, AppHelper.sign(*parts))
+
     @staticmethod
     def create_reset_token(email: str) -> str:
         expires = timedelta(minutes=settings.RESET_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,229 @@
+# app/core/static.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from stat import S_ISREG
+from typing import AsyncIterator, Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.storage.backends import StorageBackend
+
+# Noms jamais réécrits : uuid ou empreinte du contenu, éventuellement suivis d'un
+# suffixe de déclinaison (photos : "<uuid>.jpg", "<uuid>-thumb.webp", ...)
+IMMUTABLE_NAME = re.compile(r"^[0-9a-f]{32,64}([-.]|$)")
+DERIVATIVE_NAME = re.compile(r"^([0-9a-f]{32,64})-")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Les autres fichiers (fond de carte, ...) peuvent changer sous le même nom : revalidés par ETag
+MUTABLE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "image/svg+xml", "application/json", "application/javascript", "application/xml")
+# En dessous, l'en-tête gzip et la décompression coûtent plus que ce qu'on gagne
+MIN_COMPRESS_SIZE = 1024
+
+
+def is_compressible(name: str) -> bool:
+    mimetype = mimetypes.guess_type(name)[0] or ""
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+@lru_cache(maxsize=4096)
+def content_etag(path: str, size: int, mtime_ns: int) -> str:
+    """ETag fort : empreinte du contenu (taille et date de modification servent de clé de cache)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def precompress_static_files(directory: Path, exclude: Iterable[Path] = ()) -> int:
+    """Écrit `<fichier>.gz` à côté des fichiers compressibles nouveaux ou modifiés et calcule les ETag.
+
+    Les dossiers de `exclude` (photos envoyées : des milliers de fichiers déjà
+    compressés, aux noms immuables) ne sont pas parcourus. Renvoie le nombre de
+    variantes écrites.
+    """
+    excluded = {os.path.normpath(path) for path in exclude}
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if os.path.normpath(os.path.join(root, name)) not in excluded]
+        for name in files:
+            if name.endswith((".gz", ".tmp")):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            content_etag(path, stat.st_size, stat.st_mtime_ns)
+            if not is_compressible(name) or stat.st_size < MIN_COMPRESS_SIZE:
+                continue
+            target = f"{path}.gz"
+            if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                continue
+            with open(path, "rb") as source:
+                data = gzip.compress(source.read(), compresslevel=9, mtime=0)
+            fd, tmp_name = tempfile.mkstemp(dir=root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    tmp.write(data)
+                os.replace(tmp_name, target)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            written += 1
+    return written
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles avec en-têtes de cache et variantes précompressées.
+
+    - Noms immuables (IMMUTABLE_NAME) : `Cache-Control: immutable` pour un an,
+      le navigateur ne redemande plus le fichier.
+    - Autres fichiers : `no-cache` et ETag fort (empreinte du contenu), une
+      visite suivante ne coûte qu'un 304.
+    - `<fichier>.gz` à jour (voir precompress_static_files) servi à la place du
+      fichier si le client accepte gzip.
+    - Stockage distant (`backend`) : un fichier au nom immuable absent de ce
+      nœud (photo envoyée à un autre nœud) est lu en flux depuis le stockage.
+    - Déclinaison de photo pas (encore) produite, en local comme à distance :
+      renvoi vers une autre variante ou vers l'original.
+    """
+
+    def __init__(self, *args, backend: Optional[StorageBackend] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backend = backend
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or self.backend is None:
+                raise
+            if self.backend.remote:
+                response = await self.remote_response(path, scope)
+            else:
+                key = self._immutable_key(path)
+                response = await self._original_redirect(key) if key else None
+            if response is None:
+                raise
+            return response
+
+    def lookup_path(self, path: str) -> tuple[str, Optional[os.stat_result]]:
+        # Appelé dans un thread par StaticFiles : l'empreinte d'un fichier modifiable y est
+        # calculée (une fois par version), file_response la retrouve dans le cache de content_etag
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and S_ISREG(stat_result.st_mode) and not IMMUTABLE_NAME.match(os.path.basename(full_path)):
+            content_etag(full_path, stat_result.st_size, stat_result.st_mtime_ns)
+        return full_path, stat_result
+
+    def _immutable_key(self, path: str) -> Optional[str]:
+        """Clé de stockage de `path` s'il désigne un fichier au nom immuable sous ce dossier."""
+        if os.path.isabs(path) or path.split(os.sep)[0] == ".." or not IMMUTABLE_NAME.match(os.path.basename(path)):
+            return None
+        return f"{Path(self.directory).as_posix()}/{path.replace(os.sep, '/')}"
+
+    async def remote_response(self, path: str, scope: Scope) -> Optional[Response]:
+        key = self._immutable_key(path)
+        if key is None:
+            return None
+        name = os.path.basename(path)
+        headers = Headers(headers={"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": f'"{name}"'})
+        if self.is_not_modified(headers, Headers(scope=scope)):
+            return NotModifiedResponse(headers)
+        try:
+            # Copie déjà présente sur ce nœud (envoyée ici, ou lue pour un rendu)
+            local_path = self.backend.cache_path(key)
+            return self.file_response(local_path, await run_in_threadpool(os.stat, local_path), scope)
+        except FileNotFoundError:
+            pass
+
+        chunks = self.backend.get(key)
+        try:
+            first_chunk = await chunks.__anext__()
+        except FileNotFoundError:
+            return await self._original_redirect(key)
+        except StopAsyncIteration:
+            first_chunk = b""
+
+        async def body() -> AsyncIterator[bytes]:
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+
+        return StreamingResponse(body(), headers=dict(headers), media_type=mimetypes.guess_type(name)[0] or "text/plain")
+
+    async def _original_redirect(self, key: str) -> Optional[Response]:
+        """Déclinaison absente : renvoi (temporaire) vers la même dans un autre format, sinon vers l'original."""
+        directory, _, name = key.rpartition("/")
+        match = DERIVATIVE_NAME.match(name)
+        if match is None:
+            return None
+        # "<h>-print300q85.png" pour "<h>-print300q85.jpg" (photo transparente), puis "<h>.jpg"
+        for prefix in (f"{name.rpartition('.')[0]}.", f"{match.group(1)}."):
+            async for candidate in self.backend.iter_keys(f"{directory}/{prefix}"):
+                if candidate != key:
+                    # URL relative : même dossier que la déclinaison demandée
+                    return RedirectResponse(candidate.rsplit("/", 1)[1], status_code=307, headers={"cache-control": "no-store"})
+        return None
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        name = os.path.basename(full_path)
+
+        if IMMUTABLE_NAME.match(name):
+            # Le nom désigne une seule version du contenu
+            headers = {"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": f'"{name}"'}
+        else:
+            headers = {
+                "cache-control": MUTABLE_CACHE_CONTROL,
+                "etag": content_etag(full_path, stat_result.st_size, stat_result.st_mtime_ns),
+            }
+
+        path, stat = full_path, stat_result
+        if is_compressible(name):
+            headers["vary"] = "Accept-Encoding"
+            if _accepts_gzip(request_headers.get("accept-encoding", "")):
+                try:
+                    gz_stat = os.stat(f"{full_path}.gz")
+                except OSError:
+                    gz_stat = None
+                if gz_stat is not None and gz_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                    path, stat = f"{full_path}.gz", gz_stat
+                    headers["content-encoding"] = "gzip"
+                    # Une représentation différente : un autre ETag fort
+                    headers["etag"] = headers["etag"][:-1] + '-gzip"'
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=mimetypes.guess_type(name)[0] or "text/plain",
+            stat_result=stat,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
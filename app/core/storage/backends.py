@@ -0,0 +1,430 @@
+# app/core/storage/backends.py
+# Où sont rangés les fichiers (photos, cartes rendues) : disque local, ou
+# stockage objet compatible S3 (AWS, MinIO, ...) partagé entre plusieurs nœuds.
+# Les clés sont des chemins relatifs ("static/profile_images/52/ff/<h>.jpg"),
+# les mêmes qu'en local : passer d'un stockage à l'autre ne change pas les URL.
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+import hmac
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import AsyncIterable, AsyncIterator, Optional
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+from fastapi.concurrency import run_in_threadpool
+import httpx
+
+from app.core.config import settings
+
+STORAGE_CHUNK_SIZE = 256 * 1024
+# Les fichiers temporaires plus récents sont des écritures en cours : jamais supprimés par prune_cache
+TMP_FILE_MAX_AGE = 3600
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+@dataclass(frozen=True)
+class StorageEntry:
+    key: str
+    size: int
+    modified_at: datetime
+
+
+class StorageBackend(ABC):
+    """Interface commune des stockages ; lectures et écritures se font par morceaux."""
+
+    remote = False
+
+    @abstractmethod
+    async def put(self, key: str, chunks: AsyncIterable[bytes], size: int, content_type: str = "application/octet-stream") -> None:
+        """Écrit `size` octets sous `key` ; l'objet n'apparaît qu'une fois complet."""
+
+    @abstractmethod
+    def get(self, key: str) -> AsyncIterator[bytes]:
+        """Contenu de `key` par morceaux ; FileNotFoundError (au premier morceau) si la clé n'existe pas."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Supprime `key` ; sans effet si elle n'existe pas."""
+
+    @abstractmethod
+    async def move(self, key: str, new_key: str) -> None:
+        """Renomme `key` ; FileNotFoundError si elle n'existe pas."""
+
+    @abstractmethod
+    def iter_entries(self, prefix: str) -> AsyncIterator[StorageEntry]:
+        """Fichiers dont la clé commence par `prefix`, dans l'ordre lexicographique des clés, au fil de l'eau."""
+
+    @abstractmethod
+    def cache_path(self, key: str) -> Path:
+        """Emplacement local de `key` : le fichier lui-même, ou sa copie sur ce nœud (stockage distant)."""
+
+    async def iter_keys(self, prefix: str) -> AsyncIterator[str]:
+        async for entry in self.iter_entries(prefix):
+            yield entry.key
+
+    async def put_file(self, key: str, path: Path, content_type: str = "application/octet-stream") -> None:
+        size = (await run_in_threadpool(path.stat)).st_size
+        await self.put(key, _read_chunks(path), size, content_type)
+
+    async def fetch(self, key: str) -> Path:
+        """Chemin local lisible de `key`, téléchargé au premier accès si le stockage est distant."""
+        path = self.cache_path(key)
+        if self.remote and not await run_in_threadpool(_mark_used, path):
+            await self.download(key, path)
+        return path
+
+    async def prune_cache(self) -> int:
+        """Ramène les copies locales sous les limites de taille et d'âge ; renvoie le nombre de fichiers supprimés."""
+        return 0
+
+    async def close(self) -> None:
+        """Ferme les connexions ouvertes vers le stockage."""
+
+    async def download(self, key: str, path: Path) -> None:
+        """Copie `key` dans le fichier local `path` (écrit à côté puis renommé)."""
+        await _write_chunks(path, self.get(key))
+
+
+async def _write_chunks(path: Path, chunks: AsyncIterable[bytes]) -> None:
+    await run_in_threadpool(path.parent.mkdir, parents=True, exist_ok=True)
+    fd, tmp_name = await run_in_threadpool(tempfile.mkstemp, dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            async for chunk in chunks:
+                await run_in_threadpool(buffer.write, chunk)
+        await run_in_threadpool(os.replace, tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _mark_used(path: Path) -> bool:
+    """Date d'accès de `path` mise à jour (ordre d'éviction de prune_cache) ; False s'il n'existe pas."""
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _prune_directory(directory: Path, max_bytes: int, max_age: float) -> int:
+    """Supprime les fichiers inutilisés depuis `max_age` secondes, puis les moins récemment
+    utilisés tant que le total dépasse `max_bytes` (jusqu'à 90 %, pour ne pas recommencer
+    au fichier suivant). 0 : pas de limite. Renvoie le nombre de fichiers supprimés.
+    """
+    now = time.time()
+    files: list[tuple[float, int, str]] = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(".tmp") and now - stat.st_mtime < TMP_FILE_MAX_AGE:
+                continue
+            files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    target = max_bytes * 0.9 if max_bytes and total > max_bytes else None
+    removed = 0
+    for used, size, path in files:
+        expired = max_age and used < now - max_age
+        if not expired and (target is None or total <= target):
+            break # les suivants sont plus récents
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with await run_in_threadpool(open, path, "rb") as file:
+        while chunk := await run_in_threadpool(file.read, STORAGE_CHUNK_SIZE):
+            yield chunk
+
+
+class LocalStorageBackend(StorageBackend):
+    """Fichiers sous `root` (le dossier de travail par défaut, comme les URL `static/...`)."""
+
+    def __init__(self, root: Path = Path(".")):
+        self.root = root
+
+    def cache_path(self, key: str) -> Path:
+        return self.root / key
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], size: int, content_type: str = "application/octet-stream") -> None:
+        await _write_chunks(self.cache_path(key), chunks)
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        async for chunk in _read_chunks(self.cache_path(key)):
+            yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self.cache_path(key).is_file)
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self.cache_path(key).unlink, missing_ok=True)
+
+    async def move(self, key: str, new_key: str) -> None:
+        await run_in_threadpool(os.replace, self.cache_path(key), self.cache_path(new_key))
+
+    async def iter_entries(self, prefix: str) -> AsyncIterator[StorageEntry]:
+        # Le préfixe se termine par "/" (un dossier) ou par le début d'un nom de fichier
+        directory, _, name_prefix = prefix.rpartition("/")
+        async for entry in self._walk(directory, name_prefix):
+            yield entry
+
+    async def _walk(self, directory: str, name_prefix: str = "") -> AsyncIterator[StorageEntry]:
+        # Un dossier à la fois : la mémoire ne dépend que de la taille du plus grand dossier
+        for name, stat in await run_in_threadpool(self._scan, self.root / directory, name_prefix):
+            key = f"{directory}/{name}" if directory else name
+            if stat is None:
+                async for entry in self._walk(key):
+                    yield entry
+            else:
+                yield StorageEntry(key, stat.st_size, datetime.fromtimestamp(stat.st_mtime, timezone.utc))
+
+    @staticmethod
+    def _scan(path: Path, name_prefix: str) -> list[tuple[str, Optional[os.stat_result]]]:
+        """Entrées d'un dossier (stat, ou None pour un sous-dossier), dans l'ordre de leurs clés."""
+        entries = []
+        try:
+            with os.scandir(path) as scan:
+                for entry in scan:
+                    if not entry.name.startswith(name_prefix):
+                        continue
+                    try:
+                        entries.append((entry.name, None if entry.is_dir() else entry.stat()))
+                    except FileNotFoundError:
+                        continue # supprimé entre-temps
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        # Un sous-dossier "ab" vaut "ab/..." : "ab-x" < "ab/..." < "ab0"
+        entries.sort(key=lambda item: item[0] + "/" if item[1] is None else item[0])
+        return entries
+
+
+class S3StorageBackend(StorageBackend):
+    """Stockage objet compatible S3, requêtes signées (AWS Signature V4) en style chemin (/bucket/clé).
+
+    Les objets lus sont copiés sur ce nœud sous `cache_dir` (rendu PDF, images),
+    ramenés par prune_cache sous `cache_max_bytes` et `cache_max_age` secondes
+    sans accès (0 : pas de limite) ; les envois sont faits en un seul PUT
+    (fichiers de quelques Mo au plus).
+    """
+
+    remote = True
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        region: str,
+        access_key: str,
+        secret_key: str,
+        cache_dir: Path,
+        cache_max_bytes: int = 0,
+        cache_max_age: float = 0,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_max_age = cache_max_age
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def cache_path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], size: int, content_type: str = "application/octet-stream") -> None:
+        response = await self._request("PUT", key, content=chunks, headers={"content-length": str(size), "content-type": content_type})
+        response.raise_for_status()
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        request = self._build_request("GET", key)
+        response = await self.client.send(request, stream=True)
+        try:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(STORAGE_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def delete(self, key: str) -> None:
+        response = await self._request("DELETE", key)
+        if response.status_code != 404:
+            response.raise_for_status()
+        await run_in_threadpool(self.cache_path(key).unlink, missing_ok=True)
+
+    async def move(self, key: str, new_key: str) -> None:
+        # Pas de renommage en S3 : copie côté serveur puis suppression
+        response = await self._request("PUT", new_key, headers={"x-amz-copy-source": quote(f"/{self.bucket}/{key}")})
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        response.raise_for_status()
+        await self.delete(key)
+
+    async def iter_entries(self, prefix: str) -> AsyncIterator[StorageEntry]:
+        params = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self._request("GET", "", params=params)
+            response.raise_for_status()
+            root = ElementTree.fromstring(response.content)
+            namespace = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+            for contents in root.iter(f"{namespace}Contents"):
+                yield StorageEntry(
+                    contents.findtext(f"{namespace}Key"),
+                    int(contents.findtext(f"{namespace}Size") or 0),
+                    datetime.fromisoformat(contents.findtext(f"{namespace}LastModified").replace("Z", "+00:00")),
+                )
+            token = root.findtext(f"{namespace}NextContinuationToken")
+            if root.findtext(f"{namespace}IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    async def prune_cache(self) -> int:
+        return await run_in_threadpool(_prune_directory, self.cache_dir, self.cache_max_bytes, self.cache_max_age)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_stale_client(self._client, self._loop)
+            # Connexions gardées ouvertes d'une requête à l'autre (par boucle d'événements)
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30, connect=5))
+            self._loop = loop
+        return self._client
+
+    @staticmethod
+    def _close_stale_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        """Ferme le client d'une autre boucle d'événements, sur celle-ci : ses connexions lui appartiennent."""
+        if loop.is_closed():
+            # Plus rien ne peut s'y exécuter : les sockets sont fermés à la libération du client
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, key: str, **kwargs) -> httpx.Response:
+        return await self.client.send(self._build_request(method, key, **kwargs))
+
+    def _build_request(self, method: str, key: str, params: Optional[dict] = None, headers: Optional[dict] = None, content=None) -> httpx.Request:
+        path = f"/{self.bucket}/{key}" if key else f"/{self.bucket}"
+        query = "&".join(f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in sorted((params or {}).items()))
+        url = f"{self.endpoint_url}{quote(path, safe='/-_.~')}" + (f"?{query}" if query else "")
+        headers = self._sign(method, httpx.URL(url), dict(headers or {}))
+        return self.client.build_request(method, url, headers=headers, content=content)
+
+    def _sign(
+        self,
+        method: str,
+        url: httpx.URL,
+        headers: dict[str, str],
+        now: Optional[datetime] = None,
+        payload_hash: str = UNSIGNED_PAYLOAD,
+    ) -> dict[str, str]:
+        now = now or datetime.now(timezone.utc)
+        amz_date, date = now.strftime("%Y%m%dT%H%M%SZ"), now.strftime("%Y%m%d")
+        # Contenu non signé par défaut : le corps est envoyé en flux, sans être lu deux fois
+        headers.update({"host": url.netloc.decode(), "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+        signed = sorted(name.lower() for name in headers if name.lower() != "content-length")
+        canonical_headers = "".join(f"{name}:{str(headers[name]).strip()}\n" for name in signed)
+        canonical_request = "\n".join((
+            method,
+            url.raw_path.decode().split("?", 1)[0],
+            url.query.decode(),
+            canonical_headers,
+            ";".join(signed),
+            payload_hash,
+        ))
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(("AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()))
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(signed)}, Signature={signature}"
+        )
+        return headers
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            region=settings.S3_REGION,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            cache_dir=settings.STORAGE_CACHE_DIR,
+            cache_max_bytes=settings.STORAGE_CACHE_MAX_MB * 1024 * 1024,
+            cache_max_age=settings.STORAGE_CACHE_MAX_AGE_HOURS * 3600,
+        )
+    return LocalStorageBackend()
+
+
+storage = create_storage_backend()
+
+
+class StorageCachePruner:
+    """Nettoyage périodique des copies locales (prune_cache), démarré par le lifespan si le stockage est distant."""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="storage-cache-pruner")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.backend.prune_cache()
+            except Exception as e:
+                print(f"Erreur lors du nettoyage des copies locales du stockage : {e}")
+            await asyncio.sleep(settings.STORAGE_CACHE_PRUNE_INTERVAL_MINUTES * 60)
+
+
+storage_cache_pruner = StorageCachePruner(storage)
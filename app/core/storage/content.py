@@ -0,0 +1,218 @@
+# app/core/storage/content.py
+# Stockage des fichiers envoyés, adressé par contenu :
+#   <dossier>/<h[0:2]>/<h[2:4]>/<h>.<ext>    (h : sha256 du contenu)
+# Deux envois identiques partagent le même fichier ; les références sont
+# comptées dans la table stored_files et le fichier n'est supprimé qu'avec la
+# dernière. Les fichiers dérivés ("<h>-thumb.webp", ...) suivent l'original.
+# Les deux niveaux de sous-dossiers limitent chaque dossier à quelques
+# centaines d'entrées, même avec des millions de fichiers.
+# Les fichiers sont rangés dans le stockage configuré (voir backends.py).
+from datetime import datetime
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+import re
+import tempfile
+from typing import AsyncIterable, AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import DateTime, Integer, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, Base, byte_ordered_string
+from app.core.storage.backends import StorageBackend, storage
+
+# Seuls ces noms ont des dérivés "<nom>-..." : empreinte, ou uuid des anciens envois.
+# Les autres anciens envois gardent le nom du fichier envoyé ("photo.jpg" à côté de "photo-2023.jpg").
+DERIVED_NAME = re.compile(r"^(?:[0-9a-f]{64}|[0-9a-f]{32})\.")
+
+
+class StoredFileModel(Base):
+    __tablename__ = "stored_files"
+
+    # Chemin relatif du fichier, tel qu'il apparaît dans son URL ; trié comme la liste du stockage
+    path: Mapped[str] = mapped_column(byte_ordered_string(255), primary_key=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), default=func.now())
+
+
+def blob_path(directory: Path, digest: str, extension: str) -> Path:
+    return directory / digest[:2] / digest[2:4] / f"{digest}.{extension}"
+
+
+class ContentStore:
+    """Écriture dédupliquée et suppression par comptage de références."""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+
+    async def write(self, directory: Path, chunks: AsyncIterable[bytes], extension: str) -> str:
+        """Enregistre le contenu de `chunks` et renvoie son URL ; une référence de plus s'il existait déjà.
+
+        Le contenu est écrit dans un fichier temporaire pendant le calcul de son
+        empreinte, puis renommé à sa place (ou abandonné si le fichier existe).
+        Stockage distant : le fichier y est envoyé s'il n'y est pas déjà, et
+        reste en copie locale pour le rendu des cartes.
+        Une exception levée par `chunks` (taille maximale dépassée, ...) annule tout.
+        """
+        local_directory = self.backend.cache_path(directory.as_posix())
+        await run_in_threadpool(local_directory.mkdir, parents=True, exist_ok=True)
+        fd, tmp_name = await run_in_threadpool(tempfile.mkstemp, dir=local_directory, suffix=".tmp")
+        try:
+            digest, size = hashlib.sha256(), 0
+            with os.fdopen(fd, "wb") as buffer:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await run_in_threadpool(buffer.write, chunk)
+            key = blob_path(directory, digest.hexdigest(), extension).as_posix()
+            # Référence prise avant de regarder le stockage : une suppression concurrente
+            # de la dernière référence voit la nouvelle et restaure le fichier (voir release)
+            await self._acquire(key, size)
+            if self.backend.remote and not await self.backend.exists(key):
+                await self.backend.put_file(key, Path(tmp_name), mimetypes.guess_type(key)[0] or "application/octet-stream")
+            await run_in_threadpool(self._place, tmp_name, self.backend.cache_path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return f"{settings.DOMAIN_URL}/{key}"
+
+    async def write_bytes(self, directory: Path, data: bytes, extension: str) -> str:
+        async def chunks():
+            yield data
+        return await self.write(directory, chunks(), extension)
+
+    async def release(self, url: str) -> None:
+        """Retire une référence au fichier de `url` ; à la dernière, le supprime avec ses dérivés.
+
+        Un fichier inconnu de stored_files (enregistré avant le stockage par
+        contenu, nom unique) est supprimé directement.
+        """
+        key = Path(url.replace(f"{settings.DOMAIN_URL}/", "")).as_posix()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(StoredFileModel)
+                .where(StoredFileModel.path == key)
+                .values(refcount=StoredFileModel.refcount - 1)
+                .returning(StoredFileModel.refcount)
+            )
+            refcount = result.scalar_one_or_none()
+            if refcount is not None and refcount > 0:
+                await db.commit()
+                return
+            if refcount is not None:
+                await db.execute(delete(StoredFileModel).where(StoredFileModel.path == key, StoredFileModel.refcount <= 0))
+            await db.commit()
+
+        await self._remove(key)
+
+    async def iter_records(self, directory: Path, batch_size: int = 1000) -> AsyncIterator[StoredFileModel]:
+        """Lignes de stored_files sous `directory`, triées par chemin, lues par pages (keyset)."""
+        low, high = f"{directory.as_posix()}/", f"{directory.as_posix()}0" # "0" suit "/"
+        while True:
+            async with AsyncSessionLocal() as db:
+                records = (await db.scalars(
+                    select(StoredFileModel)
+                    .where(StoredFileModel.path > low, StoredFileModel.path < high)
+                    .order_by(StoredFileModel.path)
+                    .limit(batch_size)
+                )).all()
+            for record in records:
+                yield record
+            if len(records) < batch_size:
+                return
+            low = records[-1].path
+
+    async def discard(self, key: str, older_than: datetime) -> bool:
+        """Supprime un fichier qu'aucune carte ne référence, avec ses dérivés.
+
+        Sa ligne stored_files n'est retirée que si elle n'a pas bougé depuis
+        `older_than` : un envoi identique en cours (référence prise, carte pas
+        encore enregistrée) garde le fichier. Renvoie False dans ce cas.
+        """
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(StoredFileModel).where(StoredFileModel.path == key, StoredFileModel.updated_at < older_than))
+            await db.commit()
+        if await self._is_referenced(key):
+            return False
+        await self._remove(key)
+        return True
+
+    async def set_refcount(self, key: str, refcount: int, older_than: datetime) -> bool:
+        """Corrige le compteur de références de `key`, s'il n'a pas bougé depuis `older_than`."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(StoredFileModel)
+                .where(StoredFileModel.path == key, StoredFileModel.updated_at < older_than)
+                .values(refcount=refcount)
+            )
+            await db.commit()
+        return result.rowcount > 0
+
+    async def recover(self, tombstone: str) -> None:
+        """Termine une suppression interrompue : le fichier mis de côté revient s'il est encore référencé."""
+        directory, _, name = tombstone.rpartition("/")
+        key = f"{directory}/{name[1:-len('.deleted')]}"
+        if await self._is_referenced(key) and not await self.backend.exists(key):
+            await self.backend.move(tombstone, key)
+        else:
+            await self.backend.delete(tombstone)
+
+    async def _remove(self, key: str) -> None:
+        # Mis de côté avant suppression : un envoi identique arrivé entre-temps a repris une référence
+        directory, _, name = key.rpartition("/")
+        tombstone = f"{directory}/.{name}.deleted"
+        try:
+            await self.backend.move(key, tombstone)
+        except FileNotFoundError:
+            return
+        except PermissionError:
+            return
+        if await self._is_referenced(key):
+            await self.backend.move(tombstone, key)
+            return
+        await self.backend.delete(tombstone)
+        if not DERIVED_NAME.match(name):
+            return
+        async for derivative in self.backend.iter_keys(f"{directory}/{name.rsplit('.', 1)[0]}-"):
+            await self.backend.delete(derivative)
+
+    async def _acquire(self, key: str, size: int) -> None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(StoredFileModel).where(StoredFileModel.path == key).values(refcount=StoredFileModel.refcount + 1)
+            )
+            if result.rowcount == 0:
+                db.add(StoredFileModel(path=key, size=size, refcount=1))
+                try:
+                    await db.commit()
+                    return
+                except IntegrityError:
+                    # Même contenu enregistré au même instant par une autre requête
+                    await db.rollback()
+                    await db.execute(
+                        update(StoredFileModel).where(StoredFileModel.path == key).values(refcount=StoredFileModel.refcount + 1)
+                    )
+            await db.commit()
+
+    @staticmethod
+    async def _is_referenced(key: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(StoredFileModel.refcount).where(StoredFileModel.path == key)) is not None
+
+    @staticmethod
+    def _place(tmp_name: str, path: Path) -> None:
+        if path.exists():
+            os.unlink(tmp_name)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_name, path)
+
+
+content_store = ContentStore(storage)
@@ -5,14 +5,14 @@ from jose import JWTError, jwt
 from app.core.config import settings
 
 # from app.core.security import get_current_admin
-from app.core.email import send_email
 from app.core.helper import AppHelper
 from app.core.security import get_current_admin
-from app.core.templates.reset_email_successful_template import password_change_alert_template
-from app.core.templates.reset_email_template import reset_email_template
+from app.core.email_templates import render_email
 from app.features.auth.dependencies import get_auth_service
 from app.features.auth.schemas import EmailPasswordRequestForm, PasswordReset, PasswordResetRequest, Token, UserCreate
 from app.features.auth.services import AuthService
+from app.features.outbox.dependencies import get_email_outbox_service
+from app.features.outbox.services import EmailOutboxService
 from app.features.users.models import UserModel
 # from app.features.users.models import UserModel
 
@@ -52,28 +52,24 @@ async def create_admin(
 async def forgot_password(
     request: PasswordResetRequest,
     auth_service: AuthService = Depends(get_auth_service),
+    outbox: EmailOutboxService = Depends(get_email_outbox_service),
 ):
     user = await auth_service.get_user_by_email(request.email)
     if user:
         reset_token = AppHelper.create_reset_token(user.email)
         reset_link = f"https://cli.menosi.net/auth/reset-password?token={reset_token}"
-        body = f"""
-Hello {user.email},
-
-You have requested to reset your Liberal password.
-Please click the following link to reset your password:
-{reset_link}
-
-If you have not requested to reset your password, you can ignore this email.
-
-Sincerely,
-The Liberal Team
-"""
-        await send_email(
+        email = render_email(
+            "reset_password",
+            user_first_name=user.email,
+            reset_link=reset_link,
+            expiration_time=settings.RESET_TOKEN_EXPIRE_MINUTES,
+            user_email=user.email,
+        )
+        await outbox.enqueue(
             to=user.email,
             subject="Resetting your Liberal password",
-            body= body,
-            html_body=reset_email_template(user.email, reset_link, f"{settings.RESET_TOKEN_EXPIRE_MINUTES}", user.email)
+            body=email.text,
+            html_body=email.html,
         )
         print(f"Reset token for {user.email}: {reset_token}")
     
@@ -83,6 +79,7 @@ The Liberal Team
 async def reset_password(
     reset_data: PasswordReset,
     auth_service: AuthService = Depends(get_auth_service),
+    outbox: EmailOutboxService = Depends(get_email_outbox_service),
 ):
     try:
         payload = jwt.decode(
@@ -105,19 +102,7 @@ async def reset_password(
     user = await auth_service.get_user_by_email(email)
     # Send reset successful email
     reset_time = datetime.now().strftime("%B %d, %Y at %I:%M %p %Z")
-    body = f"""
-Password Successfully Changed
-
-Hello {user.email},
-
-This email confirms that the password for your Liberal account associated with {user.email} was successfully changed on {reset_time}.
-
-If you did not request this change, please contact our support team immediately to secure your account.
-
-Best regards,
-The Liberal Team
-"""
-    body_html = password_change_alert_template(user.email, email, reset_time)
-    await send_email(email, "Password Reset Successful", body, body_html)
+    email_content = render_email("password_changed", user_first_name=user.email, user_email=email, reset_date_time=reset_time)
+    await outbox.enqueue(email, "Password Reset Successful", email_content.text, email_content.html)
     return {"message": "Password reset successful"}
 
@@ -0,0 +1,73 @@
+# app/features/cards/allocator.py
+import asyncio
+
+from sqlalchemy import exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.features.cards.models import CardModel, CardNumberCounterModel
+
+CARD_NUMBER_COUNTER = "cards"
+
+
+class CardNumberAllocator:
+    """Distribue les numéros de carte à partir du compteur `card_number_counters`.
+
+    Chaque réservation est un UPDATE ... RETURNING atomique dans sa propre
+    transaction : aucune lecture de `cards`, aucune collision entre requêtes ou
+    workers concurrents. Avec `block_size` > 1, un worker réserve un bloc de
+    numéros et le consomme localement ; les numéros non utilisés (bloc
+    abandonné, création échouée) laissent des trous, jamais des doublons.
+    """
+
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, engine: AsyncEngine, count: int = 1) -> int:
+        """Réserve `count` numéros consécutifs et renvoie le premier."""
+        async with self._lock:
+            if count > self._end - self._next:
+                size = max(count, self.block_size)
+                last = await self._reserve(engine, size)
+                self._next, self._end = last - size + 1, last + 1
+            first = self._next
+            self._next += count
+            return first
+
+    async def _reserve(self, engine: AsyncEngine, size: int) -> int:
+        increment = (
+            update(CardNumberCounterModel)
+            .where(CardNumberCounterModel.name == CARD_NUMBER_COUNTER)
+            .values(value=CardNumberCounterModel.value + size)
+            .returning(CardNumberCounterModel.value)
+        )
+        for _ in range(3):
+            async with engine.begin() as conn:
+                last = (await conn.execute(increment)).scalar_one_or_none()
+                if last is not None:
+                    return last
+            # Premier accès sur une base sans compteur : on l'amorce une seule fois
+            # depuis les cartes existantes (un autre worker a pu le faire avant nous).
+            # NOT EXISTS plutôt qu'une IntegrityError attendue : sous SQLite (aiosqlite),
+            # l'erreur retarde le rollback et bloque les autres workers jusqu'au timeout.
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        insert(CardNumberCounterModel).from_select(
+                            ["name", "value"],
+                            select(
+                                literal(CARD_NUMBER_COUNTER),
+                                select(func.coalesce(func.max(CardModel.number), 0)).scalar_subquery(),
+                            ).where(~exists().where(CardNumberCounterModel.name == CARD_NUMBER_COUNTER)),
+                        )
+                    )
+            except IntegrityError:
+                pass
+        raise RuntimeError("Unable to reserve card numbers")
+
+
+card_number_allocator = CardNumberAllocator(settings.CARD_NUMBER_BLOCK_SIZE)
@@ -0,0 +1,142 @@
+# app/features/cards/cache.py
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.helper import AppHelper
+from app.core.storage.backends import StorageBackend, storage
+from app.features.cards.models import CardModel
+
+# À incrémenter à chaque modification de la mise en page de la carte
+CARD_RENDER_VERSION = "4"
+
+
+def file_version(path: Optional[Path]) -> str:
+    """Empreinte bon marché d'un fichier (taille + date de modification)."""
+    if path is None:
+        return "-"
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class CardPdfCache:
+    """Cache disque des cartes rendues : `<directory>/<card_id>/<clé><suffixe>`.
+
+    La clé est un hash des champs affichés sur la carte et des versions des
+    fichiers utilisés (fond, photo, police) : une carte modifiée change de clé.
+    Le suffixe distingue le PDF (`.pdf`) des aperçus (`-320.webp`, ...).
+    Stockage distant : les fichiers rendus y sont aussi envoyés
+    (`card_pdfs/<card_id>/...`), un autre nœud les reprend au lieu de les rendre.
+    """
+
+    def __init__(self, directory: Path, backend: StorageBackend):
+        self.directory = directory
+        self.backend = backend
+
+    def key(self, card: CardModel) -> str:
+        photo_path = AppHelper.get_path_from_url(card.image_url) if card.image_url else None
+        parts = (
+            CARD_RENDER_VERSION,
+            str(card.number),
+            card.first_name,
+            card.last_name,
+            card.status,
+            card.contact,
+            card.department.name if card.department else "",
+            card.municipality.name if card.municipality else "",
+            card.qr_code_url or "",
+            card.image_url or "",
+            # Stockage distant : l'URL (nommée d'après le contenu) suffit, la copie locale varie d'un nœud à l'autre
+            "-" if self.backend.remote else file_version(photo_path),
+            settings.CARD_BACKGROUND_IMAGE_PATH,
+            file_version(Path(settings.CARD_BACKGROUND_IMAGE_PATH)),
+            settings.CARD_DEFAULT_FONT,
+            str(settings.CARD_FONT_PATH or ""),
+            file_version(settings.CARD_FONT_PATH),
+            str(settings.CARD_PRINT_DPI),
+            str(settings.CARD_PHOTO_JPEG_QUALITY),
+            str(settings.CARD_QR_VECTOR),
+        )
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def path(self, card_id: uuid.UUID, key: str, suffix: str = ".pdf") -> Path:
+        return self.directory / str(card_id) / f"{key}{suffix}"
+
+    async def get(self, card_id: uuid.UUID, key: str, suffix: str = ".pdf") -> Optional[Path]:
+        path = self.path(card_id, key, suffix)
+        if await run_in_threadpool(path.is_file):
+            return path
+        if self.backend.remote:
+            try:
+                await self.backend.download(self._remote_key(card_id, path.name), path)
+                return path
+            except FileNotFoundError:
+                pass
+        return None
+
+    async def find(self, card_id: uuid.UUID, key_prefix: str, suffix: str = ".pdf") -> Optional[Path]:
+        """Fichier dont la clé commence par `key_prefix` (lien qui ne porte qu'une partie de la clé)."""
+        try:
+            entries = await run_in_threadpool(list, (self.directory / str(card_id)).iterdir())
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.startswith(key_prefix) and entry.name[64:] == suffix: # clé : sha256 en hexadécimal
+                return entry
+        if self.backend.remote:
+            async for remote_key in self.backend.iter_keys(self._remote_key(card_id, key_prefix)):
+                name = remote_key.rsplit("/", 1)[1]
+                if name[64:] == suffix:
+                    return await self.get(card_id, name[:64], suffix)
+        return None
+
+    async def put(self, card_id: uuid.UUID, key: str, data: bytes, suffix: str = ".pdf") -> Path:
+        path = self.path(card_id, key, suffix)
+        await run_in_threadpool(self._write, path, key, data)
+        if self.backend.remote:
+            await self.backend.put_file(self._remote_key(card_id, path.name), path, mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+            async for remote_key in self.backend.iter_keys(self._remote_key(card_id, "")):
+                if not remote_key.rsplit("/", 1)[1].startswith(key):
+                    await self.backend.delete(remote_key)
+        return path
+
+    async def invalidate(self, card_id: uuid.UUID) -> None:
+        await run_in_threadpool(shutil.rmtree, self.directory / str(card_id), ignore_errors=True)
+        if self.backend.remote:
+            async for remote_key in self.backend.iter_keys(self._remote_key(card_id, "")):
+                await self.backend.delete(remote_key)
+
+    @staticmethod
+    def _write(path: Path, key: str, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier tronqué
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        # Fichiers rendus pour une ancienne version de la carte
+        for stale in path.parent.iterdir():
+            if not stale.name.startswith(key) and stale.suffix != ".tmp":
+                stale.unlink(missing_ok=True)
+
+    @staticmethod
+    def _remote_key(card_id: uuid.UUID, name: str) -> str:
+        return f"card_pdfs/{card_id}/{name}"
+
+
+card_pdf_cache = CardPdfCache(settings.CARD_PDF_CACHE_DIR, storage)
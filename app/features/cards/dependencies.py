@@ -4,6 +4,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.features.cards.repository import CardRepository
 from app.features.cards.services import CardService
+from app.features.outbox.dependencies import get_email_outbox_service
+from app.features.outbox.repository import EmailOutboxRepository
+from app.features.outbox.services import EmailOutboxService
 
-def get_cards_service(db: AsyncSession = Depends(get_db)) -> CardService:
-    return CardService(CardRepository(db))
\ No newline at end of file
+def get_cards_service(
+    db: AsyncSession = Depends(get_db),
+    outbox: EmailOutboxService = Depends(get_email_outbox_service),
+) -> CardService:
+    return CardService(CardRepository(db), outbox)
+
+def build_cards_service(db: AsyncSession) -> CardService:
+    """Service sur une session ouverte à la main (réponses en streaming)."""
+    return CardService(CardRepository(db), EmailOutboxService(EmailOutboxRepository(db)))
\ No newline at end of file
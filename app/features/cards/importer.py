@@ -0,0 +1,131 @@
+# app/features/cards/importer.py
+import csv
+import io
+import zipfile
+from pathlib import PurePosixPath
+from typing import IO, Any, Iterator, Optional
+
+# Colonnes reconnues dans le fichier d'import (en plus de celles de CreateCardSchema)
+PHOTO_COLUMN = "photo"
+TABLE_EXTENSIONS = (".csv", ".xlsx")
+
+
+class CardImportFileError(ValueError):
+    """Fichier d'import illisible ou dans un format non supporté."""
+
+
+class CardImportSource:
+    """Lignes d'un fichier d'import CSV / XLSX, ou d'une archive ZIP contenant
+    le tableau et les photos des membres."""
+
+    def __init__(self, filename: str, file: IO[bytes]):
+        self.filename = filename or ""
+        self.file = file
+        self.archive: Optional[zipfile.ZipFile] = None
+        self._photos: dict[str, str] = {}
+
+    def rows(self) -> Iterator[tuple[int, dict[str, Any]]]:
+        """Renvoie (numéro de ligne dans le tableur, valeurs) ; l'en-tête est la ligne 1."""
+        name = self.filename.lower()
+        if name.endswith(".zip"):
+            yield from self._zip_rows()
+        elif name.endswith(".csv"):
+            yield from self._csv_rows(self.file)
+        elif name.endswith(".xlsx"):
+            yield from self._xlsx_rows(self.file)
+        else:
+            raise CardImportFileError("Unsupported file type, expected .csv, .xlsx or .zip")
+
+    def has_photo(self, photo: str) -> bool:
+        return self._photo_member(photo) is not None
+
+    def read_photo(self, photo: str) -> bytes:
+        member = self._photo_member(photo)
+        if self.archive is None or member is None:
+            raise FileNotFoundError(photo)
+        return self.archive.read(member)
+
+    def close(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+
+    def _photo_member(self, photo: str) -> Optional[str]:
+        return self._photos.get(PurePosixPath(photo).name.lower())
+
+    def _zip_rows(self) -> Iterator[tuple[int, dict[str, Any]]]:
+        try:
+            self.archive = zipfile.ZipFile(self.file)
+        except zipfile.BadZipFile:
+            raise CardImportFileError("Invalid ZIP archive")
+
+        tables = []
+        for info in self.archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            if info.filename.lower().endswith(TABLE_EXTENSIONS):
+                tables.append(info.filename)
+            else:
+                self._photos[PurePosixPath(info.filename).name.lower()] = info.filename
+        if len(tables) != 1:
+            raise CardImportFileError("The ZIP archive must contain exactly one .csv or .xlsx file")
+
+        with self.archive.open(tables[0]) as table:
+            if tables[0].lower().endswith(".csv"):
+                yield from self._csv_rows(table)
+            else:
+                # openpyxl a besoin d'un fichier navigable
+                yield from self._xlsx_rows(io.BytesIO(table.read()))
+
+    @staticmethod
+    def _csv_rows(file: IO[bytes]) -> Iterator[tuple[int, dict[str, Any]]]:
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            sample = text.read(4096)
+            text.seek(0)
+            try:
+                dialect: Any = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            for line, row in enumerate(csv.DictReader(text, dialect=dialect), start=2):
+                yield line, _clean(row)
+        except UnicodeDecodeError:
+            raise CardImportFileError("CSV files must be UTF-8 encoded")
+        finally:
+            text.detach()
+
+    @staticmethod
+    def _xlsx_rows(file: IO[bytes]) -> Iterator[tuple[int, dict[str, Any]]]:
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise CardImportFileError("XLSX import is not available on this server")
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except Exception:
+            raise CardImportFileError("Invalid XLSX file")
+        try:
+            values = workbook.active.iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else "" for cell in next(values, ())]
+            for line, cells in enumerate(values, start=2):
+                if all(cell is None for cell in cells):
+                    continue
+                yield line, _clean(dict(zip(header, cells)))
+        finally:
+            workbook.close()
+
+
+def _clean(row: dict[Any, Any]) -> dict[str, Any]:
+    """Normalise les en-têtes et traite les cellules vides comme absentes."""
+    cleaned: dict[str, Any] = {}
+    for key, value in row.items():
+        if not key:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Les tableurs stockent les numéros de téléphone comme des nombres
+            value = str(int(value)) if float(value).is_integer() else str(value)
+        if value is None or value == "":
+            continue
+        cleaned[str(key).strip().lower()] = value
+    return cleaned
@@ -1,11 +1,18 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, Integer, String, UUID, func
-from app.core.database import Base
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, UUID, func
+from app.core.database import Base, byte_ordered_string
 import uuid
 
 class CardModel(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # Keyset pagination filtrée : WHERE department_id = ? AND number > ? ORDER BY number
+        Index("ix_cards_department_id_number", "department_id", "number"),
+        Index("ix_cards_municipality_id_number", "municipality_id", "number"),
+        # Parcours trié des photos référencées (nettoyage du stockage, voir photo_gc)
+        Index("ix_cards_image_url", "image_url"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     creator_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -15,7 +22,8 @@ class CardModel(Base):
     status: Mapped[str] = mapped_column(String(255), nullable=False, default="Membre") # Membre, Coordinateur, Sécrétaire, Président, ...
     contact: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     email: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
-    image_url: Mapped[str] = mapped_column(String(255), nullable=True)
+    # Même ordre que la liste des fichiers du stockage (parcours du nettoyage, voir photo_gc)
+    image_url: Mapped[str] = mapped_column(byte_ordered_string(255), nullable=True)
     qr_code_url: Mapped[str] = mapped_column(String(), nullable=True)
     department_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("departments.id"), nullable=False)
     municipality_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("municipalities.id"), nullable=False)
@@ -28,4 +36,9 @@ class CardModel(Base):
     creator = relationship("UserModel", back_populates="cards", lazy="joined")
     department = relationship("DepartmentModel", back_populates="cards", lazy="joined")
     municipality = relationship("MunicipalityModel", back_populates="cards", lazy="joined")
-    
\ No newline at end of file
+    
+class CardNumberCounterModel(Base):
+    __tablename__ = "card_number_counters"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0) # Dernier numéro distribué
@@ -0,0 +1,376 @@
+# app/features/cards/photo_gc.py
+# Nettoyage et contrôle du stockage des photos de membre.
+#
+# Trois flux triés sont parcourus ensemble, par pages, comme une fusion :
+#   - les URL de photo des cartes (avec leur nombre de cartes) ;
+#   - les lignes de stored_files (compteurs de références) ;
+#   - la liste des fichiers du stockage sous PROFILE_IMAGE_DIR.
+# Les fichiers sont regroupés par photo ("<h>.jpg" et ses déclinaisons
+# "<h>-thumb.webp", ..., <h> empreinte ou uuid des anciens envois) ; les
+# autres noms (anciens envois gardés sous le nom du fichier envoyé) sont
+# chacun une photo. La mémoire utilisée ne dépend que de la taille des pages,
+# pas du nombre de fichiers. Sont signalés : les URL sans fichier, les
+# compteurs faux, les photos sans déclinaisons (tâche de fond perdue), les
+# fichiers qu'aucune carte ne référence ; ces derniers (et les restes
+# d'écritures ou de suppressions interrompues) sont supprimés s'ils sont plus
+# vieux que le délai de grâce, les déclinaisons manquantes sont reproduites.
+#
+#   python -m app.features.cards.photo_gc [--delete] [--grace-hours 24]
+#
+# ou en tâche de fond toutes les STORAGE_GC_INTERVAL_HOURS (un seul nœud suffit).
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import re
+from typing import AsyncIterator, Generic, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.storage.backends import StorageBackend, StorageEntry, storage
+from app.core.storage.content import ContentStore, StoredFileModel, content_store
+from app.features.cards.photos import ORIGINAL_NAME, PHOTO_DERIVATIVES, derivative_path
+from app.features.cards.repository import CardRepository
+from app.features.cards.services import generate_photo_derivatives
+
+# Noms regroupés avec leurs déclinaisons : empreinte du contenu, ou uuid des anciens envois
+GROUPED_NAME = re.compile(r"^(?:[0-9a-f]{64}|[0-9a-f]{32})(?=[-.])")
+DERIVATIVE_SUFFIX = re.compile(r"^-(?:thumb|list|print\d+q\d+)\.[a-z]+$")
+
+# Problèmes détaillés dans le rapport (les compteurs, eux, sont complets)
+SAMPLE_LIMIT = 50
+
+T = TypeVar("T")
+
+
+@dataclass
+class PhotoGcReport:
+    files: int = 0
+    bytes: int = 0
+    photos: int = 0 # photos référencées et présentes
+    dangling: int = 0 # URL de carte sans fichier
+    foreign: int = 0 # URL hors de PROFILE_IMAGE_DIR (autre domaine, ...)
+    orphans: int = 0 # photos (avec leurs déclinaisons) qu'aucune carte ne référence
+    orphan_bytes: int = 0
+    recent_orphans: int = 0 # orphelins gardés, plus récents que le délai de grâce
+    leftovers: int = 0 # fichiers temporaires ou mis de côté, abandonnés
+    stale_records: int = 0 # lignes stored_files sans fichier
+    refcount_mismatches: int = 0
+    missing_derivatives: int = 0 # photos référencées sans leurs miniatures
+    deleted: int = 0
+    repaired: int = 0
+    samples: list[str] = field(default_factory=list)
+
+    def note(self, message: str) -> None:
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append(message)
+
+
+class _Cursor(Generic[T]):
+    """Flux trié dont on peut regarder l'élément courant avant de le consommer."""
+
+    def __init__(self, items: AsyncIterator[T]):
+        self.items = items
+        self.current: Optional[T] = None
+
+    async def advance(self) -> Optional[T]:
+        previous = self.current
+        self.current = await anext(self.items, None)
+        return previous
+
+
+def _group(key: str) -> str:
+    """Photo à laquelle appartient un fichier : "<dossier>/<h>-" pour "<h>.jpg" comme pour
+    "<h>-thumb.webp", la clé elle-même pour un autre nom ("photo-2023.jpg").
+
+    Avec le "-" final, les groupes se comparent comme les clés : rien ne se
+    place entre "<h>-..." et "<h>.…" ("-" et "." se suivent).
+    """
+    directory, _, name = key.rpartition("/")
+    match = GROUPED_NAME.match(name)
+    return f"{directory}/{match.group(0)}-" if match else key
+
+
+def _is_derivative(key: str, group: str) -> bool:
+    return key != group and DERIVATIVE_SUFFIX.match(key[len(group) - 1:]) is not None
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite rend des dates sans fuseau (UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class PhotoGarbageCollector:
+
+    def __init__(
+        self,
+        directory: Path,
+        grace: timedelta,
+        delete: bool = False,
+        backend: StorageBackend = storage,
+        store: ContentStore = content_store,
+        batch_size: int = 1000,
+    ):
+        self.directory = directory
+        self.grace = grace
+        self.delete = delete
+        self.backend = backend
+        self.store = store
+        self.batch_size = batch_size
+
+    async def run(self) -> PhotoGcReport:
+        if self.delete:
+            # DOMAIN_URL modifié, ... : les photos de ces cartes paraîtraient orphelines
+            url_prefix = f"{settings.DOMAIN_URL}/{self.directory.as_posix()}"
+            async with AsyncSessionLocal() as db:
+                foreign = await CardRepository(db).count_image_urls_outside(f"{url_prefix}/", f"{url_prefix}0")
+            if foreign:
+                raise RuntimeError(f"{foreign} carte(s) ont une photo hors de {url_prefix}/ : nettoyage annulé, vérifier DOMAIN_URL")
+        self.report = PhotoGcReport()
+        self.cutoff = datetime.now(timezone.utc) - self.grace
+        self.references = _Cursor(self._iter_references())
+        self.records = _Cursor(self.store.iter_records(self.directory, self.batch_size))
+        await self.references.advance()
+        await self.records.advance()
+
+        group, entries = None, []
+        async for entry in self.backend.iter_entries(f"{self.directory.as_posix()}/"):
+            self.report.files += 1
+            self.report.bytes += entry.size
+            name = entry.key.rpartition("/")[2]
+            if name.startswith(".") or name.endswith(".tmp"):
+                await self._check_leftover(entry)
+                continue
+            entry_group = _group(entry.key)
+            if entry_group != group:
+                if entries:
+                    await self._check_photo(group, entries)
+                if group is not None and entry_group < group:
+                    raise RuntimeError(f"Liste du stockage mal triée : {entry.key} après {group}")
+                group, entries = entry_group, []
+            entries.append(entry)
+        if entries:
+            await self._check_photo(group, entries)
+        await self._check_missing(None)
+        return self.report
+
+    async def _iter_references(self) -> AsyncIterator[tuple[str, int]]:
+        """(clé, nombre de cartes) des photos référencées, triées ; les URL étrangères sont seulement comptées."""
+        url_prefix = f"{settings.DOMAIN_URL}/"
+        key_prefix = f"{self.directory.as_posix()}/"
+        after, previous = None, None
+        while True:
+            async with AsyncSessionLocal() as db:
+                page = await CardRepository(db).get_image_url_counts(after, self.batch_size)
+            for url, count in page:
+                key = url[len(url_prefix):] if url.startswith(url_prefix) else None
+                if key is None or not key.startswith(key_prefix):
+                    self.report.foreign += count
+                    self.report.note(f"URL hors du stockage ({count} carte(s)) : {url}")
+                    continue
+                if previous is not None and key < previous:
+                    raise RuntimeError(f"URL de photo mal triées : {key} après {previous}")
+                previous = key
+                yield key, count
+            if len(page) < self.batch_size:
+                return
+            after = page[-1][0]
+
+    async def _check_missing(self, group: Optional[str]) -> None:
+        """Références et lignes stored_files des photos antérieures à `group` (toutes si None) : aucun fichier."""
+        def pending(cursor: _Cursor) -> Optional[str]:
+            if cursor.current is None:
+                return None
+            key = cursor.current[0] if isinstance(cursor.current, tuple) else cursor.current.path
+            return key if group is None or _group(key) < group else None
+
+        while True:
+            reference_key, record_key = pending(self.references), pending(self.records)
+            if reference_key is None and record_key is None:
+                return
+            key = min(k for k in (reference_key, record_key) if k is not None)
+            count = (await self.references.advance())[1] if reference_key == key else 0
+            record: Optional[StoredFileModel] = await self.records.advance() if record_key == key else None
+            if count:
+                self.report.dangling += 1
+                self.report.note(f"Photo introuvable ({count} carte(s)) : {key}")
+            if record is not None:
+                self.report.stale_records += 1
+                if not count and self.delete and _utc(record.updated_at) < self.cutoff:
+                    await self.store.discard(key, self.cutoff)
+                    self.report.repaired += 1
+
+    async def _check_photo(self, group: str, entries: list[StorageEntry]) -> None:
+        await self._check_missing(group)
+        references: dict[str, int] = {}
+        while self.references.current is not None and _group(self.references.current[0]) == group:
+            key, count = await self.references.advance()
+            references[key] = count
+        records: dict[str, StoredFileModel] = {}
+        while self.records.current is not None and _group(self.records.current.path) == group:
+            record = await self.records.advance()
+            records[record.path] = record
+
+        originals = [entry.key for entry in entries if not _is_derivative(entry.key, group)]
+        for key, count in references.items():
+            if key not in originals:
+                self.report.dangling += 1
+                self.report.note(f"Photo introuvable ({count} carte(s)) : {key}")
+        for key, record in records.items():
+            if key not in originals:
+                # Déclinaisons seules : l'original a disparu
+                self.report.stale_records += 1
+                if key not in references and self.delete and _utc(record.updated_at) < self.cutoff:
+                    await self.store.discard(key, self.cutoff)
+                    self.report.repaired += 1
+        if any(key in references for key in originals):
+            self.report.photos += 1
+            for key in originals:
+                await self._check_refcount(key, references.get(key, 0), records.get(key))
+            await self._check_derivatives(entries, [key for key in originals if key in references])
+            return
+
+        self.report.orphans += 1
+        self.report.orphan_bytes += sum(entry.size for entry in entries)
+        if max(entry.modified_at for entry in entries) >= self.cutoff:
+            self.report.recent_orphans += 1 # envoi en cours, ou carte pas encore enregistrée
+            return
+        self.report.note(f"Photo sans carte : {(originals or [entries[0].key])[0]} ({len(entries)} fichier(s))")
+        if not self.delete:
+            return
+        if originals:
+            # Supprime aussi les déclinaisons ; gardé si un envoi identique vient de reprendre une référence
+            for key in originals:
+                if await self.store.discard(key, self.cutoff):
+                    self.report.deleted += 1
+                else:
+                    self.report.recent_orphans += 1
+        else:
+            for entry in entries:
+                await self.backend.delete(entry.key)
+            self.report.deleted += 1
+
+    async def _check_refcount(self, key: str, count: int, record: Optional[StoredFileModel]) -> None:
+        # Pas de ligne : fichier d'avant le stockage par contenu, non compté
+        if record is None or record.refcount == count or _utc(record.updated_at) >= self.cutoff:
+            return
+        self.report.refcount_mismatches += 1
+        self.report.note(f"Compteur faux : {key} ({record.refcount} au lieu de {count})")
+        if self.delete and await self.store.set_refcount(key, count, self.cutoff):
+            self.report.repaired += 1
+
+    async def _check_derivatives(self, entries: list[StorageEntry], originals: list[str]) -> None:
+        """Miniatures d'une photo référencée ; celles d'une tâche de fond perdue sont reproduites."""
+        keys = {entry.key for entry in entries}
+        modified_at = {entry.key: entry.modified_at for entry in entries}
+        for key in originals:
+            name = key.rpartition("/")[2]
+            # Envoi récent : la tâche de fond est peut-être encore en cours
+            if not ORIGINAL_NAME.match(name) or modified_at[key] >= self.cutoff:
+                continue
+            path = Path(key)
+            missing = [derivative for derivative in PHOTO_DERIVATIVES if derivative_path(path, derivative).as_posix() not in keys]
+            if not missing:
+                continue
+            self.report.missing_derivatives += 1
+            self.report.note(f"Déclinaisons manquantes ({', '.join(missing)}) : {key}")
+            if not self.delete:
+                continue
+            try:
+                await generate_photo_derivatives(f"{settings.DOMAIN_URL}/{key}")
+            except Exception as e:
+                self.report.note(f"Déclinaisons non produites : {key} ({e})")
+            else:
+                self.report.repaired += 1
+
+    async def _check_leftover(self, entry: StorageEntry) -> None:
+        """Fichier temporaire (écriture interrompue) ou mis de côté (suppression interrompue)."""
+        if entry.modified_at >= self.cutoff:
+            return
+        self.report.leftovers += 1
+        if not self.delete:
+            return
+        if entry.key.endswith(".tmp"):
+            await self.backend.delete(entry.key)
+        else:
+            await self.store.recover(entry.key)
+
+
+async def collect_photo_garbage(delete: bool = True, grace: Optional[timedelta] = None) -> PhotoGcReport:
+    collector = PhotoGarbageCollector(
+        settings.PROFILE_IMAGE_DIR,
+        grace if grace is not None else timedelta(hours=settings.STORAGE_GC_GRACE_HOURS),
+        delete=delete,
+    )
+    return await collector.run()
+
+
+def format_report(report: PhotoGcReport, delete: bool) -> str:
+    lines = [
+        f"Fichiers parcourus : {report.files} ({report.bytes / 1024 / 1024:.1f} Mo)",
+        f"Photos référencées : {report.photos}",
+        f"URL sans fichier : {report.dangling}, hors du stockage : {report.foreign}",
+        f"Photos sans carte : {report.orphans} ({report.orphan_bytes / 1024 / 1024:.1f} Mo), dont récentes (gardées) : {report.recent_orphans}",
+        f"Fichiers abandonnés : {report.leftovers}",
+        f"Lignes stored_files sans fichier : {report.stale_records}, compteurs faux : {report.refcount_mismatches}",
+        f"Photos sans déclinaisons : {report.missing_derivatives}",
+    ]
+    if delete:
+        lines.append(f"Supprimées : {report.deleted}, corrections : {report.repaired}")
+    else:
+        lines.append("Simulation : rien n'a été supprimé (--delete pour nettoyer)")
+    lines.extend(f"  - {sample}" for sample in report.samples)
+    return "\n".join(lines)
+
+
+class PhotoGcWorker:
+    """Passe de nettoyage périodique, démarrée par le lifespan si STORAGE_GC_INTERVAL_HOURS > 0."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="photo-gc")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.STORAGE_GC_INTERVAL_HOURS * 3600)
+            try:
+                report = await collect_photo_garbage()
+                print(format_report(report, delete=True))
+            except Exception as e:
+                print(f"Erreur lors du nettoyage des photos : {e}")
+
+
+photo_gc_worker = PhotoGcWorker()
+
+
+async def main() -> None:
+    # Modèles liés à CardModel, chargés d'habitude avec les routes (app.main)
+    import app.features.users.models  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="Contrôle et nettoyage du stockage des photos de membre")
+    parser.add_argument("--delete", action="store_true", help="supprimer les fichiers orphelins et réparer (sinon simple rapport)")
+    parser.add_argument("--grace-hours", type=float, default=settings.STORAGE_GC_GRACE_HOURS, help="âge minimal d'un fichier orphelin supprimé")
+    args = parser.parse_args()
+    try:
+        report = await collect_photo_garbage(args.delete, timedelta(hours=args.grace_hours))
+    finally:
+        await storage.close()
+        await engine.dispose()
+    print(format_report(report, args.delete))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+# app/features/cards/photos.py
+# Déclinaisons des photos de membre, rangées à côté de l'original :
+#   <h>.jpg                 original envoyé (voir app.core.storage.content)
+#   <h>-thumb.webp          avatar carré (listes compactes)
+#   <h>-list.webp           vignette pour les listes et fiches
+#   <h>-print300q85.jpg     photo à la taille imprimée (PDF), .png si transparence
+# Elles sont produites en arrière-plan après l'enregistrement de la carte
+# (renderer.render_photo_derivatives), et reproduites par le nettoyage du
+# stockage si cette tâche n'a pas abouti (voir photo_gc). Elles sont supprimées
+# avec l'original.
+# Leurs URL sont déduites du nom de l'original, sans accès au stockage : tant
+# qu'une déclinaison n'existe pas, /static renvoie vers l'original (voir
+# app.core.static).
+from pathlib import Path
+import re
+from typing import Optional
+
+from app.core.config import settings
+from app.core.helper import AppHelper
+
+# Originaux qui ont des déclinaisons : empreinte du contenu, ou uuid des anciens envois
+ORIGINAL_NAME = re.compile(r"^[0-9a-f]{32,64}\.")
+
+# Côté en pixels (2x la taille affichée, pour les écrans haute densité)
+PHOTO_DERIVATIVES = {
+    "thumb": 96,
+    "list": 320,
+}
+
+
+def derivative_path(photo_path: Path, name: str) -> Path:
+    return photo_path.with_name(f"{photo_path.stem}-{name}.webp")
+
+
+def print_photo_paths(photo_path: Path, dpi: int, quality: int) -> tuple[Path, Path]:
+    """Emplacements possibles (JPEG, PNG) de la photo à la taille imprimée pour ces réglages."""
+    stem = f"{photo_path.stem}-print{dpi}q{quality}"
+    return photo_path.with_name(f"{stem}.jpg"), photo_path.with_name(f"{stem}.png")
+
+
+def photo_derivative_url(image_url: Optional[str], name: str) -> Optional[str]:
+    """URL de la déclinaison `name` ("thumb", "list", "print") ; l'original pour une photo sans déclinaisons."""
+    if not image_url:
+        return None
+    photo_path = AppHelper.get_path_from_url(image_url)
+    if not image_url.startswith(f"{settings.DOMAIN_URL}/") or not ORIGINAL_NAME.match(photo_path.name):
+        return image_url
+    if name == "print":
+        # Annoncée en JPEG : /static renvoie vers la variante PNG (photo transparente) si c'est elle qui existe
+        derivative = print_photo_paths(photo_path, settings.CARD_PRINT_DPI, settings.CARD_PHOTO_JPEG_QUALITY)[0]
+    else:
+        derivative = derivative_path(photo_path, name)
+    return image_url.rsplit("/", 1)[0] + "/" + derivative.name
@@ -0,0 +1,482 @@
+# app/features/cards/renderer.py
+# Rendu des cartes de membre. Tout ce module est synchrone et ne dépend que de
+# données simples (CardRenderData) : il s'exécute dans le pool de rendu
+# (voir app.core.executor), hors de la boucle d'événements.
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+from io import BytesIO
+import os
+from pathlib import Path
+import tempfile
+from typing import Optional
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from reportlab import rl_config
+from reportlab.pdfbase.pdfmetrics import getFont, registerFont, stringWidth
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+# from reportlab.lib.pagesizes import A8, landscape # A8 est une petite taille, comme une carte de crédit
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+import qrcode
+
+from app.core.config import settings
+from app.features.cards.photos import PHOTO_DERIVATIVES, derivative_path, print_photo_paths
+
+
+# Définir les dimensions de la carte (ex: format carte de crédit 85.6mm x 53.98mm)
+CARD_WIDTH, CARD_HEIGHT = 85.6 * mm, 53.98 * mm
+
+# Mise en page
+FONT_SIZE = 8
+PHOTO_SIZE = 20 * mm # Taille de la photo
+PHOTO_X = CARD_WIDTH - PHOTO_SIZE - (8 * mm)
+PHOTO_Y = CARD_HEIGHT - PHOTO_SIZE - (8 * mm)
+TEXT_START_X = 7 * mm
+TEXT_START_Y = CARD_HEIGHT - (15 * mm)
+QR_CODE_SIZE = 15 * mm
+QR_X = CARD_WIDTH - QR_CODE_SIZE - (7 * mm)
+QR_Y = 4 * mm
+
+# Libellés fixes : (champ, libellé, x, y). La valeur est écrite juste après le libellé.
+CARD_LABELS = (
+    ("number", "N°: ", PHOTO_X, TEXT_START_Y + (8 * mm)),
+    ("first_name", "Nom: ", TEXT_START_X, TEXT_START_Y),
+    ("last_name", "Prénom: ", TEXT_START_X, TEXT_START_Y - (5 * mm)),
+    ("status", "Statut: ", TEXT_START_X, TEXT_START_Y - (10 * mm)),
+    ("contact", "Contact: ", TEXT_START_X, TEXT_START_Y - (15 * mm)),
+    ("department_name", "Département: ", TEXT_START_X, TEXT_START_Y - (20 * mm)), # En bas à gauche
+    ("municipality_name", "Commune: ", TEXT_START_X, TEXT_START_Y - (25 * mm)),
+)
+STATIC_FORM_NAME = "CardStaticLayer"
+
+# Imposition pour l'imprimeur : cartes bord à bord sur A4 portrait, traits de coupe dans les marges
+SHEET_WIDTH, SHEET_HEIGHT = A4
+SHEET_COLUMNS, SHEET_ROWS = 2, 5
+SHEET_MARGIN_X = (SHEET_WIDTH - SHEET_COLUMNS * CARD_WIDTH) / 2
+SHEET_MARGIN_Y = (SHEET_HEIGHT - SHEET_ROWS * CARD_HEIGHT) / 2
+CROP_MARK_OFFSET = 2 * mm
+CROP_MARK_LENGTH = 5 * mm
+
+# Flux d'images en binaire : pas d'encodage ASCII85 (+25 % de taille, et coûteux
+# à produire) ; nos PDF ne transitent jamais par un canal texte.
+rl_config.useA85 = 0
+
+
+@dataclass(frozen=True)
+class CardRenderData:
+    """Instantané picklable de ce qui est imprimé sur une carte."""
+    number: int
+    first_name: str
+    last_name: str
+    status: str
+    contact: str
+    department_name: str
+    municipality_name: str
+    qr_code_url: Optional[str]
+    photo_path: Optional[str]
+
+
+def _make_qr_code(data: str) -> qrcode.QRCode:
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.ERROR_CORRECT_L,
+        box_size=10, # Taille de chaque "boîte" du QR code (rendu raster)
+        border=2,    # Épaisseur de la bordure
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def _generate_qr_code_image(data: str) -> ImageReader:
+    """Génère une image QR Code à partir des données fournies."""
+    img = _make_qr_code(data).make_image(fill_color="black", back_color="white")
+
+    img_buffer = BytesIO()
+    img.save(img_buffer, "PNG")
+    img_buffer.seek(0)
+    return ImageReader(img_buffer)
+
+
+def _draw_qr_code_vector(p: canvas.Canvas, data: str, x: float, y: float, size: float) -> None:
+    """Dessine le QR code en vectoriel : net à toute résolution, sans passer par PIL ni PNG."""
+    matrix = _make_qr_code(data).get_matrix() # bordure comprise
+    module = size / len(matrix)
+    p.saveState()
+    p.setFillColorRGB(1, 1, 1)
+    p.rect(x, y, size, size, fill=1, stroke=0)
+    p.setFillColorRGB(0, 0, 0)
+    # Un rectangle par suite horizontale de modules noirs, le tout en un seul chemin
+    path = p.beginPath()
+    for row_index, row in enumerate(matrix):
+        row_y = y + size - (row_index + 1) * module
+        col, width = 0, len(row)
+        while col < width:
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < width and row[col]:
+                col += 1
+            path.rect(x + start * module, row_y, (col - start) * module, module)
+    p.drawPath(path, fill=1, stroke=0)
+    p.restoreState()
+
+
+def _get_member_photo(photo_path: Optional[str]) -> Optional[str]:
+    if not photo_path:
+        return None
+    if not os.path.exists(photo_path):
+        raise FileNotFoundError(photo_path)
+    stat = os.stat(photo_path)
+    try:
+        return _prepare_photo(photo_path, stat.st_size, stat.st_mtime_ns, settings.CARD_PRINT_DPI, settings.CARD_PHOTO_JPEG_QUALITY)
+    except Exception as e:
+        print(f"Erreur lors de la réduction de la photo du membre : {e}")
+        return photo_path
+
+
+@lru_cache(maxsize=256)
+def _prepare_photo(photo_path: str, size: int, mtime_ns: int, dpi: int, quality: int) -> str:
+    """Photo ramenée à la taille imprimée (PHOTO_SIZE à `dpi`), préparée une fois et gardée sur disque.
+
+    Le résultat est un JPEG (PNG si la photo a de la transparence) que reportlab
+    intègre tel quel : ni décodage ni recompression à chaque rendu. Il est
+    normalement déjà produit à l'enregistrement (render_photo_derivatives).
+    """
+    target_px = round(PHOTO_SIZE / 72 * dpi)
+    targets = print_photo_paths(Path(photo_path), dpi, quality)
+    for target in targets:
+        if target.is_file():
+            return str(target)
+
+    with Image.open(photo_path) as image:
+        # Déjà assez petite et en JPEG : rien à gagner, on garde l'original
+        if image.format == "JPEG" and max(image.size) <= target_px and image.mode in ("RGB", "L"):
+            return photo_path
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((target_px, target_px), Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if has_alpha:
+            image, target, options = image.convert("RGBA"), targets[1], {"format": "PNG", "optimize": True}
+        else:
+            image, target, options = image.convert("RGB"), targets[0], {"format": "JPEG", "quality": quality, "optimize": True}
+
+    _save_atomic(image, target, **options)
+    return str(target)
+
+
+def _save_atomic(image: Image.Image, target: Path, **options) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            image.save(tmp, **options)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def render_photo_derivatives(photo_path: str) -> None:
+    """Produit les déclinaisons d'une photo de membre (voir app.features.cards.photos).
+
+    L'image n'est décodée qu'une fois ; chaque taille est réduite à partir de
+    la précédente, la plus grande d'abord.
+    """
+    _get_member_photo(photo_path)
+    targets = {name: derivative_path(Path(photo_path), name) for name in PHOTO_DERIVATIVES}
+    if all(target.is_file() for target in targets.values()):
+        return # Photo déjà envoyée pour une autre carte (même contenu, même fichier)
+    with Image.open(photo_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    for name, size in sorted(PHOTO_DERIVATIVES.items(), key=lambda item: -item[1]):
+        if name == "thumb":
+            # Avatar : recadré au carré, centré
+            derivative = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            derivative = image.copy()
+            derivative.thumbnail((size, size), Image.LANCZOS)
+            image = derivative
+        _save_atomic(derivative, targets[name], format="WEBP", quality=80, method=4)
+
+
+@dataclass(frozen=True)
+class CardTemplate:
+    """Partie fixe de la carte, préparée une fois par processus."""
+    font: str
+    # Fond ré-encodé en JPEG : reportlab l'intègre tel quel (DCTDecode), sans
+    # décoder ni recompresser l'image à chaque carte.
+    background_path: Optional[str]
+    background_version: Optional[tuple[int, int]]
+    label_widths: tuple[float, ...]
+
+
+def _background_version(path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def get_card_template() -> CardTemplate:
+    """Gabarit courant ; reconstruit seulement si le fond ou la police changent."""
+    background = settings.CARD_BACKGROUND_IMAGE_PATH
+    if settings.CARD_FONT_PATH:
+        font = _register_ttf_font(str(settings.CARD_FONT_PATH))
+    else:
+        font = settings.CARD_DEFAULT_FONT + "-Bold"
+    return _build_card_template(background, _background_version(background), font)
+
+
+@lru_cache(maxsize=4)
+def _register_ttf_font(font_path: str) -> str:
+    """Enregistre la police TrueType dans ce processus ; reportlab n'intègre que les glyphes utilisés."""
+    name = f"CardFont-{hashlib.sha256(font_path.encode('utf-8')).hexdigest()[:8]}"
+    registerFont(TTFont(name, font_path))
+    return name
+
+
+@lru_cache(maxsize=4)
+def _build_card_template(background: str, background_version: Optional[tuple[int, int]], font: str) -> CardTemplate:
+    background_path = None
+    if background_version is None:
+        print(f"Attention : Fond d'écran non trouvé à {background}")
+    else:
+        try:
+            background_path = _encode_background(background, background_version)
+        except Exception as e:
+            print(f"Erreur lors du chargement du fond d'écran : {e}")
+    label_widths = tuple(stringWidth(label, font, FONT_SIZE) for _, label, _, _ in CARD_LABELS)
+    return CardTemplate(font=font, background_path=background_path, background_version=background_version, label_widths=label_widths)
+
+
+def _encode_background(background: str, background_version: tuple[int, int]) -> str:
+    digest = hashlib.sha256(f"{background}:{background_version}".encode("utf-8")).hexdigest()[:16]
+    target = Path(settings.CARD_TEMPLATE_DIR) / f"background-{digest}.jpg"
+    if target.is_file():
+        return str(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(background) as image:
+        rgb = image.convert("RGB")
+    # Plusieurs workers peuvent préparer le même fond : écriture atomique
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            rgb.save(tmp, "JPEG", quality=92, optimize=True)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return str(target)
+
+
+def _draw_static_layer(p: canvas.Canvas, template: CardTemplate) -> None:
+    """Fond et libellés, en Form XObject : décrit une fois par document, réutilisable à chaque carte."""
+    p.beginForm(STATIC_FORM_NAME)
+    # 1. Fond d'écran
+    if template.background_path:
+        p.drawImage(template.background_path, 0, 0, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, anchor='c')
+    else:
+        p.setFillColorRGB(0.9, 0.9, 0.9) # Un fond gris clair par défaut
+        p.rect(0,0, CARD_WIDTH, CARD_HEIGHT, fill=1, stroke=0)
+    # Libellés
+    p.setFillColorRGB(1, 1, 1)
+    p.setFont(template.font, FONT_SIZE)
+    for _, label, x, y in CARD_LABELS:
+        p.drawString(x, y, label)
+    p.endForm()
+
+
+def _draw_card(p: canvas.Canvas, card: CardRenderData, template: CardTemplate) -> None:
+    """Dessine une carte à l'origine courante ; la couche fixe doit déjà exister dans le document."""
+    p.doForm(STATIC_FORM_NAME)
+
+    # 2. Photo du membre (Ex: coin supérieur droit)
+    member_photo = _get_member_photo(card.photo_path)
+    if member_photo:
+        try:
+            p.drawImage(member_photo, PHOTO_X, PHOTO_Y, width=PHOTO_SIZE, height=PHOTO_SIZE, preserveAspectRatio=True, mask='auto')
+        except Exception as e:
+            print(f"Erreur lors du dessin de la photo du membre : {e}")
+            p.setFillColorRGB(0.7, 0.7, 0.7)
+            p.rect(PHOTO_X, PHOTO_Y, PHOTO_SIZE, PHOTO_SIZE, fill=1) # Placeholder gris
+
+    # 3. Informations textuelles, à droite des libellés
+    p.setFillColorRGB(1, 1, 1) # Couleur du texte (blanc)
+    p.setFont(template.font, FONT_SIZE)
+    values = {
+        "number": f"{card.number:04d}",
+        "first_name": card.first_name,
+        "last_name": card.last_name,
+        "status": card.status,
+        "contact": card.contact,
+        "department_name": card.department_name,
+        "municipality_name": card.municipality_name,
+    }
+    for (field, _, x, y), label_width in zip(CARD_LABELS, template.label_widths):
+        p.drawString(x + label_width, y, values[field])
+
+    # 4. QR Code (Ex: coin inférieur droit)
+    if card.qr_code_url: # L'URL des données du QR Code
+        try:
+            if settings.CARD_QR_VECTOR:
+                _draw_qr_code_vector(p, card.qr_code_url, QR_X, QR_Y, QR_CODE_SIZE)
+            else:
+                qr_image = _generate_qr_code_image(card.qr_code_url)
+                p.drawImage(qr_image, QR_X, QR_Y, width=QR_CODE_SIZE, height=QR_CODE_SIZE, preserveAspectRatio=True, mask='auto')
+        except Exception as e:
+            print(f"Erreur lors de la génération ou du dessin du QR code : {e}")
+
+
+def render_card_pdf(card: CardRenderData) -> bytes:
+    """Génère la carte de membre en PDF et retourne les bytes."""
+    template = get_card_template()
+    buffer = BytesIO()
+    # Utiliser landscape(A8) ou vos dimensions personnalisées
+    # p = canvas.Canvas(buffer, pagesize=landscape(A8))
+    p = canvas.Canvas(buffer, pagesize=(CARD_WIDTH, CARD_HEIGHT))
+    _draw_static_layer(p, template)
+    _draw_card(p, card, template)
+    p.showPage()
+    p.save()
+
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def _draw_crop_marks(p: canvas.Canvas) -> None:
+    """Traits de coupe dans les marges, dans le prolongement de chaque ligne de découpe."""
+    left, bottom = SHEET_MARGIN_X, SHEET_MARGIN_Y
+    right, top = left + SHEET_COLUMNS * CARD_WIDTH, bottom + SHEET_ROWS * CARD_HEIGHT
+    p.saveState()
+    p.setStrokeColorRGB(0, 0, 0)
+    p.setLineWidth(0.25)
+    lines = []
+    for col in range(SHEET_COLUMNS + 1):
+        x = left + col * CARD_WIDTH
+        lines.append((x, top + CROP_MARK_OFFSET, x, top + CROP_MARK_OFFSET + CROP_MARK_LENGTH))
+        lines.append((x, bottom - CROP_MARK_OFFSET, x, bottom - CROP_MARK_OFFSET - CROP_MARK_LENGTH))
+    for row in range(SHEET_ROWS + 1):
+        y = bottom + row * CARD_HEIGHT
+        lines.append((left - CROP_MARK_OFFSET, y, left - CROP_MARK_OFFSET - CROP_MARK_LENGTH, y))
+        lines.append((right + CROP_MARK_OFFSET, y, right + CROP_MARK_OFFSET + CROP_MARK_LENGTH, y))
+    p.lines(lines)
+    p.restoreState()
+
+
+def render_card_sheets_pdf(cards: list[CardRenderData], target: str) -> list[int]:
+    """Planches A4 prêtes à imprimer (SHEET_COLUMNS x SHEET_ROWS cartes par page), écrites dans `target`.
+
+    Un seul document : le fond (Form XObject) et les photos identiques n'y sont
+    intégrés qu'une fois. Les cartes dont la photo manque ne sont pas imprimées ;
+    leurs numéros sont renvoyés.
+    """
+    template = get_card_template()
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    p = canvas.Canvas(target, pagesize=A4)
+    _draw_static_layer(p, template)
+    skipped = []
+    slot = 0
+    for card in cards:
+        if card.photo_path and not os.path.exists(card.photo_path):
+            skipped.append(card.number)
+            continue
+        if slot == per_page:
+            p.showPage()
+            slot = 0
+        if slot == 0:
+            _draw_crop_marks(p)
+        row, col = divmod(slot, SHEET_COLUMNS)
+        p.saveState()
+        p.translate(SHEET_MARGIN_X + col * CARD_WIDTH, SHEET_HEIGHT - SHEET_MARGIN_Y - (row + 1) * CARD_HEIGHT)
+        _draw_card(p, card, template)
+        p.restoreState()
+        slot += 1
+    p.showPage()
+    p.save()
+    return skipped
+
+
+def render_card_preview(card: CardRenderData, width: int, image_format: str) -> bytes:
+    """Aperçu raster (PNG / WebP) de la carte, même mise en page que le PDF, dessiné directement avec PIL."""
+    scale = width / CARD_WIDTH
+    height = round(CARD_HEIGHT * scale)
+
+    def box(x: float, y: float) -> tuple[int, int]:
+        # Coordonnées PDF (origine en bas à gauche, en points) -> pixels
+        return round(x * scale), round(height - y * scale)
+
+    # Fond et police du gabarit courant en clé des caches : un fichier changé n'est pas resservi
+    template = get_card_template()
+    image = _preview_background(template.background_path, template.background_version, width, height).copy()
+    draw = ImageDraw.Draw(image)
+
+    # Photo du membre, centrée dans son cadre comme avec preserveAspectRatio
+    photo_path = _get_member_photo(card.photo_path)
+    if photo_path:
+        size = round(PHOTO_SIZE * scale)
+        left, top = box(PHOTO_X, PHOTO_Y + PHOTO_SIZE)
+        try:
+            with Image.open(photo_path) as photo:
+                photo = ImageOps.contain(ImageOps.exif_transpose(photo).convert("RGBA"), (size, size), Image.LANCZOS)
+            image.paste(photo, (left + (size - photo.width) // 2, top + (size - photo.height) // 2), photo)
+        except Exception as e:
+            print(f"Erreur lors du dessin de la photo du membre : {e}")
+            draw.rectangle((left, top, left + size, top + size), fill=(179, 179, 179))
+
+    # Libellés et valeurs
+    font = _preview_font(str(settings.CARD_FONT_PATH) if settings.CARD_FONT_PATH else None, round(FONT_SIZE * scale))
+    values = {
+        "number": f"{card.number:04d}",
+        "first_name": card.first_name,
+        "last_name": card.last_name,
+        "status": card.status,
+        "contact": card.contact,
+        "department_name": card.department_name,
+        "municipality_name": card.municipality_name,
+    }
+    for field, label, x, y in CARD_LABELS:
+        draw.text(box(x, y), label + values[field], font=font, fill="white", anchor="ls")
+
+    # QR Code
+    if card.qr_code_url:
+        matrix = _make_qr_code(card.qr_code_url).get_matrix()
+        qr = Image.new("1", (len(matrix), len(matrix)), 1)
+        qr.putdata([0 if module else 1 for row in matrix for module in row])
+        size = round(QR_CODE_SIZE * scale)
+        image.paste(qr.resize((size, size), Image.NEAREST).convert("RGB"), box(QR_X, QR_Y + QR_CODE_SIZE))
+
+    buffer = BytesIO()
+    if image_format == "webp":
+        image.save(buffer, "WEBP", quality=80, method=4)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=8)
+def _preview_background(background_path: Optional[str], background_version: Optional[tuple[int, int]], width: int, height: int) -> Image.Image:
+    image = Image.new("RGB", (width, height), (230, 230, 230)) # Un fond gris clair par défaut
+    if background_path:
+        with Image.open(background_path) as background:
+            background = ImageOps.contain(background.convert("RGB"), (width, height), Image.LANCZOS)
+        image.paste(background, ((width - background.width) // 2, (height - background.height) // 2))
+    return image
+
+
+@lru_cache(maxsize=8)
+def _preview_font(font_path: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    # Police standard : reportlab fournit un Type 1 équivalent, lisible par FreeType
+    font_file = getFont(settings.CARD_DEFAULT_FONT + "-Bold").face.findT1File()
+    if font_file:
+        return ImageFont.truetype(font_file, size)
+    return ImageFont.load_default(size)
@@ -1,16 +1,57 @@
-from typing import Optional
-from sqlalchemy import func, select
-from sqlalchemy.orm import selectinload
+from typing import AsyncIterator, Optional
+from sqlalchemy import Row, Select, func, insert, or_, select
+from sqlalchemy.orm import joinedload, lazyload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.features.cards.allocator import card_number_allocator
 from app.features.cards.models import CardModel
+from app.features.departments.models import DepartmentModel
+from app.features.municipalities.models import MunicipalityModel
+from app.features.cards.schemas import CardBatchSchema, CardFilterSchema
 import uuid
 
+# Paramètres par requête IN (...) : reste sous la limite de SQLite (999 sur les anciennes versions)
+IN_CHUNK_SIZE = 500
+
+# Charge uniquement ce dont CardSchema a besoin : pas de creator, et pas de
+# department.cards / municipality.cards (relations "joined" en cascade).
+def card_list_options() -> tuple:
+    return (
+        lazyload(CardModel.creator),
+        joinedload(CardModel.department).lazyload("*"),
+        joinedload(CardModel.municipality).lazyload("*"),
+    )
+
 class CardRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all(self) -> list[CardModel]:
-        result = await self.db.execute(select(CardModel))
+    @staticmethod
+    def apply_filters(stmt: Select, filters: Optional[CardFilterSchema]) -> Select:
+        if filters is None:
+            return stmt
+        if filters.department_id is not None:
+            stmt = stmt.where(CardModel.department_id == filters.department_id)
+        if filters.municipality_id is not None:
+            stmt = stmt.where(CardModel.municipality_id == filters.municipality_id)
+        if filters.is_active is not None:
+            stmt = stmt.where(CardModel.is_active == filters.is_active)
+        if filters.status is not None:
+            stmt = stmt.where(CardModel.status == filters.status)
+        if filters.creator_id is not None:
+            stmt = stmt.where(CardModel.creator_id == filters.creator_id)
+        return stmt
+
+    async def get_all(self, filters: Optional[CardFilterSchema] = None) -> list[CardModel]:
+        stmt = self.apply_filters(select(CardModel).options(*card_list_options()), filters)
+        result = await self.db.execute(stmt.order_by(CardModel.number))
+        return list(result.unique().scalars().all())
+
+    async def get_page(self, filters: CardFilterSchema, cursor: Optional[int], limit: int) -> list[CardModel]:
+        """Keyset pagination sur `number` : renvoie au plus `limit` cartes après `cursor`."""
+        stmt = self.apply_filters(select(CardModel).options(*card_list_options()), filters)
+        if cursor is not None:
+            stmt = stmt.where(CardModel.number > cursor)
+        result = await self.db.execute(stmt.order_by(CardModel.number).limit(limit))
         return list(result.unique().scalars().all())
     
     async def get_all_by_department_id(self, department_id: uuid.UUID) -> list[CardModel]:
@@ -21,6 +62,72 @@ class CardRepository:
         result = await self.db.execute(select(CardModel).filter(CardModel.municipality_id == municipality_id))
         return list(result.unique().scalars().all())
     
+    async def stream_export_rows(self, filters: CardFilterSchema, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """Curseur côté serveur : lignes plates (pas d'entités ORM), `batch_size` à la fois."""
+        stmt = (
+            select(
+                CardModel.id,
+                CardModel.number,
+                CardModel.first_name,
+                CardModel.last_name,
+                CardModel.status,
+                CardModel.contact,
+                CardModel.email,
+                CardModel.is_active,
+                DepartmentModel.name.label("department"),
+                MunicipalityModel.name.label("municipality"),
+                CardModel.image_url,
+                CardModel.created_at,
+            )
+            .join(DepartmentModel, DepartmentModel.id == CardModel.department_id)
+            .join(MunicipalityModel, MunicipalityModel.id == CardModel.municipality_id)
+            .order_by(CardModel.number)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(self.apply_filters(stmt, filters))
+        async for partition in result.partitions():
+            for row in partition:
+                yield row
+
+    async def stream_batch(self, batch: CardBatchSchema, batch_size: int = 200) -> AsyncIterator[CardModel]:
+        """Cartes d'un lot (avec département et commune), lues par paquets via un curseur serveur."""
+        stmt = self.apply_filters(
+            select(CardModel).options(*card_list_options()),
+            CardFilterSchema(department_id=batch.department_id, municipality_id=batch.municipality_id, is_active=batch.is_active),
+        )
+        if not batch.card_ids:
+            result = await self.db.stream_scalars(stmt.order_by(CardModel.number).execution_options(yield_per=batch_size))
+            async for card in result:
+                yield card
+            return
+        # Identifiants par paquets, rangés d'abord par numéro : chaque paquet lu continue le précédent
+        numbered = []
+        for start in range(0, len(batch.card_ids), IN_CHUNK_SIZE):
+            result = await self.db.execute(
+                select(CardModel.number, CardModel.id).where(CardModel.id.in_(batch.card_ids[start:start + IN_CHUNK_SIZE]))
+            )
+            numbered.extend(result.all())
+        ids = [id for _, id in sorted(numbered)]
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = stmt.where(CardModel.id.in_(ids[start:start + IN_CHUNK_SIZE])).order_by(CardModel.number)
+            result = await self.db.stream_scalars(chunk.execution_options(yield_per=batch_size))
+            async for card in result:
+                yield card
+
+    async def get_image_url_counts(self, after: Optional[str], limit: int) -> list[tuple[str, int]]:
+        """Page (keyset) des URL de photo référencées, triées octet par octet (collation de la colonne), avec le nombre de cartes de chacune."""
+        stmt = select(CardModel.image_url, func.count()).where(CardModel.image_url.is_not(None))
+        if after is not None:
+            stmt = stmt.where(CardModel.image_url > after)
+        result = await self.db.execute(stmt.group_by(CardModel.image_url).order_by(CardModel.image_url).limit(limit))
+        return [(url, count) for url, count in result]
+
+    async def count_image_urls_outside(self, low: str, high: str) -> int:
+        """Nombre de cartes dont l'URL de photo n'est pas dans [low, high[."""
+        return await self.db.scalar(
+            select(func.count()).where(CardModel.image_url.is_not(None), or_(CardModel.image_url < low, CardModel.image_url >= high))
+        )
+
     async def get_by_id(self, id: uuid.UUID) -> CardModel | None:
         result = await self.db.execute(select(CardModel).filter(CardModel.id == id))
         return result.unique().scalars().first()
@@ -29,10 +136,7 @@ class CardRepository:
         stmt = (
             select(CardModel)
             .where(CardModel.id == id)
-            .options(
-                selectinload(CardModel.department), # Eager load department
-                selectinload(CardModel.municipality) # Eager load municipality
-            )
+            .options(*card_list_options()) # department et municipality seulement
         )
         result = await self.db.execute(stmt)
         return result.unique().scalars().one_or_none()
@@ -42,14 +146,59 @@ class CardRepository:
         res = await self.db.execute(stmt)
         return res.scalar_one_or_none()
     
-    async def get_last_card_number(self) -> Optional[int]:
-        result = await self.db.execute(select(func.max(CardModel.number)))
-        return result.scalar_one_or_none()
+    async def allocate_card_numbers(self, count: int = 1) -> int:
+        """Réserve `count` numéros de carte consécutifs (hors transaction de la session) et renvoie le premier."""
+        # L'allocateur prend sa propre connexion : on rend d'abord celle de la session
+        # (lectures seulement jusqu'ici), sinon des créations simultanées épuisent le pool.
+        if self.db.in_transaction():
+            await self.db.commit()
+        return await card_number_allocator.allocate(self.db.bind, count)
         
+    async def get_taken_emails_and_contacts(self, emails: list[str], contacts: list[str]) -> tuple[set[str], set[str]]:
+        taken_emails: set[str] = set()
+        taken_contacts: set[str] = set()
+        # Par paquets pour rester sous la limite de paramètres de SQLite
+        for start in range(0, max(len(emails), len(contacts)), IN_CHUNK_SIZE):
+            emails_chunk, contacts_chunk = emails[start:start + IN_CHUNK_SIZE], contacts[start:start + IN_CHUNK_SIZE]
+            if emails_chunk:
+                result = await self.db.execute(select(CardModel.email).where(CardModel.email.in_(emails_chunk)))
+                taken_emails.update(result.scalars())
+            if contacts_chunk:
+                result = await self.db.execute(select(CardModel.contact).where(CardModel.contact.in_(contacts_chunk)))
+                taken_contacts.update(result.scalars())
+        return taken_emails, taken_contacts
+
+    async def get_municipality_departments(self, municipality_ids: set[uuid.UUID]) -> dict[uuid.UUID, uuid.UUID]:
+        """municipality_id -> department_id pour les communes existantes."""
+        if not municipality_ids:
+            return {}
+        result = await self.db.execute(
+            select(MunicipalityModel.id, MunicipalityModel.department_id).where(MunicipalityModel.id.in_(municipality_ids))
+        )
+        return {row.id: row.department_id for row in result}
+
+    async def bulk_insert(self, values: list[dict]) -> None:
+        """INSERT multi-lignes en une seule transaction (pas d'objets ORM, pas de refresh)."""
+        try:
+            await self.db.execute(insert(CardModel), values)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+    async def get_municipality_with_department(self, municipality_id: uuid.UUID) -> Optional[MunicipalityModel]:
+        stmt = (
+            select(MunicipalityModel)
+            .where(MunicipalityModel.id == municipality_id)
+            .options(lazyload("*"), joinedload(MunicipalityModel.department).lazyload("*"))
+        )
+        result = await self.db.execute(stmt)
+        return result.unique().scalars().one_or_none()
+
     async def create(self, model: CardModel) -> CardModel:
+        # Pas de refresh : l'appelant fournit toutes les valeurs (id, dates, relations)
         self.db.add(model)
         await self.db.commit()
-        await self.db.refresh(model)
         return model
     
     async def update(self, model: CardModel) -> CardModel:
@@ -1,14 +1,17 @@
-import io
-from typing import Optional
+import os
+from typing import Literal, Optional
 import uuid
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import EmailStr
+from app.core.database import AsyncSessionLocal
 from app.core.helper import AppHelper
 from app.core.security import get_current_admin, get_current_user
-from app.features.cards.dependencies import get_cards_service
+from app.features.cards.dependencies import build_cards_service, get_cards_service
+from app.features.cards.importer import CardImportFileError, CardImportSource
 from app.features.cards.services import CardService
-from app.features.cards.schemas import CardSchema, CreateCardSchema, UpdateCardSchema
+from app.features.cards.schemas import CardBatchSchema, CardEmailResultSchema, CardFilterSchema, CardImportReportSchema, CardPageSchema, CardSchema, CreateCardSchema, UpdateCardSchema
 from app.features.users.models import UserModel
 from app.core.config import settings
 
@@ -16,10 +19,41 @@ router = APIRouter(prefix="/card", tags=["cards"])
 
 @router.get("/all", response_model=list[CardSchema])
 async def get_all_cards(
+  filters: CardFilterSchema = Depends(),
   service: CardService = Depends(get_cards_service), 
   # admin: UserModel = Depends(get_current_admin)
 ):
-  return await service.get_all()
+  return await service.get_all(filters)
+
+@router.get("/page", response_model=CardPageSchema)
+async def get_cards_page(
+  filters: CardFilterSchema = Depends(),
+  cursor: Optional[int] = Query(None, ge=0, description="`next_cursor` of the previous page"),
+  limit: int = Query(50, ge=1, le=500),
+  service: CardService = Depends(get_cards_service),
+  # admin: UserModel = Depends(get_current_admin)
+):
+  return await service.get_page(filters, cursor, limit)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_cards(
+  format: Literal["csv", "ndjson"] = Query("csv"),
+  filters: CardFilterSchema = Depends(),
+  admin: UserModel = Depends(get_current_admin),
+):
+  async def rows():
+    # La session de la requête est fermée avant l'envoi du corps :
+    # le curseur serveur vit dans sa propre session, le temps du streaming.
+    async with AsyncSessionLocal() as db:
+      async for chunk in build_cards_service(db).export(filters, format):
+        yield chunk
+
+  media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+  return StreamingResponse(
+    rows(),
+    media_type=f"{media_type}; charset=utf-8",
+    headers={"Content-Disposition": f"attachment; filename=cartes_membres.{format}"},
+  )
 
 @router.get("/{id}", response_model=CardSchema)
 async def get_card_by_id(id: uuid.UUID, service: CardService = Depends(get_cards_service), admin: UserModel = Depends(get_current_admin)):
@@ -38,7 +72,7 @@ async def create_card(
   service: CardService = Depends(get_cards_service),
   current_user: UserModel = Depends(get_current_user)
 ):
-  image_url = AppHelper.save_file(image, settings.PROFILE_IMAGE_DIR, image.filename)
+  image_url = await AppHelper.save_file(image, settings.PROFILE_IMAGE_DIR)
   is_admin = current_user.is_admin
   return await service.create(CreateCardSchema(
     first_name=first_name,
@@ -51,23 +85,34 @@ async def create_card(
     is_active=True if is_admin else False,
   ), image_url=image_url, creator_id=current_user.id)
 
-@router.get("/pdf/{card_id}", response_class=StreamingResponse)
+@router.post("/import", response_model=CardImportReportSchema)
+async def import_cards(
+  file: UploadFile = File(..., description="CSV / XLSX sheet, or a ZIP with the sheet and the photos referenced in its `photo` column"),
+  dry_run: bool = Form(False, description="Validate only, nothing is written"),
+  service: CardService = Depends(get_cards_service),
+  admin: UserModel = Depends(get_current_admin)
+):
+  source = CardImportSource(file.filename, file.file)
+  try:
+    return await service.import_cards(source, creator_id=admin.id, dry_run=dry_run)
+  except CardImportFileError as e:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+  finally:
+    source.close()
+
+@router.get("/pdf/{card_id}", response_class=FileResponse)
 async def get_card_pdf_endpoint(
     card_id: uuid.UUID,
     current_admin: UserModel = Depends(get_current_admin),
     service: CardService = Depends(get_cards_service)
 ):
     try:
-        pdf_bytes = await service.generate_card_pdf_bytes(card_id)
-        if not pdf_bytes:
-            raise HTTPException(status_code=404, detail="Carte PDF introuvable.")
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+        pdf_path = await service.get_card_pdf_path(card_id)
+        # Servi depuis le cache disque (sendfile), sans copie en mémoire
+        return FileResponse(
+            pdf_path,
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=carte_membre_{card_id}.pdf"
-            }
+            filename=f"carte_membre_{card_id}.pdf",
         )
     except HTTPException as e:
         raise e
@@ -75,6 +120,87 @@ async def get_card_pdf_endpoint(
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 
+@router.get("/download/{card_id}", response_class=FileResponse)
+async def download_card_pdf_endpoint(
+    card_id: uuid.UUID,
+    v: str = Query(..., description="Card version in the signed link"),
+    expires: int = Query(...),
+    sig: str = Query(...),
+    service: CardService = Depends(get_cards_service)
+):
+    # Lien signé envoyé par e-mail (CARD_EMAIL_DELIVERY="link") : la signature tient lieu d'authentification
+    pdf_path = await service.get_card_download_path(card_id, v, expires, sig)
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=f"carte_membre_{card_id}.pdf",
+        headers={"Cache-Control": "private, max-age=3600"},
+    )
+
+
+@router.get("/preview/{card_id}", response_class=FileResponse)
+async def get_card_preview_endpoint(
+    card_id: uuid.UUID,
+    width: int = Query(320, ge=64, le=1600, description="Image width in pixels"),
+    format: Literal["png", "webp"] = Query("webp"),
+    if_none_match: Optional[str] = Header(None),
+    current_admin: UserModel = Depends(get_current_admin),
+    service: CardService = Depends(get_cards_service)
+):
+    preview_path, etag = await service.get_card_preview(card_id, width, format, if_none_match)
+    # no-cache : le navigateur revalide à chaque affichage, un 304 ne coûte qu'une requête SQL
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if preview_path is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(preview_path, media_type=f"image/{format}", headers=headers)
+
+
+@router.post("/pdf/batch", response_class=StreamingResponse)
+async def get_cards_pdf_batch(
+    batch: CardBatchSchema,
+    current_admin: UserModel = Depends(get_current_admin),
+):
+    async def archive():
+        # Session propre au streaming (celle de la requête est fermée avant l'envoi du corps)
+        async with AsyncSessionLocal() as db:
+            async for chunk in build_cards_service(db).render_batch_zip(batch):
+                yield chunk
+
+    return StreamingResponse(
+        archive(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=cartes_membres.zip"},
+    )
+
+@router.post("/pdf/sheets", response_class=FileResponse)
+async def get_cards_pdf_sheets(
+    batch: CardBatchSchema,
+    current_admin: UserModel = Depends(get_current_admin),
+    service: CardService = Depends(get_cards_service)
+):
+    pdf_path, skipped = await service.render_sheets_pdf(batch)
+    # Fichier temporaire supprimé une fois envoyé
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename="cartes_membres_impression.pdf",
+        headers={"X-Skipped-Cards": ",".join(f"{number:04d}" for number in skipped)} if skipped else None,
+        background=BackgroundTask(os.unlink, pdf_path),
+    )
+
+@router.post("/send-email/batch", response_class=StreamingResponse)
+async def send_cards_email_batch(
+    batch: CardBatchSchema,
+    current_admin: UserModel = Depends(get_current_admin),
+):
+    # Une ligne JSON (CardEmailResultSchema) par carte, au fil des envois
+    async def results():
+        async with AsyncSessionLocal() as db:
+            async for result in build_cards_service(db).send_cards_by_email(batch):
+                yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson; charset=utf-8")
+
 @router.post("/send-email/{card_id}", status_code=status.HTTP_200_OK)
 async def send_card_email_endpoint(
     card_id: uuid.UUID,
@@ -84,7 +210,7 @@ async def send_card_email_endpoint(
 ):
     try:
         await service.send_card_by_email(card_id, recipient_email)
-        return {"message": "Membership card email sent successfully."}
+        return {"message": "Membership card email queued for delivery."}
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -112,7 +238,7 @@ async def update_cards(
 ):
   image_url = None
   if image: 
-    image_url = AppHelper.save_file(image, settings.PROFILE_IMAGE_DIR, image.filename)
+    image_url = await AppHelper.save_file(image, settings.PROFILE_IMAGE_DIR)
   return await service.update(schema=UpdateCardSchema(
     id=id,
     first_name=first_name,
@@ -1,8 +1,9 @@
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, computed_field, model_validator
 from datetime import datetime
 import uuid
 
+from app.features.cards.photos import photo_derivative_url
 from app.features.departments.schemas import DepartmentSchema
 from app.features.municipalities.schemas import MunicipalitySchema
 
@@ -45,4 +46,60 @@ class CardSchema(BaseModel):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
-    
\ No newline at end of file
+
+    # Déclinaisons de la photo, déduites de son URL ; /static renvoie vers l'original tant qu'elles ne sont pas prêtes
+    @computed_field(description="96 px square avatar (WebP)")
+    @property
+    def image_thumb_url(self) -> Optional[str]:
+        return photo_derivative_url(self.image_url, "thumb")
+
+    @computed_field(description="320 px image for lists and detail views (WebP)")
+    @property
+    def image_list_url(self) -> Optional[str]:
+        return photo_derivative_url(self.image_url, "list")
+
+    @computed_field(description="Print-size image used on the PDF card")
+    @property
+    def image_print_url(self) -> Optional[str]:
+        return photo_derivative_url(self.image_url, "print")
+
+class CardFilterSchema(BaseModel):
+    department_id: Optional[uuid.UUID] = Field(None, description="Department ID")
+    municipality_id: Optional[uuid.UUID] = Field(None, description="Municipality ID")
+    is_active: Optional[bool] = Field(None, description="Is card active")
+    status: Optional[str] = Field(None, max_length=50, description="Card status")
+    creator_id: Optional[uuid.UUID] = Field(None, description="Creator ID")
+
+class CardPageSchema(BaseModel):
+    items: list[CardSchema]
+    next_cursor: Optional[int] = Field(None, description="Pass as `cursor` to fetch the next page, null on the last page")
+    
+class CardImportRowErrorSchema(BaseModel):
+    row: int = Field(..., description="Row number in the imported sheet (header is row 1)")
+    errors: list[str]
+
+class CardImportReportSchema(BaseModel):
+    dry_run: bool
+    total: int
+    created: int = Field(..., description="Cards created, or that would be created in dry-run mode")
+    failed: int
+    errors: list[CardImportRowErrorSchema]
+
+class CardBatchSchema(BaseModel):
+    department_id: Optional[uuid.UUID] = Field(None, description="Department ID")
+    municipality_id: Optional[uuid.UUID] = Field(None, description="Municipality ID")
+    card_ids: Optional[list[uuid.UUID]] = Field(None, min_length=1, max_length=10000, description="Explicit card IDs")
+    is_active: Optional[bool] = Field(None, description="Is card active")
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "CardBatchSchema":
+        if self.department_id is None and self.municipality_id is None and not self.card_ids:
+            raise ValueError("Select cards by department_id, municipality_id or card_ids")
+        return self
+
+class CardEmailResultSchema(BaseModel):
+    card_id: uuid.UUID
+    number: int
+    email: Optional[str] = None
+    sent: bool
+    error: Optional[str] = None
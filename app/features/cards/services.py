@@ -1,36 +1,150 @@
 # app/features/cards/services.py
-from io import BytesIO
+import asyncio
+import csv
+import html
+from datetime import datetime, timedelta, timezone
+from io import RawIOBase, StringIO
+import json
+import mimetypes
 import os
+import re
+from pathlib import Path
+import tempfile
+from urllib.parse import urlencode
 import uuid
-from typing import Optional, List
+from typing import AsyncIterator, Literal, Optional, List, Union
+import zipfile
 
 from fastapi import HTTPException, status
-from reportlab.pdfgen import canvas
-# from reportlab.lib.pagesizes import A8, landscape # A8 est une petite taille, comme une carte de crédit
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-import qrcode
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 
 from app.core.config import settings
-from app.core.email import send_email
+from app.core.email import SmtpBulkSender, build_message
+from app.core.executor import run_in_render_executor
 from app.core.helper import AppHelper
+from app.core.storage.backends import storage
+from app.features.cards.cache import card_pdf_cache
+from app.features.cards.importer import PHOTO_COLUMN, CardImportSource
 from app.features.cards.models import CardModel
+from app.features.cards.renderer import CardRenderData, render_card_pdf, render_card_preview, render_card_sheets_pdf, render_photo_derivatives
 from app.features.cards.repository import CardRepository
-from app.features.cards.schemas import CardSchema, CreateCardSchema, UpdateCardSchema
+from app.features.cards.schemas import (
+    CardBatchSchema,
+    CardEmailResultSchema,
+    CardFilterSchema,
+    CardImportReportSchema,
+    CardImportRowErrorSchema,
+    CardPageSchema,
+    CardSchema,
+    CreateCardSchema,
+    UpdateCardSchema,
+)
+from app.features.outbox.services import EmailOutboxService
+
+
+EXPORT_COLUMNS = (
+    "id", "number", "first_name", "last_name", "status", "contact", "email",
+    "is_active", "department", "municipality", "image_url", "created_at",
+)
+# Nombre de lignes regroupées par morceau envoyé au client
+EXPORT_FLUSH_ROWS = 500
+# Nombre de cartes insérées par transaction lors d'un import
+IMPORT_BATCH_SIZE = 1000
+
+
+# Tâches de fond en cours (déclinaisons des photos) : une référence les garde en vie
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def generate_photo_derivatives(image_url: str) -> None:
+    """Produit les déclinaisons d'une photo (miniatures, taille imprimée).
+
+    Stockage distant : elles sont produites sur la copie locale puis envoyées à
+    côté de l'original, pour les autres nœuds.
+    """
+    photo_path = await photo_local_path(image_url)
+    await run_in_render_executor(render_photo_derivatives, str(photo_path))
+    if storage.remote:
+        directory = AppHelper.get_path_from_url(image_url).parent.as_posix()
+        for derivative in await run_in_threadpool(list, photo_path.parent.glob(f"{photo_path.stem}-*")):
+            key = f"{directory}/{derivative.name}"
+            if derivative.suffix != ".tmp" and not await storage.exists(key):
+                await storage.put_file(key, derivative, mimetypes.guess_type(key)[0] or "application/octet-stream")
+
+
+def schedule_photo_derivatives(image_url: Optional[str]) -> None:
+    """Lance generate_photo_derivatives en arrière-plan.
+
+    Une tâche perdue (erreur, arrêt du processus) est rattrapée par le
+    nettoyage du stockage (photo_gc), qui reproduit les déclinaisons manquantes.
+    """
+    if not image_url:
+        return
+
+    async def run() -> None:
+        try:
+            await generate_photo_derivatives(image_url)
+        except Exception as e:
+            print(f"Erreur lors de la préparation des déclinaisons de {image_url} : {e}")
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def photo_local_path(image_url: str) -> Path:
+    """Chemin local de la photo pour le rendu, téléchargée depuis le stockage distant au besoin.
+
+    Une photo introuvable donne un chemin inexistant : le rendu la signale (FileNotFoundError).
+    """
+    key = AppHelper.get_path_from_url(image_url).as_posix()
+    try:
+        return await storage.fetch(key)
+    except FileNotFoundError:
+        return storage.cache_path(key)
+
+
+def card_pdf_filename(card: CardModel) -> str:
+    name = f"carte_membre_{card.number:04d}_{card.last_name}_{card.first_name}"
+    return re.sub(r"[^\w.-]+", "_", name) + ".pdf"
+
+
+class _ZipSink(RawIOBase):
+    """Destination non navigable pour zipfile : on récupère les octets au fil de l'eau."""
 
+    def __init__(self):
+        self._chunks: list[bytes] = []
 
-# Définir les dimensions de la carte (ex: format carte de crédit 85.6mm x 53.98mm)
-CARD_WIDTH, CARD_HEIGHT = 85.6 * mm, 53.98 * mm
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
 
 
 class CardService:
-    def __init__(self, repository: CardRepository):
+    def __init__(self, repository: CardRepository, outbox: EmailOutboxService):
         self.repository = repository
+        self.outbox = outbox
 
-    async def get_all(self) -> List[CardSchema]:
-        res = await self.repository.get_all()
+    async def get_all(self, filters: Optional[CardFilterSchema] = None) -> List[CardSchema]:
+        res = await self.repository.get_all(filters)
         return list(CardSchema.model_validate(card) for card in res)
+
+    async def get_page(self, filters: CardFilterSchema, cursor: Optional[int], limit: int) -> CardPageSchema:
+        # On lit une carte de plus pour savoir s'il reste une page sans faire de COUNT
+        res = await self.repository.get_page(filters, cursor, limit + 1)
+        items = [CardSchema.model_validate(card) for card in res[:limit]]
+        next_cursor = items[-1].number if len(res) > limit else None
+        return CardPageSchema(items=items, next_cursor=next_cursor)
     
     async def get_all_by_department_id(self, department_id: uuid.UUID) -> List[CardSchema]:
         res = await self.repository.get_all_by_department_id(department_id)
@@ -40,6 +154,36 @@ class CardService:
         res = await self.repository.get_all_by_municipality_id(municipality_id)
         return list(CardSchema.model_validate(card) for card in res)
 
+    async def export(self, filters: CardFilterSchema, export_format: Literal["csv", "ndjson"]) -> AsyncIterator[str]:
+        """Exporte les cartes ligne par ligne (CSV ou NDJSON) sans charger la table en mémoire."""
+        buffer = StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+            # L'en-tête part tout de suite : premier octet avant la fin de la requête
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        pending = 0
+        async for row in self.repository.stream_export_rows(filters):
+            values = dict(zip(EXPORT_COLUMNS, row))
+            values["id"] = str(values["id"])
+            values["created_at"] = values["created_at"].isoformat() if values["created_at"] else None
+            if writer:
+                writer.writerow(values[column] for column in EXPORT_COLUMNS)
+            else:
+                buffer.write(json.dumps(values, ensure_ascii=False))
+                buffer.write("\n")
+            pending += 1
+            if pending >= EXPORT_FLUSH_ROWS:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if pending:
+            yield buffer.getvalue()
+
     async def get_by_id(self, id: uuid.UUID) -> CardSchema:
         res = await self.repository.get_by_id(id)
         if not res:
@@ -50,21 +194,35 @@ class CardService:
         return CardSchema.model_validate(res)
 
     async def create(self, schema: CreateCardSchema, image_url: str, creator_id: uuid.UUID) -> CardSchema:
+        # Commune et département servent à la réponse : chargés avant l'insertion,
+        # ce qui évite le refresh après commit.
+        # Carte refusée : la référence prise sur la photo à l'envoi est rendue
+        municipality = await self.repository.get_municipality_with_department(schema.municipality_id)
+        if not municipality or municipality.department_id != schema.department_id:
+            await AppHelper.delete_file_from_url(image_url)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Municipality not found in this department"
+            )
         try:
-            last_number = await self.repository.get_last_card_number()
-            new_number = (last_number or 0) + 1
+            new_number = await self.repository.allocate_card_numbers()
 
             model_data = schema.model_dump()
             model = CardModel(**model_data)
+            # Identifiant et URL du QR code connus avant l'INSERT : une seule transaction
+            model.id = uuid.uuid4()
             model.creator_id = creator_id 
             model.image_url = image_url
             model.number = new_number
+            model.qr_code_url = f"{settings.DOMAIN_URL}/cards/view/{model.id}"
+            model.created_at = model.updated_at = datetime.now(timezone.utc)
+            model.municipality = municipality
+            model.department = municipality.department
             created_card = await self.repository.create(model)
-            qr_data_url = f"{settings.DOMAIN_URL}/cards/view/{created_card.id}"
-            created_card.qr_code_url = qr_data_url
-            updated_card_with_qr = await self.repository.update(created_card)
-            return CardSchema.model_validate(updated_card_with_qr)
+            schedule_photo_derivatives(image_url)
+            return CardSchema.model_validate(created_card)
         except IntegrityError as e:
+            await AppHelper.delete_file_from_url(image_url)
             if "UNIQUE constraint failed: cards.email" in str(e.orig):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -87,22 +245,121 @@ class CardService:
                 )
         except Exception as e:
             print(f"Error creating card: {e}")
+            await AppHelper.delete_file_from_url(image_url)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create card"
             )
 
 
+    async def import_cards(self, source: CardImportSource, creator_id: uuid.UUID, dry_run: bool = False) -> CardImportReportSchema:
+        """Importe en masse les lignes d'un fichier CSV / XLSX / ZIP (voir CardImportSource)."""
+        errors: dict[int, list[str]] = {}
+        valid: list[tuple[int, CreateCardSchema, Optional[str]]] = []
+        seen_emails: set[str] = set()
+        seen_contacts: set[str] = set()
+        total = 0
+
+        # 1. Validation ligne par ligne, doublons internes au fichier
+        rows = await run_in_threadpool(list, source.rows())  # lecture CSV / XLSX hors de la boucle d'événements
+        for line, row in rows:
+            total += 1
+            row.setdefault("is_active", True)  # import réservé aux admins, comme POST /card/
+            try:
+                schema = CreateCardSchema.model_validate(row)
+            except ValidationError as e:
+                errors[line] = [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+                continue
+            row_errors = []
+            if schema.email in seen_emails:
+                row_errors.append("email: duplicated in file")
+            if schema.contact in seen_contacts:
+                row_errors.append("contact: duplicated in file")
+            photo = row.get(PHOTO_COLUMN)
+            if photo and not source.has_photo(str(photo)):
+                row_errors.append(f"{PHOTO_COLUMN}: '{photo}' not found in archive")
+            seen_emails.add(schema.email)
+            seen_contacts.add(schema.contact)
+            if row_errors:
+                errors[line] = row_errors
+                continue
+            valid.append((line, schema, str(photo) if photo else None))
+
+        # 2. Contraintes en base vérifiées en quelques requêtes pour tout le fichier
+        taken_emails, taken_contacts = await self.repository.get_taken_emails_and_contacts(
+            [schema.email for _, schema, _ in valid], [schema.contact for _, schema, _ in valid]
+        )
+        municipalities = await self.repository.get_municipality_departments({schema.municipality_id for _, schema, _ in valid})
+        checked = []
+        for line, schema, photo in valid:
+            row_errors = []
+            if schema.email in taken_emails:
+                row_errors.append("email: already registered")
+            if schema.contact in taken_contacts:
+                row_errors.append("contact: already registered")
+            if schema.municipality_id not in municipalities:
+                row_errors.append("municipality_id: municipality not found")
+            elif municipalities[schema.municipality_id] != schema.department_id:
+                row_errors.append("department_id: municipality does not belong to this department")
+            if row_errors:
+                errors[line] = row_errors
+            else:
+                checked.append((line, schema, photo))
+
+        created = len(checked)
+        if not dry_run and checked:
+            created = 0
+            # 3. Numéros attribués en bloc, puis insertion par lots
+            next_number = await self.repository.allocate_card_numbers(len(checked))
+            for start in range(0, len(checked), IMPORT_BATCH_SIZE):
+                batch = checked[start:start + IMPORT_BATCH_SIZE]
+                values, saved_images = [], []
+                for offset, (line, schema, photo) in enumerate(batch):
+                    card_id = uuid.uuid4()
+                    image_url = None
+                    if photo:
+                        extension = photo.rsplit(".", 1)[-1].lower() if "." in photo else "jpg"
+                        image_url = await AppHelper.save_bytes(source.read_photo(photo), settings.PROFILE_IMAGE_DIR, extension)
+                        saved_images.append(image_url)
+                    values.append({
+                        **schema.model_dump(),
+                        "id": card_id,
+                        "creator_id": creator_id,
+                        "number": next_number + start + offset,
+                        "image_url": image_url,
+                        "qr_code_url": f"{settings.DOMAIN_URL}/cards/view/{card_id}",
+                    })
+                try:
+                    await self.repository.bulk_insert(values)
+                    created += len(batch)
+                    for image_url in saved_images:
+                        schedule_photo_derivatives(image_url)
+                except IntegrityError as e:
+                    # Conflit apparu depuis la validation (création concurrente) : le lot est rejeté
+                    for image_url in saved_images:
+                        await AppHelper.delete_file_from_url(image_url)
+                    for line, _, _ in batch:
+                        errors[line] = [f"batch rejected by database: {e.orig}"]
+
+        return CardImportReportSchema(
+            dry_run=dry_run,
+            total=total,
+            created=created,
+            failed=len(errors),
+            errors=[CardImportRowErrorSchema(row=line, errors=errors[line]) for line in sorted(errors)],
+        )
+
     async def update(self, schema: UpdateCardSchema, image_url: Optional[str]) -> CardSchema:
         db_card = await self.repository.get_by_id(schema.id)
         if not db_card:
+            await AppHelper.delete_file_from_url(image_url)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Card not found"
             )
-        if image_url and db_card.image_url:
-            AppHelper.delete_file_from_url(db_card.image_url)
-            db_card.image_url = image_url
+        previous_image_url = None
+        if image_url:
+            previous_image_url, db_card.image_url = db_card.image_url, image_url
 
         update_data = schema.model_dump(exclude_unset=True)
 
@@ -110,7 +367,16 @@ class CardService:
             if value is not None:
                 setattr(db_card, key, value)
 
-        updated_card = await self.repository.update(db_card)
+        try:
+            updated_card = await self.repository.update(db_card)
+        except Exception:
+            await AppHelper.delete_file_from_url(image_url)
+            raise
+        # Ancienne photo rendue une fois la carte enregistrée : un échec la laisse référencée
+        await AppHelper.delete_file_from_url(previous_image_url)
+        await card_pdf_cache.invalidate(updated_card.id)
+        if image_url:
+            schedule_photo_derivatives(image_url)
         return CardSchema.model_validate(updated_card)
 
     async def delete(self, id: uuid.UUID) -> None:
@@ -121,144 +387,272 @@ class CardService:
                 detail="Card not found"
             )
         if model.image_url:
-            AppHelper.delete_file_from_url(model.image_url)
+            await AppHelper.delete_file_from_url(model.image_url)
 
         await self.repository.delete(model)
+        await card_pdf_cache.invalidate(id)
         return None
 
 
-    async def _generate_qr_code_image(self, data: str) -> ImageReader:
-        """Génère une image QR Code à partir des données fournies."""
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.ERROR_CORRECT_L,
-            box_size=10, # Taille de chaque "boîte" du QR code
-            border=2,    # Épaisseur de la bordure
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        img_buffer = BytesIO()
-        img.save(img_buffer, "PNG")
-        img_buffer.seek(0)
-        return ImageReader(img_buffer)
+    async def get_card_pdf_path(self, card_id: uuid.UUID) -> Path:
+        """Chemin de la carte PDF dans le cache disque, générée au besoin."""
+        card_data_model = await self.repository.get_by_id_model(card_id)
+        if not card_data_model:
+            raise HTTPException(status_code=404, detail="Card not found")
+        return await self._get_cached_card_pdf(card_data_model)
+
+    def card_download_url(self, card: CardModel) -> str:
+        """Lien de téléchargement signé et à durée limitée de la carte PDF.
+
+        Le lien porte le début de la clé de cache : il désigne la version de la
+        carte au moment de l'envoi, servie sans accès à la base tant qu'elle est en cache.
+        """
+        expires = datetime.now(timezone.utc) + timedelta(days=settings.CARD_DOWNLOAD_LINK_EXPIRE_DAYS)
+        params = {"v": card_pdf_cache.key(card)[:32], "expires": str(int(expires.timestamp()))}
+        params["sig"] = AppHelper.sign("card-pdf", str(card.id), params["v"], params["expires"])
+        return f"{settings.DOMAIN_URL}/card/download/{card.id}?{urlencode(params)}"
+
+    async def get_card_download_path(self, card_id: uuid.UUID, version: str, expires: int, signature: str) -> Path:
+        """Carte PDF d'un lien signé : vérifié sans la base, servi depuis le cache ou rendu au premier accès."""
+        if not AppHelper.verify_signature(signature, "card-pdf", str(card_id), version, str(expires)):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid download link")
+        if expires < datetime.now(timezone.utc).timestamp():
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Download link has expired")
+        pdf_path = await card_pdf_cache.find(card_id, version)
+        if pdf_path is None:
+            # Carte modifiée depuis l'envoi ou cache vidé : version actuelle
+            pdf_path = await self.get_card_pdf_path(card_id)
+        return pdf_path
+
+    async def get_card_preview(
+        self,
+        card_id: uuid.UUID,
+        width: int,
+        image_format: Literal["png", "webp"],
+        if_none_match: Optional[str] = None,
+    ) -> tuple[Optional[Path], str]:
+        """Aperçu raster en cache et son ETag ; pas de chemin si le client a déjà cette version."""
+        card_data_model = await self.repository.get_by_id_model(card_id)
+        if not card_data_model:
+            raise HTTPException(status_code=404, detail="Card not found")
+        key = card_pdf_cache.key(card_data_model)
+        suffix = f"-{width}.{image_format}"
+        etag = f'"{key[:32]}{suffix}"'
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return None, etag
+
+        preview_path = await card_pdf_cache.get(card_data_model.id, key, suffix)
+        if preview_path is None:
+            snapshot = await self._render_data(card_data_model)
+            try:
+                data = await run_in_render_executor(render_card_preview, snapshot, width, image_format)
+            except FileNotFoundError:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Image not found"
+                )
+            preview_path = await card_pdf_cache.put(card_data_model.id, key, data, suffix)
+        return preview_path, etag
 
-    async def _get_member_photo(self, image_url: str) -> ImageReader:
+    async def generate_card_pdf_bytes(self, card_id: uuid.UUID) -> bytes:
+        """Génère la carte de membre en PDF et retourne les bytes."""
+        pdf_path = await self.get_card_pdf_path(card_id)
+        return pdf_path.read_bytes()
+
+    async def iter_card_pdfs(
+        self,
+        cards: AsyncIterator[CardModel],
+        ordered: bool = False,
+    ) -> AsyncIterator[tuple[CardModel, Union[Path, Exception]]]:
+        """Rend les cartes en parallèle et les renvoie dans l'ordre où elles sont prêtes (`ordered` : dans l'ordre reçu).
+
+        Au plus 2 x RENDER_WORKERS rendus en cours : la mémoire ne dépend pas de la taille du lot.
+        """
+        window = max(1, settings.RENDER_WORKERS * 2)
+        pending: dict[asyncio.Task, CardModel] = {} # dans l'ordre reçu
         try:
-            base_url = settings.DOMAIN_URL
-            file_path = image_url.replace(f"{base_url}/", "")
-            return ImageReader(file_path)
+            async for card in cards:
+                pending[asyncio.create_task(self._get_cached_card_pdf(card))] = card
+                if len(pending) < window:
+                    continue
+                for task in await self._next_done(pending, ordered):
+                    yield pending.pop(task), task.exception() or task.result()
+            while pending:
+                for task in await self._next_done(pending, ordered):
+                    yield pending.pop(task), task.exception() or task.result()
+        finally:
+            # Client déconnecté : on n'attend pas les rendus restants
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _next_done(pending: dict[asyncio.Task, CardModel], ordered: bool) -> list[asyncio.Task]:
+        if ordered:
+            first = next(iter(pending))
+            await asyncio.wait([first])
+            return [first]
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        return list(done)
+
+    async def render_batch_zip(self, batch: CardBatchSchema) -> AsyncIterator[bytes]:
+        """Archive ZIP des cartes d'un lot, envoyée entrée par entrée, par numéro de carte."""
+        sink = _ZipSink()
+        errors = []
+        # Les PDF sont déjà compressés : ZIP_STORED évite un travail inutile
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            async for card, result in self.iter_card_pdfs(self.repository.stream_batch(batch), ordered=True):
+                if isinstance(result, Exception):
+                    detail = result.detail if isinstance(result, HTTPException) else str(result)
+                    errors.append(f"{card.number:04d} {card.last_name} {card.first_name} ({card.id}): {detail}")
+                    continue
+                archive.writestr(card_pdf_filename(card), await run_in_threadpool(result.read_bytes))
+                yield sink.drain()
+            if errors:
+                archive.writestr("erreurs.txt", "\n".join(errors) + "\n")
+        yield sink.drain()
+
+    async def render_sheets_pdf(self, batch: CardBatchSchema) -> tuple[Path, list[int]]:
+        """Planches d'impression A4 pour un lot, dans un fichier temporaire à supprimer par l'appelant.
+
+        Renvoie aussi les numéros des cartes écartées faute de photo.
+        """
+        cards = [await self._render_data(card) async for card in self.repository.stream_batch(batch)]
+        if not cards:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No card found"
+            )
+        fd, name = tempfile.mkstemp(prefix="cartes_", suffix=".pdf")
+        os.close(fd)
+        try:
+            skipped = await run_in_render_executor(render_card_sheets_pdf, cards, name)
+        except BaseException:
+            os.unlink(name)
+            raise
+        return Path(name), skipped
+
+    async def _get_cached_card_pdf(self, card_data_model: CardModel) -> Path:
+        key = card_pdf_cache.key(card_data_model)
+        pdf_path = await card_pdf_cache.get(card_data_model.id, key)
+        if pdf_path is None:
+            pdf_bytes = await self._render_card_pdf(card_data_model)
+            pdf_path = await card_pdf_cache.put(card_data_model.id, key, pdf_bytes)
+        return pdf_path
+
+    async def _render_card_pdf(self, card_data_model: CardModel) -> bytes:
+        snapshot = await self._render_data(card_data_model)
+        try:
+            return await run_in_render_executor(render_card_pdf, snapshot)
         except FileNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Image not found"
             )
 
-    async def generate_card_pdf_bytes(self, card_id: uuid.UUID) -> bytes:
-        """Génère la carte de membre en PDF et retourne les bytes."""
-        card_data_model = await self.repository.get_by_id_model(card_id)
-        if not card_data_model:
-            raise HTTPException(status_code=404, detail="Card not found")
-
-        buffer = BytesIO()
-        # Utiliser landscape(A8) ou vos dimensions personnalisées
-        # p = canvas.Canvas(buffer, pagesize=landscape(A8))
-        p = canvas.Canvas(buffer, pagesize=(CARD_WIDTH, CARD_HEIGHT))
-
-        # 1. Fond d'écran
-        try:
-            if os.path.exists(settings.CARD_BACKGROUND_IMAGE_PATH):
-                p.drawImage(settings.CARD_BACKGROUND_IMAGE_PATH, 0, 0, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, anchor='c')
-            else:
-                print(f"Attention : Fond d'écran non trouvé à {settings.CARD_BACKGROUND_IMAGE_PATH}")
-                p.setFillColorRGB(0.9, 0.9, 0.9) # Un fond gris clair par défaut
-                p.rect(0,0, CARD_WIDTH, CARD_HEIGHT, fill=1, stroke=0)
-
-        except Exception as e:
-            print(f"Erreur lors du chargement du fond d'écran : {e}")
-            p.setFillColorRGB(0.9, 0.9, 0.9)
-            p.rect(0,0, CARD_WIDTH, CARD_HEIGHT, fill=1, stroke=0)
-
-
-        # 2. Photo du membre (Ex: coin supérieur gauche)
-        photo_size = 20 * mm # Taille de la photo
-        photo_x = CARD_WIDTH - photo_size - (8 * mm)
-        photo_y = CARD_HEIGHT - photo_size - (8 * mm)
-        
-        member_photo = await self._get_member_photo(card_data_model.image_url)
-        if member_photo:
-            try:
-                p.drawImage(member_photo, photo_x, photo_y, width=photo_size, height=photo_size, preserveAspectRatio=True, mask='auto')
-            except Exception as e:
-                print(f"Erreur lors du dessin de la photo du membre : {e}")
-                p.setFillColorRGB(0.7, 0.7, 0.7)
-                p.rect(photo_x, photo_y, photo_size, photo_size, fill=1) # Placeholder gris
-
-        # 3. Informations textuelles
-        p.setFillColorRGB(1, 1, 1) # Couleur du texte (noir)
-        
-        # Nom et Prénom
-        text_start_x = (7*mm) # A droite de la photo
-        current_y = CARD_HEIGHT - (15 * mm)
-        p.setFont(settings.CARD_DEFAULT_FONT + "-Bold", 8) # Taille 10
-        p.drawString(photo_x, current_y + (8 * mm), f"N°: {card_data_model.number:04d}")
-        p.drawString(text_start_x, current_y, f"Nom: {card_data_model.first_name}")
-        p.drawString(text_start_x, current_y - (5 * mm), f"Prénom: {card_data_model.last_name}")
-        
-        current_y -= (10 * mm)
-        # Numéro de membre
-        
-        # Statut
-        p.drawString(text_start_x, current_y, f"Statut: {card_data_model.status}")
-        current_y -= (5 * mm)
-        # Contact
-        p.drawString(text_start_x, current_y, f"Contact: {card_data_model.contact}")
-        current_y -= (5 * mm)
-        # Département (Assurez-vous que department est chargé)
-        department_name = card_data_model.department.name if card_data_model.department else "N/A"
-        p.drawString(text_start_x, current_y, f"Département: {department_name}") # En bas à gauche
-        current_y -= (5 * mm)
-        # Municipalité (Assurez-vous que municipality est chargé)
-        municipality_name = card_data_model.municipality.name if card_data_model.municipality else "N/A"
-        p.drawString(text_start_x, current_y, f"Commune: {municipality_name}")
-
-
-        # 4. QR Code (Ex: coin inférieur droit)
-        qr_code_size = 15 * mm
-        qr_x = CARD_WIDTH - qr_code_size - (7 * mm)
-        qr_y = 4 * mm
-        if card_data_model.qr_code_url: # L'URL des données du QR Code
-            try:
-                qr_image = await self._generate_qr_code_image(card_data_model.qr_code_url)
-                p.drawImage(qr_image, qr_x, qr_y, width=qr_code_size, height=qr_code_size, preserveAspectRatio=True, mask='auto')
-            except Exception as e:
-                print(f"Erreur lors de la génération ou du dessin du QR code : {e}")
-        
-        p.showPage()
-        p.save()
-        
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        return pdf_bytes
+    @staticmethod
+    async def _render_data(card_data_model: CardModel) -> CardRenderData:
+        """Instantané des champs imprimés, envoyé au pool de rendu."""
+        return CardRenderData(
+            number=card_data_model.number,
+            first_name=card_data_model.first_name,
+            last_name=card_data_model.last_name,
+            status=card_data_model.status,
+            contact=card_data_model.contact,
+            department_name=card_data_model.department.name if card_data_model.department else "N/A",
+            municipality_name=card_data_model.municipality.name if card_data_model.municipality else "N/A",
+            qr_code_url=card_data_model.qr_code_url,
+            photo_path=str(await photo_local_path(card_data_model.image_url)) if card_data_model.image_url else None,
+        )
 
     async def send_card_by_email(self, card_id: uuid.UUID, recipient_email: Optional[str] = None) -> None:
-        """Génère la carte PDF et l'envoie par e-mail."""
+        """Génère la carte PDF et met l'e-mail en file d'envoi."""
         card = await self.repository.get_by_id_model(card_id) # Utiliser get_by_id_model pour avoir l'objet modèle
         if not card:
             raise HTTPException(status_code=404, detail="Card not found for emailing.")
 
-        pdf_bytes = await self.generate_card_pdf_bytes(card_id)
-        
         to_email = recipient_email if recipient_email else card.email
         if not to_email:
             raise HTTPException(status_code=400, detail="No recipient email address found for the card.")
 
+        if settings.CARD_EMAIL_DELIVERY == "link":
+            # Rendu au premier téléchargement
+            subject, body, html_body, attachments = self._card_email_content(card, download_url=self.card_download_url(card))
+        else:
+            pdf_bytes = (await self._get_cached_card_pdf(card)).read_bytes()
+            subject, body, html_body, attachments = self._card_email_content(card, pdf_bytes)
+
+        # Remis en arrière-plan par le worker de la boîte d'envoi (nouvelles tentatives comprises)
+        await self.outbox.enqueue(
+            to=to_email,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            attachments=attachments
+        )
+
+    async def send_cards_by_email(self, batch: CardBatchSchema) -> AsyncIterator[CardEmailResultSchema]:
+        """Envoie les cartes d'un lot à leurs titulaires et renvoie le résultat de chaque envoi.
+
+        Les PDF sont rendus en parallèle pendant que les messages partent, par les
+        connexions du pool SMTP au débit SMTP_RATE_PER_SECOND. En mode "link", rien
+        n'est rendu : chaque message ne contient qu'un lien signé.
+        """
+        if settings.CARD_EMAIL_DELIVERY == "link":
+            cards = ((card, None) async for card in self.repository.stream_batch(batch))
+        else:
+            cards = self.iter_card_pdfs(self.repository.stream_batch(batch))
+        sender = SmtpBulkSender()
+        async for card, pdf in cards:
+            result = CardEmailResultSchema(card_id=card.id, number=card.number, email=card.email, sent=False)
+            if isinstance(pdf, Exception):
+                result.error = pdf.detail if isinstance(pdf, HTTPException) else str(pdf)
+            elif not card.email:
+                result.error = "No recipient email address found for the card."
+            else:
+                try:
+                    if pdf is None:
+                        content = self._card_email_content(card, download_url=self.card_download_url(card))
+                    else:
+                        content = self._card_email_content(card, await run_in_threadpool(pdf.read_bytes))
+                    await sender.send(build_message(card.email, *content))
+                    result.sent = True
+                except Exception as e:
+                    print(f"Erreur lors de l'envoi de l'e-mail à {card.email}: {e}")
+                    result.error = str(e)
+            yield result
+
+    @staticmethod
+    def _card_email_content(
+        card: CardModel,
+        pdf_bytes: Optional[bytes] = None,
+        download_url: Optional[str] = None,
+    ) -> tuple[str, str, str, list[tuple[str, bytes, str]]]:
+        """Sujet, corps texte, corps HTML et pièce jointe de l'e-mail d'une carte (ou lien de téléchargement)."""
         subject = f"Votre carte de membre - {card.first_name} {card.last_name}"
         
         # Formatter le numéro de carte avec des zéros en tête (par exemple, pour avoir 6 chiffres)
         formatted_card_number = f"{card.number:04d}"
 
+        if download_url:
+            expires = datetime.now(timezone.utc) + timedelta(days=settings.CARD_DOWNLOAD_LINK_EXPIRE_DAYS)
+            body = (
+                f"Bonjour {card.first_name},\n\n"
+                f"Votre carte de membre (Numéro: {formatted_card_number}) est disponible au téléchargement :\n"
+                f"{download_url}\n\n"
+                f"Ce lien est valable jusqu'au {expires:%d/%m/%Y}.\n\n"
+                f"Cordialement,\n"
+                f"L'équipe de {settings.APP_NAME}"
+            )
+            html_body = (
+                f"<p>Bonjour {card.first_name},</p>"
+                f"<p>Votre carte de membre (Numéro: <strong>{formatted_card_number}</strong>) est disponible au téléchargement :</p>"
+                f'<p><a href="{html.escape(download_url)}">Télécharger ma carte</a></p>'
+                f"<p>Ce lien est valable jusqu'au {expires:%d/%m/%Y}.</p>"
+                f"<p>Cordialement,<br>"
+                f"L'équipe de {settings.APP_NAME}</p>"
+            )
+            return subject, body, html_body, []
+
         body = (
             f"Bonjour {card.first_name},\n\n"
             f"Veuillez trouver ci-joint votre carte de membre (Numéro: {formatted_card_number}).\n\n"
@@ -275,15 +669,4 @@ class CardService:
         attachments = [
             (f"carte_membre_{card.last_name}_{card.first_name}.pdf", pdf_bytes, "application/pdf")
         ]
-        
-        try:
-            await send_email(
-                to=to_email,
-                subject=subject,
-                body=body,
-                html_body=html_body,
-                attachments=attachments
-            )
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de l'e-mail à {to_email}: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
\ No newline at end of file
+        return subject, body, html_body, attachments
@@ -0,0 +1,9 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.features.outbox.repository import EmailOutboxRepository
+from app.features.outbox.services import EmailOutboxService
+
+def get_email_outbox_service(db: AsyncSession = Depends(get_db)) -> EmailOutboxService:
+    return EmailOutboxService(EmailOutboxRepository(db))
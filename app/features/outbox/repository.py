@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.features.outbox.models import OUTBOX_FAILED, OUTBOX_PENDING, OUTBOX_SENT, EmailOutboxAttachmentModel, EmailOutboxModel
+import uuid
+
+class EmailOutboxRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, model: EmailOutboxModel) -> EmailOutboxModel:
+        self.db.add(model)
+        await self.db.commit()
+        return model
+
+    async def claim_due(self, now: datetime, limit: int, lease: timedelta) -> list[EmailOutboxModel]:
+        """Réserve jusqu'à `limit` messages échus pour ce worker.
+
+        La réservation repousse `next_attempt_at` de la durée du bail : un autre
+        worker ne les reprend pas, sauf si celui-ci meurt avant de conclure.
+        """
+        due = await self.db.execute(
+            select(EmailOutboxModel.id)
+            .where(EmailOutboxModel.status == OUTBOX_PENDING, EmailOutboxModel.next_attempt_at <= now)
+            .order_by(EmailOutboxModel.next_attempt_at)
+            .limit(limit)
+        )
+        ids = list(due.scalars().all())
+        if not ids:
+            return []
+        # Seules les lignes encore échues sont modifiées : un worker concurrent ne les obtient pas aussi
+        claimed = await self.db.execute(
+            update(EmailOutboxModel)
+            .where(
+                EmailOutboxModel.id.in_(ids),
+                EmailOutboxModel.status == OUTBOX_PENDING,
+                EmailOutboxModel.next_attempt_at <= now,
+            )
+            .values(next_attempt_at=now + lease, attempts=EmailOutboxModel.attempts + 1)
+            .returning(EmailOutboxModel.id)
+        )
+        claimed_ids = list(claimed.scalars().all())
+        await self.db.commit()
+        if not claimed_ids:
+            return []
+        result = await self.db.execute(select(EmailOutboxModel).where(EmailOutboxModel.id.in_(claimed_ids)))
+        return list(result.scalars().all())
+
+    async def mark_sent(self, id: uuid.UUID, now: datetime) -> None:
+        await self.db.execute(
+            update(EmailOutboxModel)
+            .where(EmailOutboxModel.id == id)
+            .values(status=OUTBOX_SENT, sent_at=now, last_error=None)
+        )
+        # Les pièces jointes ne servent plus une fois le message remis
+        await self.db.execute(delete(EmailOutboxAttachmentModel).where(EmailOutboxAttachmentModel.email_id == id))
+        await self.db.commit()
+
+    async def mark_failed(self, id: uuid.UUID, error: str, next_attempt_at: Optional[datetime]) -> None:
+        """Échec d'une tentative : nouvel essai à `next_attempt_at`, ou abandon définitif si None."""
+        values = {"last_error": error}
+        if next_attempt_at is None:
+            values["status"] = OUTBOX_FAILED
+        else:
+            values["next_attempt_at"] = next_attempt_at
+        await self.db.execute(update(EmailOutboxModel).where(EmailOutboxModel.id == id).values(**values))
+        await self.db.commit()
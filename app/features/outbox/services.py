@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from app.features.outbox.models import EmailOutboxAttachmentModel, EmailOutboxModel
+from app.features.outbox.repository import EmailOutboxRepository
+from app.features.outbox.worker import email_outbox_worker
+
+class EmailOutboxService:
+    def __init__(self, repository: EmailOutboxRepository):
+        self.repository = repository
+
+    async def enqueue(
+        self,
+        to: str,
+        subject: str,
+        body: str, # Texte brut
+        html_body: Optional[str] = None,
+        attachments: Optional[List[Tuple[str, bytes, str]]] = None # (filename, data, mimetype)
+    ) -> EmailOutboxModel:
+        """Enregistre l'e-mail dans la boîte d'envoi ; le worker le remettra en arrière-plan."""
+        model = EmailOutboxModel(
+            to_email=to,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            next_attempt_at=datetime.now(timezone.utc),
+            attachments=[
+                EmailOutboxAttachmentModel(filename=filename, data=data, mimetype=mimetype)
+                for filename, data, mimetype in attachments or []
+            ],
+        )
+        model = await self.repository.create(model)
+        email_outbox_worker.wake()
+        return model
@@ -0,0 +1,120 @@
+# app/features/outbox/worker.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+import random
+from typing import Optional
+
+import aiosmtplib
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.email import MimePartCache, SmtpBulkSender, build_encoded_message
+from app.features.outbox.models import EmailOutboxModel
+from app.features.outbox.repository import EmailOutboxRepository
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff exponentiel plafonné, avec un peu d'aléa pour étaler les reprises."""
+    delay = min(settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS, settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Refus définitif du serveur (5xx) : inutile de réessayer."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(recipient.code >= 500 for recipient in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+
+class EmailOutboxWorker:
+    """Remet les e-mails de la table `email_outbox` en tâche de fond.
+
+    Démarré par le lifespan de l'application. Chaque passe réserve un lot de
+    messages échus et les envoie en EMAIL_OUTBOX_CONCURRENCY files parallèles,
+    sur les connexions du pool SMTP. Le worker se réveille dès qu'un message
+    est mis en file dans ce processus, et au moins toutes les
+    EMAIL_OUTBOX_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = await self.process_due()
+            except Exception as e:
+                print(f"Erreur du worker d'e-mails : {e}")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_due(self) -> int:
+        """Une passe : envoie les messages échus et renvoie leur nombre."""
+        async with AsyncSessionLocal() as db:
+            emails = await EmailOutboxRepository(db).claim_due(
+                datetime.now(timezone.utc),
+                settings.EMAIL_OUTBOX_BATCH_SIZE,
+                timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+            )
+        if not emails:
+            return 0
+        concurrency = max(1, min(settings.EMAIL_OUTBOX_CONCURRENCY, len(emails)))
+        # Files parallèles ; le débit global reste SMTP_RATE_PER_SECOND
+        # Une pièce jointe ou un corps commun à plusieurs messages n'est encodé qu'une fois par passe
+        parts = MimePartCache()
+        await asyncio.gather(*(self._deliver(emails[lane::concurrency], concurrency, parts) for lane in range(concurrency)))
+        return len(emails)
+
+    async def _deliver(self, emails: list[EmailOutboxModel], concurrency: int, parts: MimePartCache) -> None:
+        rate = settings.SMTP_RATE_PER_SECOND / concurrency
+        sender = SmtpBulkSender(rate=rate)
+        async with AsyncSessionLocal() as db:
+            repository = EmailOutboxRepository(db)
+            for email in emails:
+                message = build_encoded_message(
+                    email.to_email,
+                    email.subject,
+                    email.body,
+                    email.html_body,
+                    [(attachment.filename, attachment.data, attachment.mimetype) for attachment in email.attachments],
+                    parts=parts,
+                )
+                try:
+                    await sender.send(message)
+                except Exception as e:
+                    print(f"Erreur lors de l'envoi de l'e-mail à {email.to_email} (tentative {email.attempts}): {e}")
+                    if is_permanent_failure(e) or email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        next_attempt_at = None
+                    else:
+                        next_attempt_at = datetime.now(timezone.utc) + retry_delay(email.attempts)
+                    await repository.mark_failed(email.id, str(e), next_attempt_at)
+                else:
+                    await repository.mark_sent(email.id, datetime.now(timezone.utc))
+
+
+email_outbox_worker = EmailOutboxWorker()
@@ -5,12 +5,43 @@ from app.features.municipalities.routes import router as municipalities_router
 from app.features.cards.routes import router as cards_router
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from app.features.auth.routes import router as auth_router
 from app.core.database import engine, Base
+from app.core.executor import shutdown_render_executor
+from app.core.config import settings
+from app.core.email import smtp_pool
+from app.core.email_templates import load_email_templates
+from app.core.static import CachedStaticFiles, precompress_static_files
+from app.core.storage.backends import storage, storage_cache_pruner
+from app.features.cards.photo_gc import photo_gc_worker
+from app.features.outbox.worker import email_outbox_worker
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+async def create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_tables()
+    load_email_templates()
+    await run_in_threadpool(precompress_static_files, settings.STATIC_FILES_DIR, (settings.PROFILE_IMAGE_DIR,))
+    if settings.EMAIL_OUTBOX_WORKER:
+        email_outbox_worker.start()
+    if settings.STORAGE_GC_INTERVAL_HOURS > 0:
+        photo_gc_worker.start()
+    if storage.remote:
+        storage_cache_pruner.start()
+    yield
+    await storage_cache_pruner.stop()
+    await photo_gc_worker.stop()
+    await email_outbox_worker.stop()
+    await smtp_pool.close()
+    await storage.close()
+    shutdown_render_executor()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -25,16 +56,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    await create_tables()
-    yield
-
-app.mount("/static", StaticFiles(directory="static"), name="static") 
+app.mount("/static", CachedStaticFiles(directory=settings.STATIC_FILES_DIR, backend=storage), name="static")
 
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -0,0 +1,70 @@
+# scripts/bench_card_qr.py
+# Comparaison du QR code raster (PNG, ancien rendu) et vectoriel (CARD_QR_VECTOR) :
+# temps de rendu et taille du PDF, pour le QR code seul puis pour une carte entière.
+# Réglages lus comme l'application (.env / variables d'environnement).
+#
+#   python -m scripts.bench_card_qr [--iterations 300] [--photo static/photo.jpg]
+import argparse
+from io import BytesIO
+import time
+from typing import Callable
+
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+from app.features.cards import renderer
+from app.features.cards.renderer import QR_CODE_SIZE, CardRenderData, render_card_pdf
+
+QR_DATA = f"{settings.DOMAIN_URL}/cards/view/3564c239-adef-41ee-9034-d0da46748549"
+
+
+def render_qr_pdf(vector: bool) -> bytes:
+    """PDF d'une page contenant uniquement le QR code."""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=(QR_CODE_SIZE, QR_CODE_SIZE))
+    if vector:
+        renderer._draw_qr_code_vector(p, QR_DATA, 0, 0, QR_CODE_SIZE)
+    else:
+        qr_image = renderer._generate_qr_code_image(QR_DATA)
+        p.drawImage(qr_image, 0, 0, width=QR_CODE_SIZE, height=QR_CODE_SIZE, preserveAspectRatio=True, mask='auto')
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def measure(render: Callable[[], bytes], iterations: int) -> tuple[float, int]:
+    """Temps moyen (ms) et taille (octets) d'un rendu, après un premier appel de chauffe."""
+    data = render()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = render()
+    return (time.perf_counter() - start) / iterations * 1000, len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Banc d'essai du QR code des cartes : raster ou vectoriel")
+    parser.add_argument("--iterations", type=int, default=300, help="rendus mesurés par cas")
+    parser.add_argument("--photo", default=None, help="photo de membre à intégrer à la carte (sans photo par défaut)")
+    args = parser.parse_args()
+
+    card = CardRenderData(
+        number=42, first_name="Jean-Baptiste", last_name="Ngono", status="Coordinateur", contact="690000001",
+        department_name="Littoral", municipality_name="Douala 1er", qr_code_url=QR_DATA, photo_path=args.photo,
+    )
+    results: dict[bool, tuple[float, int, float, int]] = {}
+    for vector in (False, True):
+        settings.CARD_QR_VECTOR = vector
+        qr_ms, qr_size = measure(lambda: render_qr_pdf(vector), args.iterations)
+        card_ms, card_size = measure(lambda: render_card_pdf(card), args.iterations)
+        results[vector] = (qr_ms, qr_size, card_ms, card_size)
+        print(
+            f"{'vectoriel' if vector else 'raster':>9} : QR seul {qr_ms:6.2f} ms, {qr_size:6} o"
+            f" | carte {card_ms:6.2f} ms, {card_size:6} o"
+        )
+
+    raster, vector = results[False], results[True]
+    print(f"Vectoriel : carte x{raster[2] / vector[2]:.1f} plus rapide, PDF à {vector[3] / raster[3]:.0%} de la taille raster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# scripts/bench_email_encoding.py
+# Temps CPU de construction et sérialisation des e-mails, ramené à 1000 messages :
+# build_message (parties réencodées pour chaque message, comme l'ancien envoi) comparé à
+# build_encoded_message sans cache puis avec un MimePartCache partagé (passe du worker
+# de l'outbox : même PDF et même corps pour tous les destinataires).
+# Réglages lus comme l'application (.env / variables d'environnement).
+#
+#   python -m scripts.bench_email_encoding [--messages 1000] [--attachment-kb 200]
+import argparse
+import os
+import time
+from typing import Callable
+
+from aiosmtplib.email import flatten_message
+
+from app.core.email import MimePartCache, build_encoded_message, build_message
+
+SUBJECT = "Votre carte de membre – Liberal"
+BODY = "Bonjour,\n\nVeuillez trouver ci-joint votre carte de membre.\n"
+HTML_BODY = "<p>Bonjour,</p><p>Veuillez trouver ci-joint votre carte de membre n° 42.</p>" * 20
+
+
+def measure(build: Callable[[str], bytes], recipients: list[str]) -> tuple[float, int]:
+    """Temps CPU (ms) pour 1000 messages et taille d'un message."""
+    build(recipients[0])  # chauffe
+    start = time.process_time()
+    for to in recipients:
+        data = build(to)
+    elapsed = time.process_time() - start
+    return elapsed / len(recipients) * 1000 * 1000, len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'encodage des e-mails")
+    parser.add_argument("--messages", type=int, default=1000, help="messages construits par cas")
+    parser.add_argument("--attachment-kb", type=int, default=200, help="taille du PDF joint (0 : sans)")
+    args = parser.parse_args()
+
+    attachments = [("carte.pdf", os.urandom(args.attachment_kb * 1024), "application/pdf")] if args.attachment_kb else None
+    recipients = [f"membre{i}@example.com" for i in range(args.messages)]
+    parts = MimePartCache()
+
+    cases = (
+        ("build_message", lambda to: flatten_message(build_message(to, SUBJECT, BODY, HTML_BODY, attachments))),
+        ("encodé, sans cache", lambda to: build_encoded_message(to, SUBJECT, BODY, HTML_BODY, attachments).data),
+        ("encodé, cache partagé", lambda to: build_encoded_message(to, SUBJECT, BODY, HTML_BODY, attachments, parts=parts).data),
+    )
+    print(f"{args.messages} messages, pièce jointe {args.attachment_kb} Ko")
+    results = {}
+    for label, build in cases:
+        cpu_ms, size = measure(build, recipients)
+        results[label] = cpu_ms
+        print(f"{label:>22} : {cpu_ms:8.1f} ms CPU / 1000 messages, {size} o par message")
+    print(f"Cache partagé : x{results['build_message'] / results['encodé, cache partagé']:.0f} moins de CPU que build_message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# scripts/bench_smtp_pool.py
+# Débit d'envoi contre un serveur SMTP local (aiosmtpd) : une connexion par message
+# (ancien send_email) comparée au pool de connexions (app.core.email.SmtpConnectionPool),
+# en envoi séquentiel puis avec `--pool-size` envois simultanés.
+# Les réglages SMTP_* de l'application sont remplacés par ceux du serveur local ;
+# les autres sont lus comme d'habitude (.env / variables d'environnement).
+#
+#   python -m scripts.bench_smtp_pool [--messages 300] [--attachment-kb 40] [--pool-size 4]
+#                                     [--tls-cert cert.pem --tls-key key.pem]
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import ssl
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult, LoginPassword
+
+from app.core.config import settings
+from app.core.email import SmtpConnectionPool, build_message
+
+USER, PASSWORD = "bench", "bench"
+
+
+class CountingHandler:
+    """Accepte tout ; compte les sessions (EHLO) et les messages reçus."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 OK"
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=isinstance(auth_data, LoginPassword) and auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode())
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def send_one_connection_per_message(message) -> None:
+    # Ancien send_email : contexte TLS neuf et connexion neuve pour chaque message
+    tls_context = ssl.create_default_context()
+    tls_context.check_hostname = False
+    tls_context.verify_mode = ssl.CERT_NONE
+    await aiosmtplib.send(
+        message,
+        hostname=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        username=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        use_tls=settings.SMTP_USE_TLS,
+        tls_context=tls_context,
+    )
+
+
+async def run(args: argparse.Namespace, handler: CountingHandler) -> None:
+    attachments = [("carte.pdf", os.urandom(args.attachment_kb * 1024), "application/pdf")] if args.attachment_kb else None
+    messages = [build_message(f"m{i}@example.com", "Votre carte", "Bonjour", "<p>Bonjour</p>", attachments) for i in range(args.messages)]
+    pool = SmtpConnectionPool(args.pool_size, idle_timeout=60, messages_per_connection=settings.SMTP_MESSAGES_PER_CONNECTION)
+
+    async def sequential_legacy():
+        for message in messages:
+            await send_one_connection_per_message(message)
+
+    async def sequential_pool():
+        for message in messages:
+            await pool.send_message(message)
+
+    async def concurrent_pool():
+        await asyncio.gather(*(pool.send_message(message) for message in messages))
+
+    cases = (
+        ("connexion par message", sequential_legacy),
+        ("pool, séquentiel", sequential_pool),
+        (f"pool, {args.pool_size} simultanés", concurrent_pool),
+    )
+    for label, case in cases:
+        handler.sessions = handler.messages = 0
+        start = time.perf_counter()
+        await case()
+        elapsed = time.perf_counter() - start
+        assert handler.messages == len(messages)
+        print(f"{label:>24} : {len(messages) / elapsed:7.0f} messages/s, {handler.sessions} connexions ouvertes")
+    await pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Banc d'essai du pool de connexions SMTP")
+    parser.add_argument("--messages", type=int, default=300, help="messages envoyés par cas")
+    parser.add_argument("--attachment-kb", type=int, default=40, help="taille de la pièce jointe (0 : sans)")
+    parser.add_argument("--pool-size", type=int, default=settings.SMTP_POOL_SIZE)
+    parser.add_argument("--tls-cert", help="certificat du serveur local : TLS implicite (SMTPS)")
+    parser.add_argument("--tls-key", help="clé privée du certificat")
+    args = parser.parse_args()
+
+    logging.getLogger("mail.log").setLevel(logging.ERROR)  # avertissements d'aiosmtpd à chaque AUTH
+    options = {}
+    if args.tls_cert:
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(args.tls_cert, args.tls_key)
+        options["ssl_context"] = server_context
+    handler = CountingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port, authenticator=authenticate, auth_require_tls=False, **options)
+    controller.start()
+    settings.SMTP_HOST, settings.SMTP_PORT = "127.0.0.1", port
+    settings.SMTP_USER, settings.SMTP_PASSWORD = USER, PASSWORD
+    settings.SMTP_USE_TLS = bool(args.tls_cert)
+    print(f"{args.messages} messages, pièce jointe {args.attachment_kb} Ko, {'TLS' if args.tls_cert else 'en clair'}")
+    try:
+        asyncio.run(run(args, handler))
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
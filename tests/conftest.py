@@ -0,0 +1,161 @@
+# tests/conftest.py
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Base SQLite, fichiers statiques et caches dans un dossier jetable
+TEST_ROOT = Path(tempfile.mkdtemp(prefix="liberal-tests-"))
+TEST_ENV = {
+    "DATABASE_URL": f"sqlite+aiosqlite:///{TEST_ROOT / 'test.sqlite'}",
+    "SECRET_KEY": "test-secret-key-" + "x" * 16,
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "8025",
+    "SMTP_USER": "user",
+    "SMTP_PASSWORD": "password",
+    "SMTP_FROM": "noreply@example.com",
+    "SMTP_USE_TLS": "false",
+    "DOMAIN_URL": "http://testserver",
+    "EMAIL_OUTBOX_WORKER": "false",
+    "RENDER_EXECUTOR": "thread",
+}
+
+
+def pytest_configure(config):
+    # Avant l'import des modules de test : les réglages sont lus à l'import de app.core.config,
+    # et les chemins de stockage sont relatifs au dossier courant.
+    os.environ.update(TEST_ENV)
+    os.chdir(TEST_ROOT)
+    (TEST_ROOT / "static").mkdir(exist_ok=True)
+    import app.main  # noqa: F401  (enregistre tous les modèles)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db_engine():
+    """Schéma recréé à chaque test ; moteur libéré à la fin (threads aiosqlite)."""
+    from app.core.database import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def seed(db_engine):
+    """Un administrateur, un département et une de ses communes."""
+    from app.core.database import AsyncSessionLocal
+    from app.core.helper import AppHelper
+    from app.features.departments.models import DepartmentModel
+    from app.features.municipalities.models import MunicipalityModel
+    from app.features.users.models import UserModel
+
+    async with AsyncSessionLocal() as session:
+        user = UserModel(email="admin@example.com", hashed_password=AppHelper.get_password_hash("password123"), is_admin=True)
+        department = DepartmentModel(name="Littoral")
+        session.add_all([user, department])
+        await session.flush()
+        municipality = MunicipalityModel(name="Douala", department_id=department.id)
+        session.add(municipality)
+        await session.commit()
+        return {"user_id": user.id, "department_id": department.id, "municipality_id": municipality.id}
+
+
+@pytest.fixture
+async def admin_client(seed):
+    """Client HTTP de l'application, connecté avec l'administrateur de `seed`."""
+    import httpx
+
+    from app.core.helper import AppHelper
+    from app.features.cards.services import _background_tasks
+    from app.main import app
+
+    token = AppHelper.create_access_token({"sub": "admin@example.com"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", headers={"Authorization": f"Bearer {token}"}) as client:
+        yield client
+    # Déclinaisons des photos envoyées : terminées avant que le test suivant vide le dossier
+    await asyncio.gather(*_background_tasks)
+
+
+@pytest.fixture
+def profile_images():
+    """Dossier des photos de membre, vidé avant le test."""
+    from app.core.config import settings
+
+    shutil.rmtree(settings.PROFILE_IMAGE_DIR, ignore_errors=True)
+    settings.PROFILE_IMAGE_DIR.mkdir(parents=True)
+    return settings.PROFILE_IMAGE_DIR
+
+
+@pytest.fixture
+def s3_server():
+    """Serveur compatible S3 local (voir s3_server.py)."""
+    from s3_server import S3Server
+
+    server = S3Server().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+async def s3_storage(s3_server, tmp_path):
+    """S3StorageBackend relié à `s3_server`, copies locales dans un dossier jetable."""
+    from app.core.storage.backends import S3StorageBackend
+
+    backend = S3StorageBackend(s3_server.url, s3_server.bucket, s3_server.region, s3_server.access_key, s3_server.secret_key, tmp_path / "mirror")
+    yield backend
+    await backend.close()
+
+
+class SmtpRecorder:
+    """Serveur SMTP local (aiosmtpd) : garde les messages reçus, refuse les destinataires de `replies`."""
+
+    def __init__(self):
+        self.messages: list[tuple[list[str], bytes]] = []
+        self.replies: dict[str, str] = {}  # adresse -> réponse SMTP au RCPT, ex. "550 no such user"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.replies:
+            return self.replies[address]
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((list(envelope.rcpt_tos), envelope.content))
+        return "250 OK"
+
+
+@pytest.fixture
+async def smtp_server(monkeypatch):
+    """SMTP avec AUTH, sans TLS, sur un port libre ; le pool de connexions est vidé à la fin."""
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult, LoginPassword
+
+    from app.core.config import settings
+    from app.core.email import smtp_pool
+
+    def authenticate(server, session, envelope, mechanism, auth_data):
+        return AuthResult(success=isinstance(auth_data, LoginPassword) and auth_data.login == settings.SMTP_USER.encode() and auth_data.password == settings.SMTP_PASSWORD.encode())
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    recorder = SmtpRecorder()
+    controller = Controller(recorder, hostname="127.0.0.1", port=port, authenticator=authenticate, auth_require_tls=False)
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_PORT", port)
+    monkeypatch.setattr(settings, "SMTP_RATE_PER_SECOND", 0)
+    yield recorder
+    await smtp_pool.close()
+    controller.stop()
@@ -0,0 +1,153 @@
+# tests/s3_server.py
+# Serveur compatible S3 minimal pour les tests du stockage distant : un seau, style
+# chemin (/seau/clé), signature AWS V4 de chaque requête vérifiée comme par MinIO.
+# Gère PUT (et copie), GET, HEAD, DELETE et ListObjectsV2 par pages de `page_size`.
+from datetime import datetime, timezone
+import hashlib
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import re
+import threading
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+AUTHORIZATION = re.compile(
+    r"AWS4-HMAC-SHA256 Credential=(?P<access_key>[^/]+)/(?P<date>\d{8})/(?P<region>[^/]+)/s3/aws4_request, "
+    r"SignedHeaders=(?P<signed>[^,]+), Signature=(?P<signature>[0-9a-f]{64})$"
+)
+
+
+def signature_key(secret_key: str, date: str, region: str) -> bytes:
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+class S3Server:
+    """Serveur lancé dans un thread ; `objects` et `modified` sont lisibles et modifiables par les tests."""
+
+    def __init__(self, access_key: str = "test-access-key", secret_key: str = "test-secret-key", region: str = "us-east-1", bucket: str = "cards", page_size: int = 2):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.bucket = bucket
+        self.page_size = page_size
+        self.objects: dict[str, bytes] = {}
+        self.modified: dict[str, datetime] = {}
+        self.requests: list[tuple[str, str]] = []  # (méthode, chemin) de chaque requête reçue
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "S3Server":
+        server = self
+
+        class Handler(_S3RequestHandler):
+            s3 = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def check_signature(self, method: str, raw_path: str, headers) -> bool:
+        match = AUTHORIZATION.match(headers.get("authorization", ""))
+        if match is None or match["access_key"] != self.access_key or match["region"] != self.region:
+            return False
+        url = urlsplit(raw_path)
+        query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(parse_qsl(url.query, keep_blank_values=True))
+        )
+        signed = match["signed"].split(";")
+        if "host" not in signed or "x-amz-date" not in signed:
+            return False
+        canonical_headers = "".join(f"{name}:{(headers.get(name) or '').strip()}\n" for name in signed)
+        canonical_request = "\n".join((method, url.path, query, canonical_headers, match["signed"], headers.get("x-amz-content-sha256", "")))
+        string_to_sign = "\n".join((
+            "AWS4-HMAC-SHA256",
+            headers.get("x-amz-date", ""),
+            f"{match['date']}/{self.region}/s3/aws4_request",
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ))
+        expected = hmac.new(signature_key(self.secret_key, match["date"], self.region), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, match["signature"])
+
+
+class _S3RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    s3: S3Server
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status: int, body: bytes = b"", content_type: str = "application/xml") -> None:
+        self.send_response(status)
+        self.send_header("content-length", str(len(body)))
+        self.send_header("content-type", content_type)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def error(self, status: int, code: str) -> None:
+        self.reply(status, f"<Error><Code>{code}</Code></Error>".encode())
+
+    def handle_request(self) -> None:
+        self.s3.requests.append((self.command, self.path))
+        length = int(self.headers.get("content-length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not self.s3.check_signature(self.command, self.path, self.headers):
+            return self.error(403, "SignatureDoesNotMatch")
+        path = unquote(urlsplit(self.path).path)
+        if path != f"/{self.s3.bucket}" and not path.startswith(f"/{self.s3.bucket}/"):
+            return self.error(404, "NoSuchBucket")
+        key = path[len(self.s3.bucket) + 2:]
+        if not key:
+            return self.list_objects() if self.command == "GET" else self.error(405, "MethodNotAllowed")
+        if self.command == "PUT":
+            source = self.headers.get("x-amz-copy-source")
+            if source:
+                source_key = unquote(source).lstrip("/").split("/", 1)[1]
+                if source_key not in self.s3.objects:
+                    return self.error(404, "NoSuchKey")
+                body = self.s3.objects[source_key]
+            self.s3.objects[key] = body
+            self.s3.modified[key] = datetime.now(timezone.utc)
+            return self.reply(200)
+        if self.command == "DELETE":
+            self.s3.objects.pop(key, None)
+            self.s3.modified.pop(key, None)
+            return self.reply(204)
+        if key not in self.s3.objects:
+            return self.error(404, "NoSuchKey")
+        self.reply(200, self.s3.objects[key], "application/octet-stream")
+
+    def list_objects(self) -> None:
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        # Ordre des octets UTF-8 des clés, comme S3
+        keys = sorted((key for key in self.s3.objects if key.startswith(query.get("prefix", ""))), key=lambda key: key.encode())
+        start = int(query.get("continuation-token", "0"))
+        page = keys[start:start + self.s3.page_size]
+        truncated = start + self.s3.page_size < len(keys)
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key>"
+            f"<LastModified>{self.s3.modified[key].strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+            f"<Size>{len(self.s3.objects[key])}</Size></Contents>"
+            for key in page
+        )
+        token = f"<NextContinuationToken>{start + self.s3.page_size}</NextContinuationToken>" if truncated else ""
+        self.reply(200, (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"{contents}<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}</ListBucketResult>"
+        ).encode())
+
+    do_GET = do_PUT = do_HEAD = do_DELETE = handle_request
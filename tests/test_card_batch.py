@@ -0,0 +1,84 @@
+# tests/test_card_batch.py
+import asyncio
+from io import BytesIO
+import random
+import zipfile
+
+import pytest
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.features.cards import repository, services
+from app.features.cards.dependencies import build_cards_service
+from app.features.cards.schemas import CardBatchSchema, CreateCardSchema
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_cards(seed, count: int, image_urls: dict[int, str] = {}, inactive: set[int] = set()) -> list:
+    async with AsyncSessionLocal() as session:
+        service = build_cards_service(session)
+        return [await service.create(CreateCardSchema(
+            first_name=f"Zoé{i}", last_name="Ngo", contact=f"69000000{i}", email=f"m{i}@example.com",
+            department_id=seed["department_id"], municipality_id=seed["municipality_id"], is_active=i not in inactive,
+        ), image_urls.get(i), seed["user_id"]) for i in range(count)]
+
+
+@pytest.fixture
+def slow_renders(monkeypatch) -> dict:
+    """Rendus de durée aléatoire : les premières cartes ne sont pas forcément prêtes les premières."""
+    stats = {"running": 0, "max_running": 0}
+    run_in_render_executor = services.run_in_render_executor
+
+    async def slow(func, *args):
+        stats["running"] += 1
+        stats["max_running"] = max(stats["max_running"], stats["running"])
+        try:
+            await asyncio.sleep(random.uniform(0, 0.02))
+            return await run_in_render_executor(func, *args)
+        finally:
+            stats["running"] -= 1
+
+    monkeypatch.setattr(services, "run_in_render_executor", slow)
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 2)
+    return stats
+
+
+async def test_batch_zip_lists_cards_by_number(admin_client, seed, slow_renders, monkeypatch):
+    monkeypatch.setattr(repository, "IN_CHUNK_SIZE", 3)  # plusieurs paquets d'identifiants
+    cards = await create_cards(seed, 8, {5: f"{settings.DOMAIN_URL}/{settings.PROFILE_IMAGE_DIR.as_posix()}/introuvable.jpg"})
+    card_ids = [str(card.id) for card in cards]
+    random.shuffle(card_ids)
+
+    response = await admin_client.post("/card/pdf/batch", json={"card_ids": card_ids})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert names == [f"carte_membre_{card.number:04d}_Ngo_Zoé{i}.pdf" for i, card in enumerate(cards) if i != 5] + ["erreurs.txt"]
+        assert all(archive.read(name).startswith(b"%PDF") for name in names[:-1])
+        assert archive.read("erreurs.txt").decode() == f"0006 Ngo Zoé5 ({cards[5].id}): Image not found\n"
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+    assert slow_renders["max_running"] <= 4  # 2 x RENDER_WORKERS
+
+
+async def test_batch_by_filters_skips_other_cards(admin_client, seed, slow_renders):
+    cards = await create_cards(seed, 3, inactive={1})
+
+    response = await admin_client.post("/card/pdf/batch", json={"department_id": str(seed["department_id"]), "is_active": True})
+
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.namelist() == [f"carte_membre_{card.number:04d}_Ngo_Zoé{i}.pdf" for i, card in enumerate(cards) if i != 1]
+
+
+async def test_stream_batch_chunks_ids(seed, monkeypatch):
+    monkeypatch.setattr(repository, "IN_CHUNK_SIZE", 2)
+    cards = await create_cards(seed, 5)
+    ids = [card.id for card in reversed(cards)] + [cards[0].id]  # désordre et doublon
+
+    async with AsyncSessionLocal() as session:
+        streamed = [card.number async for card in repository.CardRepository(session).stream_batch(CardBatchSchema(card_ids=ids))]
+
+    assert streamed == [1, 2, 3, 4, 5]
@@ -0,0 +1,135 @@
+# tests/test_card_download.py
+from email import message_from_bytes
+import json
+import re
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.helper import AppHelper
+from app.features.cards import services
+from app.features.cards.dependencies import build_cards_service
+from app.features.cards.schemas import CreateCardSchema
+from app.features.outbox.models import EmailOutboxModel
+
+pytestmark = pytest.mark.anyio
+
+LINK = re.compile(r"http://testserver/card/download/\S+")
+
+
+@pytest.fixture
+async def card(seed):
+    async with AsyncSessionLocal() as session:
+        return await build_cards_service(session).create(CreateCardSchema(
+            first_name="Zoé", last_name="Ngo", contact="690000000", email="zoe@example.com",
+            department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+        ), None, seed["user_id"])
+
+
+@pytest.fixture
+def renders(monkeypatch) -> list[str]:
+    """Noms des rendus lancés dans le pool de rendu."""
+    calls = []
+    run_in_render_executor = services.run_in_render_executor
+
+    async def counting(func, *args):
+        calls.append(func.__name__)
+        return await run_in_render_executor(func, *args)
+
+    monkeypatch.setattr(services, "run_in_render_executor", counting)
+    return calls
+
+
+async def download_url(card) -> str:
+    async with AsyncSessionLocal() as session:
+        service = build_cards_service(session)
+        return service.card_download_url(await service.repository.get_by_id_model(card.id))
+
+
+def path_of(url: str) -> str:
+    return url[len(settings.DOMAIN_URL):]
+
+
+def with_params(url: str, **changes: str) -> str:
+    parts = urlsplit(url)
+    params = {name: values[0] for name, values in parse_qs(parts.query).items()} | changes
+    return f"{parts.path}?{'&'.join(f'{name}={value}' for name, value in params.items())}"
+
+
+async def test_signed_link_serves_the_pdf_from_cache(admin_client, card, renders):
+    url = path_of(await download_url(card))
+    admin_client.headers.pop("Authorization")  # lien public
+
+    first = await admin_client.get(url)
+    second = await admin_client.get(url)
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["content-type"] == "application/pdf"
+    assert first.content.startswith(b"%PDF") and second.content == first.content
+    assert renders == ["render_card_pdf"]  # second accès : fichier en cache
+
+
+async def test_expired_link_is_gone(admin_client, card):
+    expires = str(int(time.time()) - 60)
+    version = parse_qs(urlsplit(await download_url(card)).query)["v"][0]
+    signature = AppHelper.sign("card-pdf", str(card.id), version, expires)
+
+    response = await admin_client.get(f"/card/download/{card.id}", params={"v": version, "expires": expires, "sig": signature})
+
+    assert response.status_code == 410
+
+
+@pytest.mark.parametrize("change", ["card_id", "v", "expires", "sig"])
+async def test_tampered_link_is_forbidden(admin_client, card, seed, change):
+    url = path_of(await download_url(card))
+    if change == "card_id":
+        async with AsyncSessionLocal() as session:
+            other = await build_cards_service(session).create(CreateCardSchema(
+                first_name="Paul", last_name="Ngo", contact="690000001", email="paul@example.com",
+                department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+            ), None, seed["user_id"])
+        url = url.replace(str(card.id), str(other.id))
+    else:
+        value = parse_qs(urlsplit(url).query)[change][0]
+        tampered = str(int(value) + 86400) if change == "expires" else ("A" if value[0] != "A" else "B") + value[1:]
+        url = with_params(url, **{change: tampered})
+
+    response = await admin_client.get(url)
+
+    assert response.status_code == 403
+
+
+async def test_email_carries_a_link_instead_of_the_pdf(admin_client, card, renders, monkeypatch):
+    monkeypatch.setattr(settings, "CARD_EMAIL_DELIVERY", "link")
+
+    response = await admin_client.post(f"/card/send-email/{card.id}")
+
+    assert response.status_code == 200
+    assert renders == []  # rendu au premier téléchargement
+    async with AsyncSessionLocal() as db:
+        email = (await db.scalars(select(EmailOutboxModel))).one()
+    assert email.to_email == "zoe@example.com"
+    assert email.attachments == []
+    url = LINK.search(email.body).group(0)
+    assert f'href="{url.replace("&", "&amp;")}"' in email.html_body
+    response = await admin_client.get(path_of(url))
+    assert response.status_code == 200 and response.content.startswith(b"%PDF")
+
+
+async def test_bulk_email_carries_a_link_instead_of_the_pdf(admin_client, card, renders, smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "CARD_EMAIL_DELIVERY", "link")
+
+    response = await admin_client.post("/card/send-email/batch", json={"card_ids": [str(card.id)]})
+
+    assert [json.loads(line)["sent"] for line in response.text.splitlines()] == [True]
+    assert renders == []
+    [(recipients, data)] = smtp_server.messages
+    assert recipients == ["zoe@example.com"]
+    message = message_from_bytes(data)
+    assert [part.get_content_type() for part in message.walk() if part.get_filename()] == []
+    text = next(part for part in message.walk() if part.get_content_type() == "text/plain")
+    assert LINK.search(text.get_payload(decode=True).decode()) is not None
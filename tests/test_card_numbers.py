@@ -0,0 +1,70 @@
+# tests/test_card_numbers.py
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.features.cards.allocator import CardNumberAllocator
+from app.features.cards.dependencies import build_cards_service
+from app.features.cards.models import CardModel
+from app.features.cards.schemas import CreateCardSchema
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_allocations_are_unique_and_consecutive(db_engine):
+    # Quatre "workers" indépendants qui se disputent le même compteur
+    allocators = [CardNumberAllocator() for _ in range(4)]
+    numbers = await asyncio.gather(*(allocators[i % 4].allocate(db_engine) for i in range(200)))
+
+    assert sorted(numbers) == list(range(1, 201))
+
+
+async def test_block_allocations_do_not_overlap(db_engine):
+    allocators = [CardNumberAllocator(block_size=10) for _ in range(4)]
+    numbers = await asyncio.gather(*(allocator.allocate(db_engine) for allocator in allocators for _ in range(50)))
+
+    # Blocs entièrement consommés : ni doublon ni trou
+    assert sorted(numbers) == list(range(1, 201))
+
+
+async def test_ranges_are_consecutive(db_engine):
+    allocator = CardNumberAllocator()
+    firsts = await asyncio.gather(*(allocator.allocate(db_engine, count=5) for _ in range(20)))
+
+    numbers = sorted(first + offset for first in firsts for offset in range(5))
+    assert numbers == list(range(1, 101))
+
+
+async def test_concurrent_card_creation(seed):
+    async def create(i: int) -> int:
+        async with AsyncSessionLocal() as session:
+            schema = CreateCardSchema(
+                first_name=f"Jean{i}", last_name=f"Dupont{i}", contact=f"6900{i:05d}", email=f"m{i}@example.com",
+                department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+            )
+            card = await build_cards_service(session).create(schema, None, seed["user_id"])
+            return card.number
+
+    numbers = await asyncio.gather(*(create(i) for i in range(50)))
+
+    assert sorted(numbers) == list(range(1, 51))
+    async with AsyncSessionLocal() as session:
+        stored = (await session.execute(select(CardModel.number).order_by(CardModel.number))).scalars().all()
+    assert stored == list(range(1, 51))
+
+
+async def test_counter_starts_after_existing_cards(db_engine, seed):
+    # Base antérieure au compteur : des cartes existent déjà, la table card_number_counters est vide
+    async with AsyncSessionLocal() as session:
+        session.add(CardModel(
+            number=41, first_name="Jean", last_name="Dupont", contact="690000000", email="m@example.com",
+            department_id=seed["department_id"], municipality_id=seed["municipality_id"], creator_id=seed["user_id"],
+        ))
+        await session.commit()
+
+    allocators = [CardNumberAllocator() for _ in range(3)]
+    numbers = await asyncio.gather(*(allocators[i % 3].allocate(db_engine) for i in range(30)))
+
+    assert sorted(numbers) == list(range(42, 72))
@@ -0,0 +1,48 @@
+# tests/test_card_preview.py
+from io import BytesIO
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.features.cards.dependencies import build_cards_service
+from app.features.cards.schemas import CreateCardSchema
+
+pytestmark = pytest.mark.anyio
+
+
+def write_background(path, color: tuple[int, int, int], age: float) -> None:
+    Image.new("RGB", (856, 540), color).save(path, "PNG")
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+async def test_preview_follows_background_changes(admin_client, seed, tmp_path, monkeypatch):
+    async with AsyncSessionLocal() as session:
+        card = await build_cards_service(session).create(CreateCardSchema(
+            first_name="Zoé", last_name="Ngo", contact="690000000", email="zoe@example.com",
+            department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+        ), None, seed["user_id"])
+    background = tmp_path / "background.png"
+    monkeypatch.setattr(settings, "CARD_BACKGROUND_IMAGE_PATH", str(background))
+
+    async def preview() -> tuple[str, tuple[int, int, int]]:
+        response = await admin_client.get(f"/card/preview/{card.id}", params={"format": "png"})
+        assert response.status_code == 200
+        with Image.open(BytesIO(response.content)) as image:
+            return response.headers["etag"], image.convert("RGB").getpixel((2, 2))
+
+    write_background(background, (200, 0, 0), age=60)
+    red_etag, red = await preview()
+    # Même fichier réécrit : l'aperçu suit, sous une nouvelle clé
+    write_background(background, (0, 0, 200), age=0)
+    blue_etag, blue = await preview()
+    other = tmp_path / "other.png"
+    write_background(other, (0, 200, 0), age=0)
+    monkeypatch.setattr(settings, "CARD_BACKGROUND_IMAGE_PATH", str(other))
+    green_etag, green = await preview()
+
+    assert len({red_etag, blue_etag, green_etag}) == 3
+    assert red[0] > 150 and blue[2] > 150 and green[1] > 150
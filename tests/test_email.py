@@ -0,0 +1,89 @@
+# tests/test_email.py
+from email import message_from_bytes
+from email.header import decode_header, make_header
+import re
+
+import pytest
+from aiosmtplib.email import flatten_message
+
+from app.core import email
+from app.core.email import EncodedPart, MimePartCache, build_encoded_message, build_message
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 64
+
+CASES = {
+    "ascii": ("member@example.com", "Votre carte", "Bonjour", None, None),
+    "non_ascii": (
+        "zoe@example.com",
+        "Votre carte de membre – Zoé Ngo’o, Douala (Littoral) ✓",
+        "Bonjour Zoé,\nVoici votre carte n° 42. À bientôt !\n",
+        "<p>Bonjour <strong>Zoé Ngo’o</strong>, voici votre carte n° 42 ✓</p>",
+        [("carte-zoé-ngo’o.pdf", PDF, "application/pdf")],
+    ),
+    "long_subject": (
+        "member@example.com",
+        "Votre carte de membre du parti pour la commune de Douala 1er, département du Wouri, région du Littoral, exercice 2026",
+        "x" * 2000,
+        "<p>" + "é" * 2000 + "</p>",
+        [("a.pdf", PDF, "application/pdf"), ("photo.jpeg", b"\xff\xd8\xff" + PDF, "image/jpeg")],
+    ),
+}
+
+
+def normalized(data: bytes) -> bytes:
+    """Remplace la frontière MIME (aléatoire) par une valeur fixe."""
+    boundary = re.search(rb'boundary="([^"]+)"', data).group(1)
+    return data.replace(boundary, b"BOUNDARY")
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_encoded_message_matches_build_message(case):
+    to, subject, body, html_body, attachments = CASES[case]
+
+    expected = flatten_message(build_message(to, subject, body, html_body, attachments))
+    encoded = build_encoded_message(to, subject, body, html_body, attachments)
+
+    assert encoded.to == to
+    assert normalized(encoded.data) == normalized(expected)
+    assert encoded.data.isascii()
+
+
+def test_encoded_message_decodes_to_same_content():
+    to, subject, body, html_body, attachments = CASES["non_ascii"]
+    parsed = message_from_bytes(build_encoded_message(to, subject, body, html_body, attachments).data)
+
+    assert str(parsed["Subject"]) != subject  # encodé (RFC 2047)
+    assert str(make_header(decode_header(parsed["Subject"]))) == subject
+    text, html, pdf = parsed.get_payload()
+    assert text.get_payload(decode=True).decode(text.get_content_charset()) == body
+    assert html.get_payload(decode=True).decode(html.get_content_charset()) == html_body
+    assert pdf.get_filename() == "carte-zoé-ngo’o.pdf"
+    assert pdf.get_payload(decode=True) == PDF
+
+
+def test_parts_are_encoded_once_per_cache():
+    parts = MimePartCache()
+    attachment = ("carte.pdf", PDF, "application/pdf")
+
+    first = build_encoded_message("a@example.com", "Carte", "Bonjour", "<p>Bonjour</p>", [attachment], parts=parts)
+    second = build_encoded_message("b@example.com", "Carte", "Bonjour", "<p>Bonjour</p>", [attachment], parts=parts)
+
+    assert parts.attachment(*attachment) is parts.attachment("carte.pdf", bytes(PDF), "application/pdf")
+    assert len(parts._parts) == 3
+    assert normalized(first.data).replace(b"a@example.com", b"b@example.com") == normalized(second.data)
+
+
+def test_boundary_never_appears_in_parts(monkeypatch):
+    taken = "=" * 15 + "0" * 19 + "=="
+    boundaries = iter([taken, "=" * 15 + "1" * 19 + "=="])
+    monkeypatch.setattr(email, "_make_boundary", lambda: next(boundaries))
+    # Corps texte (7bit, recopié tel quel) contenant la première frontière tirée
+    body = EncodedPart.text(f"Bonjour\n--{taken}\nfin")
+
+    encoded = build_encoded_message("member@example.com", "Carte", body, None, [("a.pdf", PDF, "application/pdf")])
+
+    parsed = message_from_bytes(encoded.data)
+    assert parsed.get_boundary() == "=" * 15 + "1" * 19 + "=="
+    text, pdf = parsed.get_payload()
+    assert text.get_payload() == f"Bonjour\n--{taken}\nfin"
+    assert pdf.get_payload(decode=True) == PDF
@@ -0,0 +1,187 @@
+# tests/test_email_templates.py
+from html.parser import HTMLParser
+import re
+
+import pytest
+from jinja2 import UndefinedError
+
+from app.core import email_templates
+from app.core.email_templates import TEMPLATES_DIR, inline_css, render_email
+
+TEMPLATES = sorted(path.stem for path in TEMPLATES_DIR.glob("*.html") if path.name != email_templates.LAYOUT)
+# "fr" n'a pas de traduction : gabarit par défaut, mais `lang` suit la langue demandée
+LOCALES = ["en", "fr"]
+
+CONTEXT = {
+    "user_first_name": "Zoé <Ngo>",
+    "user_email": "zoe@example.com",
+    "reset_link": "https://example.com/reset?token=a&b=1",
+    "expiration_time": 30,
+    "reset_date_time": "2026-10-18 10:00",
+    "plan_name": "Premium",
+    "amount_paid": "5 000 FCFA",
+    "payment_date": "2026-10-18",
+    "manage_subscription_link": "https://example.com/account",
+    "getting_started_link": "https://example.com/start",
+    "documentation_link": "https://example.com/docs",
+}
+
+HEADINGS = {
+    "password_changed": "Password Successfully Changed",
+    "payment_confirmation": "Subscription Activated!",
+    "reset_password": "Reset your password",
+    "welcome": "Welcome to Liberal!",
+}
+
+
+class _Elements(HTMLParser):
+    """Relève (balise, classes, style) de chaque élément du corps et le contenu des <style>."""
+
+    def __init__(self):
+        super().__init__()
+        self.elements: list[tuple[str, set[str], str]] = []
+        self.styles: list[str] = []
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        self._in_style = tag == "style"
+        self.elements.append((tag, set((attributes.get("class") or "").split()), attributes.get("style") or ""))
+
+    def handle_endtag(self, tag):
+        self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.styles.append(data)
+
+
+def parse(html: str) -> _Elements:
+    parser = _Elements()
+    parser.feed(html)
+    return parser
+
+
+def style_of(html: str, tag: str, css_class: str = None) -> dict[str, str]:
+    """Déclarations en ligne du premier élément `tag` (portant `css_class`), dans l'ordre."""
+    for element, classes, style in parse(html).elements:
+        if element == tag and (css_class is None or css_class in classes):
+            declarations: dict[str, str] = {}
+            for name, _, value in (item.partition(":") for item in style.split(";")):
+                if name.strip():
+                    declarations.pop(name.strip(), None)
+                    declarations[name.strip()] = value.strip()
+            return declarations
+    raise AssertionError(f"<{tag} class={css_class}> introuvable")
+
+
+@pytest.mark.parametrize("locale", LOCALES)
+@pytest.mark.parametrize("name", TEMPLATES)
+def test_html_part_has_inlined_styles(name, locale):
+    email = render_email(name, locale, **CONTEXT)
+
+    assert f'<html lang="{locale}">' in email.html
+    assert HEADINGS[name] in email.html
+    # Plus aucune règle simple dans <style> : seuls @media et :hover y restent
+    css = re.sub(r"@media[^{]*\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}", "", "".join(parse(email.html).styles))
+    assert all(":hover" in rule for rule in re.findall(r"[^{}]+\{", css))
+    assert "@media" in "".join(parse(email.html).styles)
+
+    body = style_of(email.html, "body")
+    assert body["background-color"] == "#1E1E1E"
+    assert body["padding"] == "20px 0"  # `body` l'emporte sur `body, p, h1…` (même spécificité, plus loin)
+    assert list(body).index("padding") > list(body).index("margin")
+    assert style_of(email.html, "h1") == {
+        "margin": "0", "padding": "0", "font-family": "'Arial', sans-serif",
+        "color": "white", "font-size": "22px", "margin-bottom": "20px", "font-weight": "bold",
+    }
+    assert style_of(email.html, "div", "footer")["color"] == "#777777"
+    # Descendants : `.footer p` plus spécifique que `p`
+    assert "color: #777777; margin-bottom: 8px; font-size: 12px\">This email was sent to zoe@example.com</p>" in email.html
+    # Valeurs échappées dans le HTML
+    assert "Zoé &lt;Ngo&gt;" in email.html
+    assert "<Ngo>" not in email.html
+
+
+@pytest.mark.parametrize("locale", LOCALES)
+@pytest.mark.parametrize("name", TEMPLATES)
+def test_text_part(name, locale):
+    email = render_email(name, locale, **CONTEXT)
+
+    assert not re.search(r"<[a-zA-Z/!][^>]*>", email.text.replace(CONTEXT["user_first_name"], ""))
+    assert "{{" not in email.text and "{%" not in email.text
+    assert "font-family" not in email.text and "@media" not in email.text
+    paragraphs = email.text.rstrip("\n").split("\n\n")
+    assert paragraphs[0] == HEADINGS[name]
+    # Valeurs non échappées dans le texte
+    assert "Hello Zoé <Ngo>," in paragraphs
+    assert "📧 cli.support@menosi.net" in paragraphs
+    assert "This email was sent to zoe@example.com" in paragraphs
+    assert all(paragraph == " ".join(paragraph.split()) for paragraph in paragraphs)
+
+
+def test_page_styles_override_layout():
+    email = render_email("reset_password", **CONTEXT)
+
+    button = style_of(email.html, "a", "action-button")
+    assert button["margin"] == "25px 0"  # règle de la page, après celle du gabarit
+    assert button["color"] == "white !important"  # `.content a` ne l'emporte pas sur !important
+    assert style_of(email.html, "div", "support-info")["color"] == "#777777"
+    subtle = style_of(email.html, "p", "subtle-text")
+    assert (subtle["color"], subtle["font-size"]) == ("#777777", "14px")
+    # L'attribut style d'origine reste prioritaire
+    centered = [style for tag, _, style in parse(email.html).elements if tag == "p" and style.endswith("text-align: center")]
+    assert len(centered) == 1
+    assert "Reset my password (https://example.com/reset?token=a&b=1)" in email.text
+
+
+def test_nested_descendant_selectors():
+    email = render_email("payment_confirmation", **CONTEXT)
+
+    details = [style for tag, _, style in parse(email.html).elements if tag == "strong"]
+    assert "min-width: 80px" not in details[0]  # hors de .details-section
+    assert all("min-width: 80px; display: inline-block" in style for style in details[1:])
+    assert len(details) == 5
+    assert "min-width: 60px" in "".join(parse(email.html).styles)  # règle @media conservée
+    assert "Plan: Premium" in email.text
+    assert "account settings (https://example.com/account)" in email.text
+
+
+def test_missing_variable_is_an_error():
+    with pytest.raises(UndefinedError):
+        render_email("welcome", user_first_name="Zoé", user_email="zoe@example.com")
+
+
+def test_localized_page_is_used(tmp_path, monkeypatch):
+    (tmp_path / "fr").mkdir()
+    (tmp_path / email_templates.LAYOUT).write_text(
+        '<html lang="{{ locale }}"><head><title><!-- title --></title><style>p { color: red; }</style></head>'
+        "<body><!-- content --></body></html>"
+    )
+    (tmp_path / "notice.html").write_text("<title>Notice</title><p>Hello {{ member }}</p>")
+    (tmp_path / "fr" / "notice.html").write_text(
+        "<title>Avis</title><style>.note { font-weight: bold; }</style><p class=\"note\">Bonjour {{ member }}</p>"
+    )
+    monkeypatch.setattr(email_templates, "TEMPLATES_DIR", tmp_path)
+    monkeypatch.setattr(email_templates, "_html_environment", email_templates._environment(autoescape=True))
+    monkeypatch.setattr(email_templates, "_text_environment", email_templates._environment(autoescape=False))
+    email_templates._localized_page.cache_clear()
+    try:
+        french = render_email("notice", "fr", member="Zoé")
+        english = render_email("notice", "en", member="Zoé")
+        other = render_email("notice", "de", member="Zoé")
+    finally:
+        email_templates._localized_page.cache_clear()
+
+    assert '<p class="note" style="color: red; font-weight: bold">Bonjour Zoé</p>' in french.html
+    assert "<title>Avis</title>" in french.html
+    assert french.text == "Bonjour Zoé\n"
+    assert '<p style="color: red">Hello Zoé</p>' in english.html
+    assert english.text == "Hello Zoé\n"
+    assert '<html lang="de">' in other.html and other.text == "Hello Zoé\n"
+
+
+def test_inline_css_keeps_existing_style_last():
+    html = inline_css('<style>p { color: red; margin: 0 } .x { margin-bottom: 4px }</style><p class="x" style="color: blue">a</p>')
+
+    assert '<p class="x" style="color: red; margin: 0; margin-bottom: 4px; color: blue">a</p>' in html
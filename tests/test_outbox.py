@@ -0,0 +1,139 @@
+# tests/test_outbox.py
+from datetime import datetime, timedelta, timezone
+import uuid
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.features.outbox.models import OUTBOX_FAILED, OUTBOX_PENDING, OUTBOX_SENT, EmailOutboxAttachmentModel, EmailOutboxModel
+from app.features.outbox.repository import EmailOutboxRepository
+from app.features.outbox.services import EmailOutboxService
+from app.features.outbox.worker import EmailOutboxWorker
+
+pytestmark = pytest.mark.anyio
+
+
+async def enqueue(to: str, attachments=None) -> uuid.UUID:
+    async with AsyncSessionLocal() as db:
+        email = await EmailOutboxService(EmailOutboxRepository(db)).enqueue(to, "Votre carte", "Bonjour", attachments=attachments)
+        return email.id
+
+
+async def load(id: uuid.UUID) -> EmailOutboxModel:
+    async with AsyncSessionLocal() as db:
+        return await db.get(EmailOutboxModel, id)
+
+
+async def make_due(id: uuid.UUID) -> None:
+    """Avance l'horloge du message : échéance (ou fin de bail) passée."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(EmailOutboxModel).where(EmailOutboxModel.id == id).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        await db.commit()
+
+
+def utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def test_delivers_pending_email(db_engine, smtp_server):
+    id = await enqueue("member@example.com", [("carte.pdf", b"%PDF-1.4 test", "application/pdf")])
+
+    assert await EmailOutboxWorker().process_due() == 1
+
+    assert [recipients for recipients, _ in smtp_server.messages] == [["member@example.com"]]
+    assert b'filename="carte.pdf"' in smtp_server.messages[0][1]
+    email = await load(id)
+    assert (email.status, email.attempts, email.last_error) == (OUTBOX_SENT, 1, None)
+    assert email.sent_at is not None
+    async with AsyncSessionLocal() as db:
+        attachments = await db.scalar(select(func.count()).select_from(EmailOutboxAttachmentModel))
+    assert attachments == 0  # supprimées une fois le message remis
+
+
+async def test_temporary_failure_is_retried_later(db_engine, smtp_server):
+    smtp_server.replies["member@example.com"] = "451 4.3.0 Try again later"
+    id = await enqueue("member@example.com")
+    worker = EmailOutboxWorker()
+
+    before = datetime.now(timezone.utc)
+    assert await worker.process_due() == 1
+    email = await load(id)
+    assert (email.status, email.attempts) == (OUTBOX_PENDING, 1)
+    assert "451" in email.last_error
+    assert utc(email.next_attempt_at) >= before + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 0.8)
+
+    # Pas avant l'échéance
+    assert await worker.process_due() == 0
+
+    smtp_server.replies.clear()
+    await make_due(id)
+    assert await worker.process_due() == 1
+    email = await load(id)
+    assert (email.status, email.attempts) == (OUTBOX_SENT, 2)
+    assert len(smtp_server.messages) == 1
+
+
+async def test_permanent_failure_is_not_retried(db_engine, smtp_server):
+    smtp_server.replies["unknown@example.com"] = "550 5.1.1 No such user"
+    id = await enqueue("unknown@example.com")
+    worker = EmailOutboxWorker()
+
+    assert await worker.process_due() == 1
+
+    email = await load(id)
+    assert (email.status, email.attempts) == (OUTBOX_FAILED, 1)
+    assert "550" in email.last_error
+    await make_due(id)
+    assert await worker.process_due() == 0
+
+
+async def test_gives_up_after_max_attempts(db_engine, smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 0)
+    smtp_server.replies["member@example.com"] = "421 4.7.0 Too busy"
+    id = await enqueue("member@example.com")
+    worker = EmailOutboxWorker()
+
+    for _ in range(3):
+        assert await worker.process_due() == 1
+    assert await worker.process_due() == 0
+
+    email = await load(id)
+    assert (email.status, email.attempts) == (OUTBOX_FAILED, 3)
+
+
+async def test_leased_email_is_taken_over_after_lease(db_engine, smtp_server):
+    id = await enqueue("member@example.com")
+    # Un worker réserve le message puis disparaît sans le remettre
+    async with AsyncSessionLocal() as db:
+        claimed = await EmailOutboxRepository(db).claim_due(datetime.now(timezone.utc), 10, timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS))
+    assert [email.id for email in claimed] == [id]
+    worker = EmailOutboxWorker()
+
+    assert await worker.process_due() == 0  # bail en cours
+    assert smtp_server.messages == []
+
+    await make_due(id)  # bail expiré
+    assert await worker.process_due() == 1
+    email = await load(id)
+    assert (email.status, email.attempts) == (OUTBOX_SENT, 2)
+    assert len(smtp_server.messages) == 1
+
+
+async def test_claims_do_not_overlap(db_engine):
+    ids = {await enqueue(f"m{i}@example.com") for i in range(12)}
+    now = datetime.now(timezone.utc)
+    lease = timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+
+    async with AsyncSessionLocal() as db:
+        first = {email.id for email in await EmailOutboxRepository(db).claim_due(now, 5, lease)}
+    async with AsyncSessionLocal() as db:
+        second = {email.id for email in await EmailOutboxRepository(db).claim_due(now, 50, lease)}
+    async with AsyncSessionLocal() as db:
+        third = await EmailOutboxRepository(db).claim_due(now, 50, lease)
+
+    assert len(first) == 5 and len(second) == 7
+    assert first | second == ids
+    assert third == []
@@ -0,0 +1,168 @@
+# tests/test_photo_gc.py
+from datetime import datetime, timedelta, timezone
+import os
+from pathlib import Path
+import time
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.storage.content import StoredFileModel, content_store
+from app.features.cards.models import CardModel
+from app.features.cards.photo_gc import PhotoGarbageCollector, collect_photo_garbage
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("profile_images")]
+
+DAY = 24 * 3600
+GRACE = timedelta(hours=24)
+
+
+def write_file(name: str, age: float = 2 * DAY, data: bytes = b"photo") -> Path:
+    """Fichier `name` (chemin relatif à PROFILE_IMAGE_DIR) modifié il y a `age` secondes."""
+    path = settings.PROFILE_IMAGE_DIR / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def write_photo(digest: str, age: float = 2 * DAY, derivatives: tuple[str, ...] = ("thumb.webp", "list.webp")) -> list[Path]:
+    """Photo rangée par le stockage par contenu, avec ses déclinaisons."""
+    directory = f"{digest[:2]}/{digest[2:4]}"
+    return [write_file(f"{directory}/{digest}.jpg", age)] + [write_file(f"{directory}/{digest}-{name}", age) for name in derivatives]
+
+
+def url_of(path: Path) -> str:
+    return f"{settings.DOMAIN_URL}/{path.as_posix()}"
+
+
+async def add_cards(seed, *urls: str) -> None:
+    async with AsyncSessionLocal() as db:
+        for index, url in enumerate(urls):
+            db.add(CardModel(
+                creator_id=seed["user_id"], number=index + 1, first_name="Zoé", last_name="Ngo", contact=f"69000000{index}",
+                email=f"m{index}@example.com", image_url=url,
+                department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+            ))
+        await db.commit()
+
+
+async def age_records(age: float = 2 * DAY) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(StoredFileModel).values(updated_at=datetime.now(timezone.utc) - timedelta(seconds=age)))
+        await db.commit()
+
+
+async def refcounts() -> dict[str, int]:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(select(StoredFileModel.path, StoredFileModel.refcount))).all())
+
+
+@pytest.mark.parametrize("batch_size", [1, 1000])
+async def test_old_orphans_are_deleted_with_their_derivatives(seed, batch_size):
+    referenced = write_photo("a1" * 32)
+    orphan = write_photo("b2" * 32)
+    recent = write_photo("c3" * 32, age=60)
+    await add_cards(seed, url_of(referenced[0]))
+
+    report = await PhotoGarbageCollector(settings.PROFILE_IMAGE_DIR, GRACE, batch_size=batch_size).run()
+    assert (report.files, report.photos, report.orphans, report.recent_orphans, report.deleted) == (9, 1, 2, 1, 0)
+    assert report.missing_derivatives == 0
+    assert all(path.exists() for path in referenced + orphan + recent)
+
+    report = await PhotoGarbageCollector(settings.PROFILE_IMAGE_DIR, GRACE, delete=True, batch_size=batch_size).run()
+    assert (report.orphans, report.recent_orphans, report.deleted) == (2, 1, 1)
+    assert not any(path.exists() for path in orphan)
+    assert all(path.exists() for path in referenced + recent)
+
+
+async def test_legacy_names_are_separate_photos(seed):
+    # Anciens envois gardés sous le nom du fichier envoyé : "photo.jpg" n'a pas de déclinaison "-2023.jpg"
+    kept = write_file("photo-2023.jpg")
+    unused = write_file("photo.jpg")
+    uuid = write_file(f"{'d' * 32}.png")
+    uuid_thumb = write_file(f"{'d' * 32}-thumb.webp")
+    await add_cards(seed, url_of(kept))
+
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+
+    assert (report.photos, report.orphans, report.deleted, report.dangling) == (1, 2, 2, 0)
+    assert report.missing_derivatives == 0  # pas de déclinaisons pour ces noms
+    assert kept.exists()
+    assert not unused.exists() and not uuid.exists() and not uuid_thumb.exists()
+
+
+async def test_discarding_a_legacy_photo_keeps_similar_names(db_engine):
+    kept = write_file("photo-2023.jpg")
+    unused = write_file("photo.jpg")
+
+    assert await content_store.discard(unused.as_posix(), datetime.now(timezone.utc))
+
+    assert not unused.exists() and kept.exists()
+
+
+async def test_dangling_urls_are_reported(seed):
+    present = write_photo("a1" * 32)
+    missing = settings.PROFILE_IMAGE_DIR / "e5/e5" / f"{'e5' * 32}.jpg"
+    await add_cards(seed, url_of(present[0]), url_of(missing), url_of(missing))
+
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+
+    assert (report.photos, report.dangling, report.deleted) == (1, 1, 0)
+    assert f"Photo introuvable (2 carte(s)) : {missing.as_posix()}" in report.samples
+
+
+async def test_foreign_urls_stop_deletion(seed):
+    orphan = write_photo("b2" * 32)
+    await add_cards(seed, f"https://old.example.com/{orphan[0].as_posix()}")
+
+    report = await collect_photo_garbage(delete=False, grace=GRACE)
+    assert (report.foreign, report.orphans) == (1, 1)
+
+    with pytest.raises(RuntimeError, match="hors de"):
+        await collect_photo_garbage(delete=True, grace=GRACE)
+    assert all(path.exists() for path in orphan)
+
+
+async def test_interrupted_writes_and_deletions_are_finished(seed):
+    url = await content_store.write_bytes(settings.PROFILE_IMAGE_DIR, b"photo de carte", "jpg")
+    await add_cards(seed, url)
+    path = Path(url[len(settings.DOMAIN_URL) + 1:])
+    # Suppression interrompue d'une photo encore référencée, et d'une autre qui ne l'est plus
+    restored = path.rename(path.with_name(f".{path.name}.deleted"))
+    os.utime(restored, (time.time() - 2 * DAY, time.time() - 2 * DAY))
+    dropped = write_file(f"ab/cd/.{'ab' * 32}.jpg.deleted")
+    abandoned = write_file("ab/cd/tmpabc.tmp")
+    writing = write_file("ab/cd/tmpdef.tmp", age=60)
+
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+
+    assert report.leftovers == 3
+    assert path.exists() and not restored.exists()
+    assert not dropped.exists() and not abandoned.exists() and writing.exists()
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+    assert (report.leftovers, report.photos, report.dangling) == (0, 1, 0)
+
+
+async def test_wrong_refcounts_are_repaired(seed):
+    url = await content_store.write_bytes(settings.PROFILE_IMAGE_DIR, b"photo de carte", "jpg")
+    await content_store.write_bytes(settings.PROFILE_IMAGE_DIR, b"photo de carte", "jpg")
+    lost = await content_store.write_bytes(settings.PROFILE_IMAGE_DIR, b"photo perdue", "jpg")
+    Path(lost[len(settings.DOMAIN_URL) + 1:]).unlink()
+    await add_cards(seed, url)
+    key = url[len(settings.DOMAIN_URL) + 1:]
+
+    # Compteurs tout juste modifiés : un envoi est peut-être en cours
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+    assert (report.refcount_mismatches, report.stale_records, report.repaired) == (0, 1, 0)
+
+    await age_records()
+    report = await collect_photo_garbage(delete=False, grace=GRACE)
+    assert (report.refcount_mismatches, report.stale_records, report.repaired) == (1, 1, 0)
+    assert await refcounts() == {key: 2, lost[len(settings.DOMAIN_URL) + 1:]: 1}
+
+    report = await collect_photo_garbage(delete=True, grace=GRACE)
+    assert (report.refcount_mismatches, report.stale_records, report.repaired) == (1, 1, 2)
+    assert await refcounts() == {key: 1}
@@ -0,0 +1,121 @@
+# tests/test_photos.py
+from datetime import timedelta
+import hashlib
+from io import BytesIO
+import os
+from pathlib import Path
+import time
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.features.cards import photos
+from app.features.cards.models import CardModel
+from app.features.cards.photo_gc import collect_photo_garbage
+from app.features.cards.photos import photo_derivative_url
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("profile_images")]
+
+DAY = 24 * 3600
+
+
+def write_photo(mode: str = "RGB", age: float = 0) -> Path:
+    """Photo (contenu unique) rangée comme par le stockage par contenu : <dossier>/<h[:2]>/<h[2:4]>/<h>.jpg (ou .png)."""
+    buffer = BytesIO()
+    color = tuple(os.urandom(4 if mode == "RGBA" else 3))
+    Image.new(mode, (640, 480), color).save(buffer, "PNG" if mode == "RGBA" else "JPEG")
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    path = settings.PROFILE_IMAGE_DIR / digest[:2] / digest[2:4] / f"{digest}.{'png' if mode == 'RGBA' else 'jpg'}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if age:
+        os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def url_of(path: Path) -> str:
+    return f"{settings.DOMAIN_URL}/{path.as_posix()}"
+
+
+async def test_derivative_urls_are_built_without_storage_access(monkeypatch):
+    def no_stat(*args, **kwargs):
+        raise AssertionError("accès au disque")
+
+    monkeypatch.setattr(Path, "is_file", no_stat)
+    monkeypatch.setattr(Path, "stat", no_stat)
+    digest = "ab" * 32
+    url = f"{settings.DOMAIN_URL}/static/profile_images/ab/ab/{digest}.jpg"
+
+    assert photo_derivative_url(url, "thumb") == f"{settings.DOMAIN_URL}/static/profile_images/ab/ab/{digest}-thumb.webp"
+    assert photo_derivative_url(url, "list") == f"{settings.DOMAIN_URL}/static/profile_images/ab/ab/{digest}-list.webp"
+    assert photo_derivative_url(url, "print") == (
+        f"{settings.DOMAIN_URL}/static/profile_images/ab/ab/{digest}-print{settings.CARD_PRINT_DPI}q{settings.CARD_PHOTO_JPEG_QUALITY}.jpg"
+    )
+    # Anciens envois (uuid) : mêmes déclinaisons
+    legacy = f"{settings.DOMAIN_URL}/static/profile_images/{'c' * 32}.png"
+    assert photo_derivative_url(legacy, "thumb") == f"{settings.DOMAIN_URL}/static/profile_images/{'c' * 32}-thumb.webp"
+    # Sans déclinaisons : l'original
+    for original in (f"{settings.DOMAIN_URL}/static/profile_images/photo.jpg", f"https://cdn.example.com/{digest}.jpg"):
+        assert photo_derivative_url(original, "thumb") == original
+    assert photo_derivative_url(None, "thumb") is None
+
+
+async def test_missing_derivative_redirects_to_original():
+    from app.main import app
+
+    original = write_photo()
+    thumb = photos.derivative_path(original, "thumb")
+    directory = f"/{original.parent.as_posix()}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url=settings.DOMAIN_URL) as client:
+        response = await client.get(f"{directory}/{thumb.name}")
+        assert response.status_code == 307
+        assert response.headers["location"] == original.name
+        assert response.headers["cache-control"] == "no-store"
+
+        thumb.write_bytes(b"RIFF....WEBP")
+        response = await client.get(f"{directory}/{thumb.name}")
+        assert response.status_code == 200 and response.content == b"RIFF....WEBP"
+
+        # Photo imprimée annoncée en JPEG, produite en PNG (transparence)
+        jpeg, png = photos.print_photo_paths(original, 300, 85)
+        png.write_bytes(b"\x89PNG")
+        response = await client.get(f"{directory}/{jpeg.name}")
+        assert (response.status_code, response.headers["location"]) == (307, png.name)
+
+        # Ni déclinaison ni original
+        response = await client.get(f"{directory}/{'0' * 64}-thumb.webp")
+        assert response.status_code == 404
+
+
+async def test_gc_regenerates_lost_derivatives(seed):
+    old = write_photo(age=2 * DAY)
+    transparent = write_photo("RGBA", age=2 * DAY)
+    recent = write_photo()
+    async with AsyncSessionLocal() as db:
+        for index, path in enumerate((old, transparent, recent)):
+            db.add(CardModel(
+                creator_id=seed["user_id"], number=index + 1, first_name="Zoé", last_name="Ngo", contact=f"69000000{index}",
+                email=f"m{index}@example.com", image_url=url_of(path),
+                department_id=seed["department_id"], municipality_id=seed["municipality_id"],
+            ))
+        await db.commit()
+
+    report = await collect_photo_garbage(delete=False, grace=timedelta(hours=24))
+    assert (report.photos, report.missing_derivatives, report.repaired) == (3, 2, 0)
+    assert not photos.derivative_path(old, "thumb").exists()
+
+    report = await collect_photo_garbage(delete=True, grace=timedelta(hours=24))
+    assert (report.missing_derivatives, report.repaired) == (2, 2)
+    for path in (old, transparent):
+        for name in photos.PHOTO_DERIVATIVES:
+            assert photos.derivative_path(path, name).is_file()
+    assert photos.print_photo_paths(transparent, settings.CARD_PRINT_DPI, settings.CARD_PHOTO_JPEG_QUALITY)[1].is_file()
+    assert not photos.derivative_path(recent, "thumb").exists()  # tâche de fond peut-être en cours
+
+    report = await collect_photo_garbage(delete=True, grace=timedelta(hours=24))
+    assert report.missing_derivatives == 0
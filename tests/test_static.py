@@ -0,0 +1,48 @@
+# tests/test_static.py
+import os
+import threading
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.core import static
+from app.core.static import CachedStaticFiles
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_content_etag_is_computed_off_the_event_loop(tmp_path, monkeypatch):
+    background = tmp_path / "card_background.svg"
+    background.write_text("<svg>v1</svg>")
+    hashed_on = []
+    content_etag = static.content_etag
+
+    def recording(path, size, mtime_ns):
+        misses = content_etag.cache_info().misses
+        etag = content_etag(path, size, mtime_ns)
+        if content_etag.cache_info().misses > misses:
+            hashed_on.append(threading.current_thread())
+        return etag
+
+    monkeypatch.setattr(static, "content_etag", recording)
+    app = Starlette(routes=[Mount("/static", CachedStaticFiles(directory=tmp_path))])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        first = await client.get("/static/card_background.svg")
+        assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+        etag = first.headers["etag"]
+        response = await client.get("/static/card_background.svg", headers={"if-none-match": etag})
+        assert response.status_code == 304
+
+        # Contenu modifié sous le même nom : nouvelle empreinte
+        background.write_text("<svg>v2</svg>")
+        os.utime(background, (time.time() + 1, time.time() + 1))
+        response = await client.get("/static/card_background.svg", headers={"if-none-match": etag})
+        assert response.status_code == 200 and response.text == "<svg>v2</svg>"
+        assert response.headers["etag"] != etag
+
+    assert len(hashed_on) == 2
+    assert threading.main_thread() not in hashed_on
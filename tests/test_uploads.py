@@ -0,0 +1,134 @@
+# tests/test_uploads.py
+from io import BytesIO
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.helper import UPLOAD_CHUNK_SIZE, AppHelper
+from app.core.storage.content import StoredFileModel
+from app.features.cards.models import CardModel
+from app.features.cards.repository import CardRepository
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("profile_images")]
+
+
+def image_bytes(image_format: str, size: tuple[int, int] = (64, 64)) -> bytes:
+    buffer = BytesIO()
+    # Bruit : l'image ne se compresse pas, sa taille suit ses dimensions
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+async def post_card(client, seed, data: bytes, filename: str = "photo.jpg", content_type: str = "image/jpeg"):
+    return await client.post("/card/", files={"image": (filename, data, content_type)}, data={
+        "first_name": "Zoé", "last_name": "Ngo", "contact": "690000000", "email": "zoe@example.com",
+        "department_id": str(seed["department_id"]), "municipality_id": str(seed["municipality_id"]),
+    })
+
+
+async def assert_nothing_stored() -> None:
+    assert [path for path in settings.PROFILE_IMAGE_DIR.rglob("*") if path.is_file()] == []
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(StoredFileModel)) == 0
+        assert await db.scalar(select(func.count()).select_from(CardModel)) == 0
+
+
+async def test_too_large_upload_is_rejected(admin_client, seed, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_IMAGE_UPLOAD_SIZE", 16 * 1024)
+
+    response = await post_card(admin_client, seed, image_bytes("JPEG", (256, 256)))
+
+    assert response.status_code == 413
+    await assert_nothing_stored()
+
+
+@pytest.mark.parametrize("data, filename, content_type", [
+    (b"<?php echo 'x'; ?>" * 100, "photo.jpg", "image/jpeg"),  # type annoncé faux
+    (b"%PDF-1.4\n" + os.urandom(2048), "photo.png", "image/png"),
+    (image_bytes("GIF"), "photo.gif", "image/gif"),  # image, mais type non autorisé
+])
+async def test_disallowed_type_is_rejected(admin_client, seed, data, filename, content_type):
+    response = await post_card(admin_client, seed, data, filename, content_type)
+
+    assert response.status_code == 415
+    await assert_nothing_stored()
+
+
+async def test_type_is_read_from_content(admin_client, seed):
+    # PNG envoyé sous un nom et un Content-Type JPEG
+    response = await post_card(admin_client, seed, image_bytes("PNG"), "photo.jpg", "image/jpeg")
+
+    assert response.status_code == 200
+    assert response.json()["image_url"].endswith(".png")
+
+
+async def test_size_limit_is_enforced_while_streaming(db_engine):
+    # Taille inconnue à l'avance (corps découpé) : refus au morceau qui dépasse, fichier temporaire effacé
+    data = image_bytes("PNG", (512, 512))
+    assert len(data) > 2 * UPLOAD_CHUNK_SIZE
+    upload = UploadFile(BytesIO(data), filename="photo.png")
+
+    with pytest.raises(HTTPException) as error:
+        await AppHelper.save_file(upload, settings.PROFILE_IMAGE_DIR, max_size=UPLOAD_CHUNK_SIZE + 1)
+
+    assert error.value.status_code == 413
+    assert upload.file.tell() == 2 * UPLOAD_CHUNK_SIZE  # pas lu jusqu'au bout
+    await assert_nothing_stored()
+
+
+async def refcounts() -> dict[str, int]:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(select(StoredFileModel.path, StoredFileModel.refcount))).all())
+
+
+def key_of(url: str) -> str:
+    return url[len(settings.DOMAIN_URL) + 1:]
+
+
+async def test_rejected_create_releases_the_photo(admin_client, seed):
+    kept, rejected = image_bytes("JPEG"), image_bytes("JPEG")
+    card = (await post_card(admin_client, seed, kept)).json()
+
+    # E-mail déjà pris : photo nouvelle, puis photo partagée avec la carte existante
+    assert (await post_card(admin_client, seed, rejected)).status_code == 400
+    assert (await post_card(admin_client, seed, kept)).status_code == 400
+    response = await admin_client.post("/card/", files={"image": ("photo.jpg", rejected, "image/jpeg")}, data={
+        "first_name": "Paul", "last_name": "Ngo", "contact": "690000001", "email": "paul@example.com",
+        "department_id": str(seed["user_id"]), "municipality_id": str(seed["municipality_id"]),
+    })
+    assert response.status_code == 404
+
+    assert await refcounts() == {key_of(card["image_url"]): 1}
+    assert [path.name for path in settings.PROFILE_IMAGE_DIR.rglob("*.jpg")] == [key_of(card["image_url"]).rsplit("/", 1)[1]]
+
+
+async def test_update_releases_the_old_photo_once_saved(admin_client, seed):
+    old = (await post_card(admin_client, seed, image_bytes("JPEG"))).json()
+
+    response = await admin_client.put("/card/", files={"image": ("photo.png", image_bytes("PNG"), "image/png")}, data={"id": old["id"]})
+
+    assert response.status_code == 200
+    new_url = response.json()["image_url"]
+    assert await refcounts() == {key_of(new_url): 1}
+    assert not Path(key_of(old["image_url"])).exists()
+
+
+async def test_failed_update_keeps_the_old_photo(admin_client, seed, monkeypatch):
+    old = (await post_card(admin_client, seed, image_bytes("JPEG"))).json()
+
+    async def failing_update(self, model):
+        raise RuntimeError("base indisponible")
+
+    monkeypatch.setattr(CardRepository, "update", failing_update)
+    with pytest.raises(RuntimeError):
+        await admin_client.put("/card/", files={"image": ("photo.png", image_bytes("PNG"), "image/png")}, data={"id": old["id"]})
+
+    assert await refcounts() == {key_of(old["image_url"]): 1}
+    assert Path(key_of(old["image_url"])).exists()
+    assert list(settings.PROFILE_IMAGE_DIR.rglob("*.png")) == []